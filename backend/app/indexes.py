@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import re
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from backend.app.database import mongodb
+
+"""
+Declares every index the routes and scripts rely on, creates them and checks with explain()
+that no route query falls back to a full collection scan.
+
+Usage:
+    python -m backend.app.indexes ensure   # create the missing indexes
+    python -m backend.app.indexes verify   # fail if a route query plan contains a COLLSCAN
+"""
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    unique: bool = False
+
+
+class QuerySpec(NamedTuple):
+    """
+    A query shape used by a route, with sample values, whose plan must be served by an index.
+    """
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+    limit: int = 0
+
+
+class QueryPlanError(Exception):
+    """
+    Raised when at least one route query is planned as a COLLSCAN.
+    """
+
+    def __init__(self, collscans: List[str]):
+        self.collscans = collscans
+        super().__init__(f"Queries falling back to COLLSCAN: {', '.join(collscans)}")
+
+
+REQUIRED_INDEXES: List[IndexSpec] = [
+    # games
+    IndexSpec("games", [("game_id", ASCENDING)], "game_id"),
+    IndexSpec("games", [("created_at", DESCENDING), ("_id", DESCENDING)], "created_at_id_desc"),
+    # Multikey, normalised genres (see backend.utils.genres)
+    IndexSpec("games", [("genre_keys", ASCENDING)], "genre_keys"),
+    IndexSpec("games", [("name", ASCENDING)], "name"),
+    # hardware
+    IndexSpec("hardware", [("type", ASCENDING), ("brand", ASCENDING)], "type_brand"),
+    IndexSpec("hardware", [("hardware_id", ASCENDING), ("type", ASCENDING)], "hardware_id_type"),
+    # game_requirements - one document per game/resolution/setting combination
+    IndexSpec("game_requirements",
+              [("game_id", ASCENDING), ("resolution", ASCENDING), ("setting_name", ASCENDING)],
+              "game_resolution_setting_unique", unique=True),
+    # game_setups - one document per setup (flat requirements storage)
+    IndexSpec("game_setups",
+              [("game_id", ASCENDING), ("resolution", ASCENDING), ("setting_name", ASCENDING),
+               ("cpu_id", ASCENDING), ("gpu_id", ASCENDING), ("ram", ASCENDING)],
+              "setup_lookup_unique", unique=True),
+    # game_matrices - one materialized matrix per game/cpu/gpu (also the key of the $merge building them)
+    IndexSpec("game_matrices", [("game_id", ASCENDING), ("cpu_id", ASCENDING), ("gpu_id", ASCENDING)],
+              "game_cpu_gpu_unique", unique=True),
+]
+
+ROUTE_QUERIES: List[QuerySpec] = [
+    # hardware catalog load (CPU/GPU routes)
+    QuerySpec("hardware catalog cpus", "hardware", {"type": {"$regex": re.compile("cpu", re.IGNORECASE)}}),
+    QuerySpec("hardware catalog gpus", "hardware", {"type": {"$regex": re.compile("gpu", re.IGNORECASE)}}),
+    # scripts/hardware duplicate check
+    QuerySpec("hardware by hardware_id", "hardware", {"hardware_id": "nvidia_rtx_4090", "type": "gpu"}),
+    # games routes
+    QuerySpec("games by category", "games", {"genre_keys": "action"}),
+    QuerySpec("games by category prefix", "games", {"genre_keys": {"$regex": "^action"}}),
+    QuerySpec("games newly added", "games", {}, sort=[("created_at", DESCENDING)], limit=10),
+    QuerySpec("games page newest", "games",
+              {"$or": [{"created_at": {"$lt": datetime(2025, 1, 1)}},
+                       {"created_at": datetime(2025, 1, 1), "_id": {"$lt": ObjectId("000000000000000000000000")}}]},
+              sort=[("created_at", DESCENDING), ("_id", DESCENDING)], limit=100),
+    # requirements routes
+    QuerySpec("requirement lookup", "game_requirements",
+              {"game_id": "game", "resolution": "1920x1080", "setting_name": "Ultra"}),
+    QuerySpec("flat setup lookup", "game_setups",
+              {"game_id": "game", "resolution": "1920x1080", "setting_name": "Ultra",
+               "cpu_id": "cpu", "gpu_id": "gpu", "ram": {"$lte": 32}}),
+    QuerySpec("requirement matrix", "game_matrices", {"game_id": "game", "cpu_id": "cpu", "gpu_id": "gpu"}),
+]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, specs: Optional[List[IndexSpec]] = None) -> List[str]:
+    """
+    Create the declared indexes. Indexes that already exist with the same definition are left untouched.
+
+    :param db: the database.
+    :param specs: indexes to ensure, defaults to REQUIRED_INDEXES.
+    :return: names of the ensured indexes.
+    """
+    specs = REQUIRED_INDEXES if specs is None else specs
+    by_collection: Dict[str, List[IndexModel]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(
+            IndexModel(spec.keys, name=spec.name, unique=spec.unique))
+    names = []
+    for collection_name, models in by_collection.items():
+        names += await db[collection_name].create_indexes(models)
+    return names
+
+
+def find_stages(plan: Any, stage: str) -> bool:
+    """
+    Walk an explain() plan tree looking for the given stage.
+
+    :param plan: explain output, or any part of it.
+    :param stage: stage name. E.G: COLLSCAN
+    :return: True if the stage appears anywhere in the plan.
+    """
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return True
+        return any(find_stages(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(find_stages(value, stage) for value in plan)
+    return False
+
+
+async def explain_query(db: AsyncIOMotorDatabase, query: QuerySpec) -> dict:
+    cursor = db[query.collection].find(query.filter)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    if query.limit:
+        cursor = cursor.limit(query.limit)
+    return await cursor.explain()
+
+
+async def verify_query_plans(db: AsyncIOMotorDatabase, queries: Optional[List[QuerySpec]] = None) -> Dict[str, dict]:
+    """
+    Explain every route query and fail loudly if any of them would scan the whole collection.
+
+    :param db: the database.
+    :param queries: queries to check, defaults to ROUTE_QUERIES.
+    :return: winning plan of every query, by query name.
+    :raises QueryPlanError: if at least one winning plan contains a COLLSCAN stage.
+    """
+    queries = ROUTE_QUERIES if queries is None else queries
+    plans = {}
+    collscans = []
+    for query in queries:
+        explain = await explain_query(db, query)
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", explain)
+        plans[query.name] = winning_plan
+        if find_stages(winning_plan, "COLLSCAN"):
+            collscans.append(query.name)
+    if collscans:
+        raise QueryPlanError(collscans)
+    return plans
+
+
+async def main(command: str):
+    mongodb.connect()
+    try:
+        if command in ("ensure", "all"):
+            names = await ensure_indexes(mongodb.db)
+            print(f"Ensured {len(names)} indexes: {', '.join(names)}")
+        if command in ("verify", "all"):
+            plans = await verify_query_plans(mongodb.db)
+            print(f"All {len(plans)} route queries use an index.")
+    finally:
+        mongodb.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes and verify the route query plans.")
+    parser.add_argument("command", choices=["ensure", "verify", "all"])
+    asyncio.run(main(parser.parse_args().command))
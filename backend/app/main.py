@@ -1,12 +1,68 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from backend.app.config import get_settings
+from backend.app.database import mongodb
+from backend.app.indexes import ensure_indexes
+from backend.app.metrics import MetricsMiddleware
 from backend.routes.cpus import router as cpus_router
 from backend.routes.gpus import router as gpus_router
+from backend.routes.hardware import router as hardware_router
 from backend.routes.games import router as games_router
 from backend.routes.requirements import router as requirements_router
+from backend.routes.metrics import router as metrics_router
+from backend.services.hardware_catalog import hardware_catalog
+from backend.services.invalidation import ChangeFeed
+from backend.services.matrix import MatrixMaintainer
+from backend.services.response_cache import ResponseCacheMiddleware
+from backend.services.row_config import row_config
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the process wide MongoDB client on startup and close it on shutdown.
+    In-memory catalogs are warmed on startup, if the DB is unreachable they load on first use instead.
+    The change feed invalidating the in-memory caches, and the task rebuilding the requirement matrices
+    it reports changes of, run in the background until shutdown. The matrices are built by a single worker,
+    the one holding the maintainer's lease, which builds them all when it takes the lease.
+    """
+    settings = get_settings()
+    mongodb.connect(settings)
+    if settings.mongo_ensure_indexes:
+        try:
+            await ensure_indexes(mongodb.db)
+        except Exception as e:
+            logger.error("Could not ensure MongoDB indexes: %s", e)
+    try:
+        await hardware_catalog.refresh(mongodb.get_collection("hardware"))
+    except Exception as e:
+        logger.warning("Could not preload the hardware catalog: %s", e)
+    # The response cache answers the row config routes, so changes of the file are looked for here
+    background_tasks = [asyncio.create_task(row_config.watch())]
+    if settings.invalidation_feed_enabled:
+        background_tasks.append(asyncio.create_task(ChangeFeed(mongodb.db).run()))
+    if settings.matrix_maintenance_enabled:
+        background_tasks.append(asyncio.create_task(MatrixMaintainer().run()))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        mongodb.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Include routers
 @app.get("/")
@@ -20,8 +76,13 @@ def read_root():
 
 app.include_router(cpus_router, prefix="/api/hardware", tags=["CPUs"])
 app.include_router(gpus_router, prefix="/api/hardware", tags=["GPUs"])
+app.include_router(hardware_router, prefix="/api/hardware", tags=["Hardware"])
 app.include_router(games_router, prefix="/api", tags=["Games"])
 app.include_router(requirements_router, prefix="/api/req", tags=["Requirements"])
+app.include_router(metrics_router, tags=["Metrics"])
+
+# Serve the read-only catalog routes from the response cache (ETag / 304 / Cache-Control)
+app.add_middleware(ResponseCacheMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -33,6 +94,9 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all HTTP headers
 )
 
+# Outermost, so cached and CORS answered requests are measured too
+app.add_middleware(MetricsMiddleware)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,279 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+from backend.app.config import get_settings
+
+"""
+In-process metrics, exposed in the Prometheus text format at GET /metrics.
+
+- http_request_duration_seconds / http_response_size_bytes: per route template, recorded by MetricsMiddleware.
+- mongo_operation_duration_seconds / mongo_documents_returned: per collection and operation, recorded by the
+  InstrumentedCollection wrapper mongodb.get_collection() returns.
+- serialization_duration_seconds / json_encode_duration_seconds: recorded by backend.utils.serialization.
+
+Histograms are plain counters updated from the event loop, so observing a value takes no lock.
+Every worker process keeps its own counters - run one scrape target per worker (or a single worker)
+and let Prometheus aggregate them, the worker label tells them apart.
+"""
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+DOCUMENT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+# Route label of the requests no route matched (keeps the label's values bounded)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """
+    Counts of the observed values per bucket, with their sum.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # Last count is the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    """
+    Histograms of one metric, one per combination of label values.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        histogram = self.children.get(values)
+        if histogram is None:
+            histogram = self.children[values] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, value: float, *labelvalues: str):
+        self.labels(*labelvalues).observe(value)
+
+    def render(self, worker: str) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, histogram in self.children.items():
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+            labels = f'{labels},worker="{worker}"' if labels else f'worker="{worker}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {histogram.sum!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {histogram.count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    The metrics of this worker process.
+    """
+
+    def __init__(self):
+        self.families: List[HistogramFamily] = []
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> HistogramFamily:
+        family = HistogramFamily(name, documentation, labelnames, buckets)
+        self.families.append(family)
+        return family
+
+    def render(self) -> str:
+        """
+        :return: every metric in the Prometheus text exposition format.
+        """
+        worker = str(os.getpid())
+        lines = []
+        for family in self.families:
+            lines.extend(family.render(worker))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for family in self.families:
+            family.children.clear()
+
+
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Time to answer a request.", ("method", "route", "status"))
+RESPONSE_SIZE = metrics.histogram(
+    "http_response_size_bytes", "Size of the response bodies.", ("method", "route"), SIZE_BUCKETS)
+MONGO_DURATION = metrics.histogram(
+    "mongo_operation_duration_seconds", "Time spent waiting for MongoDB per operation.", ("collection", "operation"))
+MONGO_DOCUMENTS = metrics.histogram(
+    "mongo_documents_returned", "Documents returned per query.", ("collection", "operation"), DOCUMENT_BUCKETS)
+SERIALIZATION_DURATION = metrics.histogram(
+    "serialization_duration_seconds", "Time to turn DB documents into response dictionaries.", ("model",))
+JSON_ENCODE_DURATION = metrics.histogram(
+    "json_encode_duration_seconds", "Time to encode JSON response bodies.")
+
+
+def route_template(scope) -> str:
+    """
+    :return: path template of the route that handled the request. E.G /api/games/{game_id}
+    """
+    route = scope.get("route")
+    if route is None and scope.get("app") is not None:
+        # Responses served before routing (E.G from the response cache) - find the route they belong to
+        route = next((candidate for candidate in scope["app"].router.routes
+                      if candidate.matches(scope)[0] == Match.FULL), None)
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and response size of every HTTP request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, measure)
+        finally:
+            route = route_template(scope)
+            REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"], route, str(status))
+            RESPONSE_SIZE.observe(size, scope["method"], route)
+
+
+# Collection methods making a single round trip, and whether their result is a returned document
+_SINGLE_ROUND_TRIP = {
+    "find_one": True, "find_one_and_update": True, "find_one_and_replace": True, "find_one_and_delete": True,
+    "insert_one": False, "insert_many": False, "update_one": False, "update_many": False, "replace_one": False,
+    "delete_one": False, "delete_many": False, "bulk_write": False, "count_documents": False,
+    "estimated_document_count": False, "distinct": False,
+}
+# Collection methods returning a cursor
+_CURSORS = ("find", "aggregate")
+
+
+class InstrumentedCursor:
+    """
+    Motor cursor recording the time spent waiting for its batches and how many documents it returned.
+    """
+
+    def __init__(self, cursor, collection: str, operation: str):
+        self._cursor = cursor
+        self._labels = (collection, operation)
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Keep chained calls (sort, limit, skip...) instrumented
+            return self if result is self._cursor else result
+
+        return call
+
+    async def to_list(self, *args, **kwargs) -> list:
+        start = time.perf_counter()
+        documents = await self._cursor.to_list(*args, **kwargs)
+        MONGO_DURATION.observe(time.perf_counter() - start, *self._labels)
+        MONGO_DOCUMENTS.observe(len(documents), *self._labels)
+        return documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        waited = 0.0
+        returned = 0
+        iterator = self._cursor.__aiter__()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    document = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    waited += time.perf_counter() - start
+                returned += 1
+                yield document
+        finally:
+            MONGO_DURATION.observe(waited, *self._labels)
+            MONGO_DOCUMENTS.observe(returned, *self._labels)
+
+
+class InstrumentedCollection:
+    """
+    Motor collection recording the round-trip time of its operations and the documents its queries return.
+    Anything not instrumented is forwarded as is.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in _CURSORS:
+            return lambda *args, **kwargs: InstrumentedCursor(attr(*args, **kwargs), self._collection.name, name)
+        if name not in _SINGLE_ROUND_TRIP:
+            return attr
+
+        async def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = await attr(*args, **kwargs)
+            labels = (self._collection.name, name)
+            MONGO_DURATION.observe(time.perf_counter() - start, *labels)
+            if _SINGLE_ROUND_TRIP[name]:
+                MONGO_DOCUMENTS.observe(0 if result is None else 1, *labels)
+            elif name == "distinct":
+                MONGO_DOCUMENTS.observe(len(result), *labels)
+            return result
+
+        return call
+
+    def __getitem__(self, name: str) -> "InstrumentedCollection":
+        return InstrumentedCollection(self._collection[name])
+
+
+def instrument_collection(collection, enabled: bool = True):
+    """
+    :param collection: Motor collection.
+    :param enabled: False to get the collection back as is.
+    :return: the collection, recording its MongoDB metrics when enabled.
+    """
+    return InstrumentedCollection(collection) if enabled else collection
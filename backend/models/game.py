@@ -36,3 +36,21 @@ class Game(BaseModel):
         json_encoders = {
             ObjectId: str  # This will convert ObjectId to a string automatically
         }
+
+
+class GameCard(BaseModel):
+    """
+    Lightweight view of a game with only what the games grid shows
+    """
+    game_id: str
+    name: str
+    portrait_url: str
+    landscape_s: str
+    genres: List[str]
+    release_date: int
+    id: str
+
+
+# Fields a client may request with ?fields= (id is always returned)
+GAME_FIELDS = tuple(field for field in Game.model_fields if field != "id")
+GAME_CARD_FIELDS = tuple(field for field in GameCard.model_fields if field != "id")
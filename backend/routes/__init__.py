@@ -4,18 +4,10 @@ Routes module: Contains MongoDB query functions for the DB.
 Modules:
 - games_queries: Functions for handling game-related database operations.
 - hardware_queries: Functions for handling hardware-related database operations.
+
+Every route receives its collection through the dependencies in backend.app.database,
+which all share the single client opened in the app's lifespan.
 """
 from fastapi import APIRouter
-from motor.motor_asyncio import AsyncIOMotorClient
-
-
-# Import specific functions or classes to expose them at the package level
-
-# TODO remove after finishing editing DB
-
-# Connect to MongoDB (this assumes MongoDB is running on localhost)
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]  # Use your desired database name
 
 router = APIRouter()
-
@@ -1,22 +1,19 @@
-import re
+from typing import List
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from backend.services.hardware_catalog import CATALOG_VERSION_HEADER, CatalogSnapshot, get_hardware_catalog
+from backend.utils.serialization import ModelSerializer
+from backend.utils.streaming import stream_documents, stream_format
 from backend.utils.validation import validate_hardware_list
 
 """
 All functions for handling the CPUs in the DB will be here for ease of use and maintainability.
 For example: fetching all CPUs, fetch CPUs by brand, etc.
 """
-# Connect to MongoDB (this assumes MongoDB is running on localhost)
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]  # Use your desired database name
 router = APIRouter()
-# Use the hardware collection
-collection = db.hardware
 
 
 class Cpu(BaseModel):
@@ -33,19 +30,27 @@ class Cpu(BaseModel):
         }
 
 
-@router.get("/cpus")
-async def get_all_cpus():
+cpu_serializer = ModelSerializer(Cpu)
+
+
+@router.get("/cpus", response_model=List[Cpu])
+async def get_all_cpus(request: Request,
+                       catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
     """
-    Retrieve all CPUs from the database.
+    Retrieve all CPUs from the in-memory hardware catalog.
+    With "Accept: application/x-ndjson" or ?stream=true they are streamed one by one.
 
     :return: List of all CPUs as dictionaries.
     """
-    cpu_regex = {"$regex": re.compile("cpu", re.IGNORECASE)}
     try:
-        cpus_cursor = collection.find({"type": cpu_regex})
-        cpus = await cpus_cursor.to_list(length=None)
+        cpus = catalog.all("cpu")
         validate_hardware_list(cpus, "cpu")
-        return [Cpu(**cpu, id=str(cpu["_id"])) for cpu in cpus]
+        media_type = stream_format(request)
+        if media_type:
+            streamed = await stream_documents(cpus, cpu_serializer.dump, media_type, "No cpu found")
+            streamed.headers[CATALOG_VERSION_HEADER] = catalog.version
+            return streamed
+        return cpu_serializer.response(cpus, headers={CATALOG_VERSION_HEADER: catalog.version})
     except HTTPException as http_exception:
         raise http_exception
     except Exception as e:
@@ -53,54 +58,40 @@ async def get_all_cpus():
         raise HTTPException(status_code=500, detail=f"Error fetching CPUs: {str(e)}")
 
 
-@router.get("/cpus/brand")
-async def get_cpu_by_brand(brand: str):
+@router.get("/cpus/brand", response_model=List[Cpu])
+async def get_cpu_by_brand(brand: str,
+                           catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
     """
-    Retrieve CPUs with the given brand from the database.
+    Retrieve CPUs with the given brand from the in-memory hardware catalog.
 
     :param brand: string of brand of the CPU. E.G: AMD and Intel. (Not case-sensitive)
     :return: list of CPUs of the given brand.
     """
     try:
-        brand_regex = {"$regex": re.compile(brand, re.IGNORECASE)}
-        cpu_regex = {"$regex": re.compile("cpu", re.IGNORECASE)}
-        cpus_cursor = collection.find({"brand": brand_regex, "type": cpu_regex})
-        cpus = await cpus_cursor.to_list(length=None)
+        cpus = catalog.by_brand("cpu", brand)
         validate_hardware_list(cpus, "cpu", brand=brand)
-        return [Cpu(**cpu, id=str(cpu["_id"])) for cpu in cpus]
+        return cpu_serializer.response(cpus, headers={CATALOG_VERSION_HEADER: catalog.version})
     except HTTPException as http_exception:
         raise http_exception
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching cpus by model: {str(e)}")
 
 
-@router.get("/cpus/model")
-async def get_cpu_by_model(model: str):
+@router.get("/cpus/model", response_model=List[Cpu])
+async def get_cpu_by_model(model: str,
+                           catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
     """
-    Retrieve CPUs with the given model from the database.
+    Retrieve CPUs with the given model from the in-memory hardware catalog.
+    Matched by tokens against the model or the full name, E.G: "ryzen 3600" and "RYZEN3600" are the same.
 
     :param model: string of CPU model. E.G: RYZEN3600. (Not case-sensitive)
-    :return: list of CPUs of the given model's regex.
+    :return: list of CPUs matching the given model.
     """
-    model_regex = {"$regex": re.compile(model, re.IGNORECASE)}
-    cpu_regex = {"$regex": re.compile("cpu", re.IGNORECASE)}
-    search_query = {
-        "$and": [
-            {"type": cpu_regex},  # Ensure the hardware is a CPU
-            {
-                "$or": [  # Match the input's regex with the full name or the shorten model name.
-                    {"model": model_regex},
-                    {"fullname": model_regex}
-                ]
-            }
-        ]
-    }
     try:
-        cpus_cursor = collection.find(search_query)
-        cpus = await cpus_cursor.to_list()
+        cpus = catalog.by_model("cpu", model)
         # If cpus is empty count it as no games found error
         validate_hardware_list(cpus, "cpu", model=model)
-        return [Cpu(**cpu, id=str(cpu["_id"])) for cpu in cpus]
+        return cpu_serializer.response(cpus, headers={CATALOG_VERSION_HEADER: catalog.version})
     except HTTPException as http_exception:
         raise http_exception
     except Exception as e:
@@ -1,50 +1,180 @@
-import re
-from typing import Optional
-
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
-from pathlib import Path
-from backend.app.database import mongodb
-from backend.models.game import Game
+import base64
+from datetime import datetime
+from typing import Optional, Dict, List, Union, Any
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING
+from backend.app.database import get_games_collection
+from backend.models.game import Game, GameCard, GAME_CARD_FIELDS, GAME_FIELDS
+from backend.services.game_filters import GameFilterIndex, get_game_filter_index
+from backend.services.game_search import GameSearchIndex, get_game_search_index
+from backend.services.genre_facets import GenreFacetIndex, get_genre_facets
+from backend.services.home import home_cache
+from backend.services.response_cache import etag_matches
+from backend.services.row_config import row_config
+from backend.utils.genres import genre_filter
+from backend.utils.serialization import FastJSONResponse, ModelSerializer
+from backend.utils.streaming import STREAM_BATCH_SIZE, stream_documents, stream_format
 from backend.utils.validation import validate_games_list
-import json
 
-# Connect to MongoDB (this assumes MongoDB is running on localhost)
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]  # Use your desired database name
 router = APIRouter()
-# Use the games collection
-collection = db.games
+
+# Most games a single page returns, larger limits are capped
+MAX_PAGE_SIZE = 100
+# Cursor of the next page, absent on the last one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Amount of search matches, the response holds one page of them
+TOTAL_COUNT_HEADER = "X-Total-Count"
+# Keyset orders - _id breaks created_at ties so the cursor is unique
+PAGE_SORTS = {
+    "id": [("_id", ASCENDING)],
+    "newest": [("created_at", DESCENDING), ("_id", DESCENDING)],
+}
+CARD_VIEW = "card"
+
+game_serializer = ModelSerializer(Game)
+card_serializer = ModelSerializer(GameCard)
+
+
+def encode_cursor(game: dict, sort: str) -> str:
+    """
+    :param game: last game document of a page.
+    :param sort: page order, one of PAGE_SORTS.
+    :return: opaque cursor pointing right after this game.
+    """
+    key = str(game["_id"])
+    if sort == "newest":
+        key = f"{game['created_at'].isoformat()}|{key}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def cursor_filter(cursor: str, sort: str) -> Dict:
+    """
+    :param cursor: cursor made by encode_cursor.
+    :param sort: page order, one of PAGE_SORTS.
+    :return: filter matching the games coming after the cursor.
+    """
+    try:
+        key = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if sort == "newest":
+            created_at, game_id = key.split("|")
+            created_at, game_id = datetime.fromisoformat(created_at), ObjectId(game_id)
+            return {"$or": [{"created_at": {"$lt": created_at}},
+                            {"created_at": created_at, "_id": {"$lt": game_id}}]}
+        return {"_id": {"$gt": ObjectId(key)}}
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def requested_fields(fields: Optional[str], view: Optional[str]) -> Optional[tuple]:
+    """
+    :param fields: comma separated game fields. E.G: name,portrait_url
+    :param view: "card" for the fields the games grid needs.
+    :return: the game fields to return, None for whole documents.
+    """
+    if view == CARD_VIEW:
+        return GAME_CARD_FIELDS
+    if not fields:
+        return None
+    requested = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in requested if field not in GAME_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown game fields: {', '.join(unknown)}")
+    return requested
 
 
-@router.get("/games")
-async def get_all_games():
+@router.get("/games", response_model=List[Union[Game, GameCard, Dict[str, Any]]])
+async def get_all_games(request: Request,
+                        limit: Optional[int] = Query(None, ge=1),
+                        after: Optional[str] = None,
+                        sort: str = Query("id", pattern="^(id|newest)$"),
+                        fields: Optional[str] = None,
+                        view: Optional[str] = Query(None, pattern=f"^{CARD_VIEW}$"),
+                        collection: AsyncIOMotorCollection = Depends(get_games_collection)):
     """
-    Retrieve all CPUs from the database.
+    Retrieve games from the database, all of them or one page at a time.
+    Paging starts when limit or after is given, the next page's cursor is sent in the X-Next-Cursor header.
+    With "Accept: application/x-ndjson" or ?stream=true the games are streamed from the DB cursor
+    (without the X-Next-Cursor header).
 
-    :return: List of all games as dictionaries.
+    :param limit: page size, capped at MAX_PAGE_SIZE.
+    :param after: cursor of the page to fetch, from the previous page's X-Next-Cursor header.
+    :param sort: "id" (insertion order) or "newest" (created_at descending).
+    :param fields: comma separated fields to return. E.G: name,portrait_url
+    :param view: "card" returns only what the games grid needs.
+    :return: List of games as dictionaries.
     """
-    games_cursor = collection.find()
-    games = await games_cursor.to_list(length=None)
-    validate_games_list(games)
-    return [Game(**game, id=str(game["_id"])) for game in games]
+    page_size = min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE) if limit or after else None
+    query = cursor_filter(after, sort) if after else {}
+    returned_fields = requested_fields(fields, view)
+    projection = None
+    if returned_fields is not None:
+        # Pushed down to Mongo so unused fields never leave the DB (_id is always kept, it is the cursor)
+        projection = {field: 1 for field in returned_fields + (("created_at",) if sort == "newest" else ())}
+    games_cursor = collection.find(query, projection, batch_size=STREAM_BATCH_SIZE).sort(PAGE_SORTS[sort])
+    if page_size:
+        games_cursor = games_cursor.limit(page_size)
+
+    serializer = card_serializer if view == CARD_VIEW else game_serializer
+    # Whole cards and games are validated, a fields= subset is returned as is
+    partial_fields = None if view == CARD_VIEW else returned_fields
 
+    media_type = stream_format(request)
+    if media_type:
+        return await stream_documents(games_cursor, lambda game: serializer.dump(game, partial_fields),
+                                      media_type, "No games found")
+    games = await games_cursor.to_list(length=page_size)
+    validate_games_list(games, limit=page_size)
+    headers = {}
+    if page_size and len(games) == page_size:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(games[-1], sort)
+    return FastJSONResponse(serializer.documents(games, partial_fields), headers=headers)
 
-@router.get("/games/category")
-async def get_games_by_category(genre, limit: Optional[int] = None):
+
+@router.get("/games/category", response_model=List[Game])
+async def get_games_by_category(genre: str, limit: Optional[int] = None, prefix: bool = False,
+                                collection: AsyncIOMotorCollection = Depends(get_games_collection)):
     """
     Retrieve all games with given genre from the DB.
+    Genres are matched on their normalised keys (genre_keys index), not case-sensitive.
+
+    :param genre: genre of the games. E.G RPG
+    :param limit: most games returned.
+    :param prefix: also return games with a genre starting with genre ("action" matches "Action RPG").
     :return: List of dictionaries with matching genre.
     """
-    genre_regex = {"$regex": re.compile(genre, re.IGNORECASE)}
-    games_cursor = collection.find({"genres": genre_regex})
+    games_cursor = collection.find(genre_filter(genre, prefix))
+    if limit:
+        # Let the server stop at the limit instead of sending a whole first batch
+        games_cursor = games_cursor.limit(limit)
     games = await games_cursor.to_list(length=limit)
-    validate_games_list(games, limit=limit, genre=genre)
-    return [Game(**game, id=str(game["_id"])) for game in games]
+    validate_games_list(games, limit=limit, genre=genre, genre_prefix=prefix)
+    return game_serializer.response(games)
+
+
+@router.get("/games/genres", response_model=List[Dict[str, Any]])
+async def get_genres(prefix: Optional[str] = Query(None, max_length=100),
+                     facets: GenreFacetIndex = Depends(get_genre_facets)):
+    """
+    Lists the genres of the games with how many games have each, most games first.
 
+    :param prefix: only the genres starting with it (not case-sensitive). E.G "act"
+    :return: [{"genre": "action rpg", "label": "Action RPG", "count": 12}, ...] - genre is the value to filter by.
 
-@router.get("/games/newly_added")
-async def get_newly_added_games(limit: Optional[int] = 10):
+    :raises: HTTPException: If no genre matches.
+    """
+    genres = facets.facets(prefix)
+    if not genres:
+        raise HTTPException(status_code=404, detail="No genres found")
+    return FastJSONResponse(genres)
+
+
+@router.get("/games/newly_added", response_model=List[Game])
+async def get_newly_added_games(limit: Optional[int] = 10,
+                                collection: AsyncIOMotorCollection = Depends(get_games_collection)):
     """
        Returns the last `limit` games added to the DB, sorted by creation time.
        Default limit = 10
@@ -52,53 +182,128 @@ async def get_newly_added_games(limit: Optional[int] = 10):
     games_cursor = collection.find().sort("created_at", -1).limit(limit)
     games = await games_cursor.to_list(length=limit)
     validate_games_list(games, limit=limit)
-    return [Game(**game, id=str(game["_id"])) for game in games]
+    return game_serializer.response(games)
 
 
-# TODO needs more work
-# TODO create tests
-# @router.get("/games/search", response_model=List[Game])
-async def search_games(name: Optional[str] = None, year: Optional[str] = None, publisher: Optional[str] = None):
+@router.get("/games/search", response_model=List[Game])
+async def search_games(q: Optional[str] = Query(None, max_length=200),
+                       year_from: Optional[int] = None,
+                       year_to: Optional[int] = None,
+                       genre: Optional[str] = None,
+                       api: Optional[str] = None,
+                       upscaler: Optional[str] = None,
+                       limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                       offset: int = Query(0, ge=0),
+                       index: GameSearchIndex = Depends(get_game_search_index)):
     """
-    Performs a search in the MongoDB database for games that match the provided search criteria.
-    E.G: name, release year, and publisher.
-    The search is flexible and can handle partial matches for the game name and publisher.
+    Searches the games by name, publisher, developer and genres, best match first.
+    Answered from the in-memory search index - prefixes and typos match too. E.G: "witch" and "wicther" find "Witcher"
 
-    :param name: (str, optional): The name of the game to search for (case-insensitive).
-    :param year: (str, optional): The release year of the game. TODO change to int
-    :param publisher: (str, optional): The publisher of the game.
-    :return: List[GameResponse]: A list of games that match the search criteria.
+    :param q: free text to search for. Without it the filtered games are listed, newest release first.
+    :param year_from: earliest release year (inclusive).
+    :param year_to: latest release year (inclusive).
+    :param genre: genre the games must have. E.G RPG
+    :param api: graphics API the games must support. E.G DX12
+    :param upscaler: upscaler the games must support. E.G DLSS
+    :param limit: size of the page (1-100).
+    :param offset: matches skipped before the page.
+    :return: the page of matching games. The total amount of matches is in the X-Total-Count header.
 
     :raises: HTTPException: If no games match the search criteria.
     """
-    query = {}
-    if name:
-        query["name"] = {"$regex": name, "$options": "i"}  # Case-insensitive search
-    if year:
-        query["release_date"] = year
-    if publisher:
-        query["publisher"] = {"$regex": publisher, "$options": "i"}  # Case-insensitive search
+    total, games = index.search(q, year_from, year_to, genre, api, upscaler, limit, offset)
+    if total == 0:
+        raise HTTPException(status_code=404, detail="No games found matching the criteria")
+    return game_serializer.response(games, headers={TOTAL_COUNT_HEADER: str(total)})
 
-    games_collection = mongodb.get_collection("games")
-    games = await games_collection.find(query).to_list(None)  # Fetch all matching games
 
-    if not games:
-        raise HTTPException(status_code=404, detail="No games found matching the criteria")
+@router.get("/games/filter", response_model=Dict[str, Any])
+async def filter_games(name: Optional[str] = Query(None, max_length=200),
+                       publisher: Optional[List[str]] = Query(None),
+                       developer: Optional[List[str]] = Query(None),
+                       release_date: Optional[int] = None,
+                       year_from: Optional[int] = None,
+                       year_to: Optional[int] = None,
+                       genre: Optional[List[str]] = Query(None),
+                       api: Optional[List[str]] = Query(None),
+                       upscaler: Optional[List[str]] = Query(None),
+                       ssd: Optional[bool] = None,
+                       resolution: Optional[List[str]] = Query(None),
+                       limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                       offset: int = Query(0, ge=0),
+                       index: GameFilterIndex = Depends(get_game_filter_index)):
+    """
+    Filters the games on any combination of fields and counts the games of every facet value.
+    Repeat a parameter to accept any of its values (E.G api=DX12&api=Vulkan), different parameters must all match.
+    Values are not case-sensitive.
 
-    return [Game(**game) for game in games]
+    :param name: text the game's name must contain.
+    :param publisher: publisher of the games. E.G CD PROJEKT RED
+    :param developer: developer of the games.
+    :param release_date: release year of the games.
+    :param year_from: earliest release year (inclusive).
+    :param year_to: latest release year (inclusive).
+    :param genre: genre of the games. E.G RPG
+    :param api: graphics API the games support. E.G DX12
+    :param upscaler: upscaler the games support. E.G Nvidia DLSS
+    :param ssd: whether the games recommend an SSD.
+    :param resolution: resolution available in the games. E.G 2560x1440
+    :param limit: size of the page (1-100).
+    :param offset: matches skipped before the page.
+    :return: {"total": amount of matches, "games": the page in browse order (newest release first),
+              "facets": {"genre": [{"value": "rpg", "label": "RPG", "count": 12}, ...], "api": [...], ...}}.
+              A facet's counts apply every filter but its own (the games choosing that value instead would return).
+
+    :raises: HTTPException: If no games match the filters.
+    """
+    selected = {"publisher": publisher, "developer": developer, "genre": genre, "api": api,
+                "upscaler": upscaler, "resolution": resolution,
+                "ssd": None if ssd is None else [ssd],
+                "year": None if release_date is None else [release_date]}
+    total, games, facets = index.filter(selected, name, year_from, year_to, limit, offset)
+    if total == 0:
+        raise HTTPException(status_code=404, detail="No games found matching the criteria")
+    return FastJSONResponse({"total": total, "games": game_serializer.documents(games), "facets": facets})
 
 
 @router.get("/games/row-config")
-async def get_row_config():
+async def get_row_config(request: Request):
     """
-    Load and return the row config JSON file.
+    Return the row config JSON file, kept in memory and reloaded when the file changes.
+
+    :return: the row config, or 304 Not Modified if the client's If-None-Match matches its ETag.
     """
     try:
-        config_path = Path(__file__).parent.parent / "config" / "row-config.json"
-        with open(config_path, "r") as f:
-            data = json.load(f)
-        return data
+        loaded = await row_config.get()
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Row config file not found.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading config: {str(e)}")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, loaded.etag):
+        return Response(status_code=304, headers={"ETag": loaded.etag})
+    return Response(loaded.body, media_type="application/json", headers={"ETag": loaded.etag})
+
+
+@router.get("/games/home")
+async def get_home_rows(request: Request, collection: AsyncIOMotorCollection = Depends(get_games_collection)):
+    """
+    Return every row of the row config with its games (as cards), so the home page needs a single request.
+    Rows keep their row config fields, their games are under "games" (None for a fetch_url the server can't resolve).
+
+    :return: the rows, or 304 Not Modified if the client's If-None-Match matches their ETag.
+    """
+    try:
+        config = await row_config.get()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Row config file not found.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading config: {str(e)}")
+    try:
+        body, etag = await home_cache.get(collection, config)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=500, detail=f"Invalid row config: {str(e)}")
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
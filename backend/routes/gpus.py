@@ -1,22 +1,19 @@
-import re
+from typing import List
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from backend.services.hardware_catalog import CATALOG_VERSION_HEADER, CatalogSnapshot, get_hardware_catalog
+from backend.utils.serialization import ModelSerializer
+from backend.utils.streaming import stream_documents, stream_format
 from backend.utils.validation import validate_hardware_list
 
 """
 All function for handling the GPUs in the DB will be here for ease of use and maintainability.
 For example: adding new hardware, fetching hardware, and more.
 """
-# Connect to MongoDB (this assumes MongoDB is running on localhost)
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]  # Use your desired database name
 router = APIRouter()
-# Use the hardware collection
-collection = db.hardware
 
 
 class Gpu(BaseModel):
@@ -33,58 +30,52 @@ class Gpu(BaseModel):
         }
 
 
-@router.get("/gpus")
-async def get_all_gpus():
+gpu_serializer = ModelSerializer(Gpu)
+
+
+@router.get("/gpus", response_model=List[Gpu])
+async def get_all_gpus(request: Request,
+                       catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
     """
-    Retrieve all GPUs from the database.
+    Retrieve all GPUs from the in-memory hardware catalog.
+    With "Accept: application/x-ndjson" or ?stream=true they are streamed one by one.
 
     :return: List of all GPUs as dictionaries.
     """
-    gpu_regex = {"$regex": re.compile("gpu", re.IGNORECASE)}
-    gpus_cursor = collection.find({"type": gpu_regex})
-    gpus = await gpus_cursor.to_list(length=None)
+    gpus = catalog.all("gpu")
     validate_hardware_list(gpus, "gpu")
-    return [Gpu(**gpu, id=str(gpu["_id"])) for gpu in gpus]
+    media_type = stream_format(request)
+    if media_type:
+        streamed = await stream_documents(gpus, gpu_serializer.dump, media_type, "No gpu found")
+        streamed.headers[CATALOG_VERSION_HEADER] = catalog.version
+        return streamed
+    return gpu_serializer.response(gpus, headers={CATALOG_VERSION_HEADER: catalog.version})
 
 
-@router.get("/gpus/brand")
-async def get_gpu_by_brand(brand: str):
+@router.get("/gpus/brand", response_model=List[Gpu])
+async def get_gpu_by_brand(brand: str,
+                           catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
     """
-    Retrieve GPUs with the given brand from the database.
+    Retrieve GPUs with the given brand from the in-memory hardware catalog.
 
     :param brand: string of brand of the GPU. E.G: Nvidia. (Not case-sensitive)
     :return: list of GPUs of the given brand.
     """
-    brand_regex = {"$regex": re.compile(brand, re.IGNORECASE)}
-    gpu_regex = {"$regex": re.compile("gpu", re.IGNORECASE)}
-    gpus_cursor = collection.find({"brand": brand_regex, "type": gpu_regex})
-    gpus = await gpus_cursor.to_list(length=None)
+    gpus = catalog.by_brand("gpu", brand)
     validate_hardware_list(gpus, "gpu", brand=brand)
-    return [Gpu(**gpu, id=str(gpu["_id"])) for gpu in gpus]
+    return gpu_serializer.response(gpus, headers={CATALOG_VERSION_HEADER: catalog.version})
 
 
-@router.get("/gpus/model")
-async def get_gpu_by_model(model: str):
+@router.get("/gpus/model", response_model=List[Gpu])
+async def get_gpu_by_model(model: str,
+                           catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
     """
-    Performs a search in the MongoDB collection for GPUs using regex of the model.
+    Search the in-memory hardware catalog for GPUs by model.
+    Matched by tokens against the model or the full name, E.G: "rtx 4060 ti" and "4060ti" are the same.
 
     :param model: string of GPU model, E.G: RTX4090 (Not case-sensitive)
     :return: list of GPUS with matching fullname or model
     """
-    model_regex = {"$regex": re.compile(model, re.IGNORECASE)}
-    gpu_regex = {"$regex": re.compile("gpu", re.IGNORECASE)}
-    search_query = {
-        "$and": [
-            {"type": gpu_regex},  # Ensure the hardware is a CPU
-            {
-                "$or": [  # Match the input's regex with the full name or the shorten model name.
-                    {"model": model_regex},
-                    {"fullname": model_regex}
-                ]
-            }
-        ]
-    }
-    gpus_cursor = collection.find(search_query)
-    gpus = await gpus_cursor.to_list()
+    gpus = catalog.by_model("gpu", model)
     validate_hardware_list(gpus, "gpu", model=model)
-    return [Gpu(**gpu, id=str(gpu["_id"])) for gpu in gpus]
+    return gpu_serializer.response(gpus, headers={CATALOG_VERSION_HEADER: catalog.version})
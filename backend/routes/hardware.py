@@ -0,0 +1,51 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+
+from backend.services.hardware_catalog import CATALOG_VERSION_HEADER, CatalogSnapshot, get_hardware_catalog
+from backend.services.hardware_suggest import get_suggest_index
+from backend.utils.serialization import ModelSerializer
+
+"""
+Routes shared by all hardware types, E.G: model autocomplete for the CPU and GPU dropdowns.
+"""
+router = APIRouter()
+
+MAX_SUGGESTIONS = 50
+
+
+class HardwareSuggestion(BaseModel):
+    brand: str
+    model: str
+    fullname: str
+    type: str
+    # "cpu" or "gpu", the catalog the hardware belongs to
+    hardware_type: str
+    score: float
+    # Convert ObjectId to string
+    id: str
+
+
+suggestion_serializer = ModelSerializer(HardwareSuggestion)
+
+
+@router.get("/suggest", response_model=List[HardwareSuggestion])
+async def suggest_hardware(q: str = Query(..., min_length=1, max_length=100),
+                           hardware_type: Optional[str] = Query(None, alias="type", pattern="^(cpu|gpu)$"),
+                           limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+                           catalog: CatalogSnapshot = Depends(get_hardware_catalog)):
+    """
+    Autocomplete hardware models from the in-memory catalog.
+    Spacing, casing and punctuation are ignored, E.G: "4060ti", "rtx 4060 ti" and "GeForce RTX 4060TI (16GB)"
+    all suggest the same GPU. Close misspellings are suggested too, ranked below real prefix matches.
+
+    :param q: what the user typed so far.
+    :param hardware_type: "cpu" or "gpu" to search one type only (query parameter "type").
+    :param limit: maximal amount of suggestions (1-50).
+    :return: best matching hardware, best first.
+    """
+    index = get_suggest_index(catalog)
+    suggestions = [{**doc, "hardware_type": type_, "score": round(score, 3)}
+                   for doc, type_, score in index.suggest(q, hardware_type, limit)]
+    return suggestion_serializer.response(suggestions, headers={CATALOG_VERSION_HEADER: catalog.version})
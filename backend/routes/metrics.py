@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from backend.app.metrics import PROMETHEUS_CONTENT_TYPE, metrics
+
+"""
+Prometheus scrape endpoint of this worker's metrics (see backend.app.metrics).
+"""
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    :return: the request latency, MongoDB and serialization metrics in the Prometheus text format.
+    """
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
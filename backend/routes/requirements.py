@@ -1,19 +1,26 @@
 import logging
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import BaseModel, Field
 
-from backend.app.database import mongodb
+from backend.app.database import get_matrix_collection, get_requirements_collection
+from backend.services.estimator import PerformanceEstimator, get_performance_estimator
+from backend.services.matrix import best_cells
+from backend.services.playable import PlayableIndex, get_playable_index
+from backend.services.setups import combination_key, is_flat_storage
+from backend.services.upgrades import UpgradeIndex, get_upgrade_index
+from backend.utils.serialization import FastJSONResponse, ModelSerializer, dumps
+from backend.utils.streaming import NDJSON_MEDIA_TYPE, STREAM_BATCH_SIZE, stream_documents, stream_format, wants_ndjson
 
-# Connect to MongoDB (this assumes MongoDB is running on localhost)
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]  # Use your desired database name
 router = APIRouter()
-# Use the games collection
-collection = db.game_requirements
+
+# Combinations resolved per DB query in the batch route, and the most a single batch may ask for
+BATCH_CHUNK_SIZE = 100
+MAX_BATCH_COMBINATIONS = 500
 
 
 class GameSetupRequest(BaseModel):
@@ -36,6 +43,52 @@ class GameSetupRequest(BaseModel):
         }
 
 
+class RequirementCombination(BaseModel):
+    game_id: str
+    resolution: str
+    setting_name: str
+
+
+class BatchRequirementsRequest(BaseModel):
+    """
+    One rig (cpu, gpu, ram) checked against many game/resolution/setting combinations.
+    """
+    cpu_id: str
+    gpu_id: str
+    ram: int
+    fps: Optional[int] = None
+    combinations: List[RequirementCombination] = Field(..., min_length=1, max_length=MAX_BATCH_COMBINATIONS)
+
+
+setup_serializer = ModelSerializer(GameSetupRequest)
+
+
+def to_setup_response(combination_doc: dict, setup: dict, doc_id, validate: bool = True) -> dict:
+    """
+    Build the response of one setup.
+
+    :param combination_doc: document holding game_id, resolution and setting_name.
+    :param setup: the setup (cpu, gpu, ram, fps...). Same as combination_doc with the flat storage.
+    :param doc_id: id of the document the setup was read from.
+    :param validate: False when the caller validates a whole list at once with setup_serializer.
+    :return: GameSetupRequest as a dictionary.
+    """
+    item = {"game_id": str(combination_doc["game_id"]),
+            "cpu_id": setup["cpu_id"],
+            "gpu_id": setup["gpu_id"],
+            "ram": setup["ram"],
+            "resolution": combination_doc["resolution"],
+            "setting_name": combination_doc["setting_name"],
+            "fps": setup.get("fps"),
+            "taken_by": setup.get("taken_by"),
+            "notes": setup.get("notes"),
+            "verified": setup.get("verified"),
+            "id": str(doc_id)}
+    if validate:
+        setup_serializer.validate([item])
+    return item
+
+
 # TODO add the rest of the variables from setup element of the DB
 @router.get("/game-requirements/", response_model=Dict[str, Any])
 async def get_requirement(
@@ -45,9 +98,11 @@ async def get_requirement(
         ram: int,
         resolution: str,
         setting_name: str,
-        fps: Optional[int] = None):
+        fps: Optional[int] = None,
+        collection: AsyncIOMotorCollection = Depends(get_requirements_collection)):
     """
     Gets the setup's performance result from the DB.
+    With the flat requirements storage this is a single indexed point query on the game_setups collection.
 
     :param game_id: game's id made by MongoDB as a string.
     :param cpu_id: CPU's id made by MongoDB as a string.
@@ -59,42 +114,40 @@ async def get_requirement(
     :return: a dictionary of the setup's performance in the game with provided filtering.
     Consists of basic information of combination provided & FPS & notes & source
     """
-    # Construct the filter for setups
-    setup_filter = {
-        "cpu_id": cpu_id,
-        "gpu_id": gpu_id,
-        "ram": {"$lte": ram}  # Allow cases where stored RAM is less than or equal to input RAM
-    }
-    if fps is not None:
-        setup_filter["fps"] = fps  # Add FPS condition only if provided
     try:
+        if is_flat_storage():
+            setup_filter = {
+                "game_id": game_id,
+                "resolution": resolution,
+                "setting_name": setting_name,
+                "cpu_id": cpu_id,
+                "gpu_id": gpu_id,
+                "ram": {"$lte": ram}  # Allow cases where stored RAM is less than or equal to input RAM
+            }
+            if fps is not None:
+                setup_filter["fps"] = {"$lte": fps}
+            # The setup with the most RAM still within the input RAM
+            setup_doc = await collection.find_one(setup_filter, sort=[("ram", -1)])
+            if setup_doc is None:
+                raise HTTPException(status_code=404, detail="Combination not found")
+            return to_setup_response(setup_doc, setup_doc, setup_doc["_id"])
+
         # Query to find a matching document
         game_doc = await collection.find_one({
             "game_id": game_id,
             "resolution": resolution,
             "setting_name": setting_name,
-            # "setups": {"$elemMatch": setup_filter}  # Filter within setups
-            # "setups": setup_filter  # Filter within setups
         })
         if game_doc is None:
             raise HTTPException(status_code=404, detail="Combination not found")
-        # print("GameDoc: ", game_doc)
-        # Extract matching setups
-        for setup in game_doc["setups"]:
-            if (setup["cpu_id"] == cpu_id and setup["gpu_id"] == gpu_id and setup["ram"] <= ram
-                    and (fps is None or setup["fps"] <= fps)):
-                return (GameSetupRequest(game_id=game_id,
-                                         cpu_id=setup["cpu_id"],
-                                         gpu_id=setup["gpu_id"],
-                                         ram=setup["ram"],
-                                         resolution=game_doc["resolution"],
-                                         setting_name=game_doc["setting_name"],
-                                         fps=setup.get("fps"),
-                                         taken_by=setup.get("taken_by"),
-                                         notes=setup.get("notes"),
-                                         verified=setup.get("verified"),
-                                         id=str(game_doc["_id"])
-                                         ).model_dump())
+        # Same rule as the flat storage: the matching setup with the most RAM still within the input RAM
+        matching = [setup for setup in game_doc["setups"]
+                    if setup["cpu_id"] == cpu_id and setup["gpu_id"] == gpu_id and setup["ram"] <= ram
+                    and (fps is None or setup["fps"] <= fps)]
+        if not matching:
+            raise HTTPException(status_code=404, detail="Combination not found")
+        setup = max(matching, key=lambda matching_setup: matching_setup["ram"])
+        return to_setup_response(game_doc, setup, game_doc["_id"])
     except HTTPException as http_exception:
         raise http_exception
     except Exception as e:
@@ -102,34 +155,237 @@ async def get_requirement(
         raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
 
 
+@router.get("/game-requirements/estimate", response_model=Dict[str, Any])
+async def estimate_requirement(
+        game_id: str,
+        cpu_id: str,
+        gpu_id: str,
+        resolution: str,
+        setting_name: str,
+        estimator: PerformanceEstimator = Depends(get_performance_estimator)):
+    """
+    Estimates the FPS of a combination that may have no recorded benchmark,
+    from the relative performance of the CPU, the GPU and the game/resolution/setting in all recorded setups.
+
+    :param game_id: game's id made by MongoDB as a string.
+    :param cpu_id: CPU's id made by MongoDB as a string.
+    :param gpu_id: GPU's id made by MongoDB as a string.
+    :param resolution: full resolution string. E.G: 1920x1080
+    :param setting_name: setting name as specified per game. E.G Ultra
+    :return: estimated FPS with the low and high bounds of its 95% prediction interval.
+    """
+    estimate = estimator.estimate(game_id, resolution, setting_name, cpu_id, gpu_id)
+    if estimate is None:
+        raise HTTPException(status_code=404, detail="Not enough data to estimate this combination")
+    return {"game_id": game_id, "cpu_id": cpu_id, "gpu_id": gpu_id, "resolution": resolution,
+            "setting_name": setting_name, "estimated": True, **estimate._asdict()}
+
+
+@router.get("/upgrade", response_model=Dict[str, Any])
+async def recommend_upgrade(
+        game_id: str,
+        resolution: str,
+        setting_name: str,
+        cpu_id: str,
+        gpu_id: str,
+        ram: int,
+        target_fps: float = Query(..., gt=0),
+        index: UpgradeIndex = Depends(get_upgrade_index)):
+    """
+    Recommends the cheapest CPU and/or GPU swap that reaches the target FPS according to the recorded setups.
+    A part's cost is its performance tier, so the weakest part reaching the target is recommended.
+
+    :param game_id: game's id made by MongoDB as a string.
+    :param resolution: full resolution string. E.G: 1920x1080
+    :param setting_name: setting name as specified per game. E.G Ultra
+    :param cpu_id: id of the user's current CPU.
+    :param gpu_id: id of the user's current GPU.
+    :param ram: user's RAM in GB, setups needing more are never recommended.
+    :param target_fps: FPS the user wants to reach.
+    :return: the current FPS (if recorded), the cheapest GPU, CPU and CPU+GPU swaps (single swaps first)
+    and the recommended one - None if the current setup already meets the target or nothing recorded does.
+    """
+    recommendation = index.recommend(game_id, resolution, setting_name, cpu_id, gpu_id, ram, target_fps)
+    if recommendation is None:
+        raise HTTPException(status_code=404, detail="No setups recorded for this game, resolution and setting")
+    return {"game_id": game_id, "resolution": resolution, "setting_name": setting_name,
+            "target_fps": target_fps, **recommendation}
+
+
+@router.get("/matrix", response_model=Dict[str, Any])
+async def get_requirement_matrix(
+        game_id: str,
+        cpu_id: str,
+        gpu_id: str,
+        ram: int,
+        collection: AsyncIOMotorCollection = Depends(get_matrix_collection)):
+    """
+    Answers whether a rig runs a game at every resolution and setting, from the materialized matrix
+    of the game, CPU and GPU - a single indexed read (see backend.services.matrix).
+
+    :param game_id: game's id made by MongoDB as a string.
+    :param cpu_id: CPU's id made by MongoDB as a string.
+    :param gpu_id: GPU's id made by MongoDB as a string.
+    :param ram: RAM amount in GB (int).
+    :return: per resolution and setting, the FPS of the verified setup with the most RAM still within the rig's RAM.
+    """
+    try:
+        matrix_doc = await collection.find_one({"game_id": game_id, "cpu_id": cpu_id, "gpu_id": gpu_id})
+    except Exception as e:
+        print(f"Error fetching documents: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
+    if matrix_doc is None:
+        raise HTTPException(status_code=404, detail="No verified setups recorded for this game, CPU and GPU")
+    return FastJSONResponse({"game_id": game_id, "cpu_id": cpu_id, "gpu_id": gpu_id, "ram": ram,
+                             "matrix": best_cells(matrix_doc, ram)})
+
+
+@router.get("/playable", response_model=Dict[str, Any])
+async def get_playable_games(
+        cpu_id: str,
+        gpu_id: str,
+        ram: int,
+        resolution: Optional[str] = None,
+        min_fps: Optional[float] = Query(None, gt=0),
+        index: PlayableIndex = Depends(get_playable_index)):
+    """
+    Lists every game a rig runs, with the best setting it reaches, from the reverse index of the
+    recorded setups by CPU and GPU (see backend.services.playable) - the whole catalog in one lookup.
+
+    :param cpu_id: CPU's id made by MongoDB as a string.
+    :param gpu_id: GPU's id made by MongoDB as a string.
+    :param ram: RAM amount in GB (int), setups needing more don't count.
+    :param resolution: only consider this resolution. E.G: 1920x1080
+    :param min_fps: FPS the setups must reach (optional).
+    :return: per game the best setup the rig meets (highest setting, then resolution, then FPS), best first.
+    """
+    setups = index.playable(cpu_id, gpu_id, ram, resolution, min_fps)
+    if setups is None:
+        raise HTTPException(status_code=404, detail="No setups recorded for this CPU and GPU")
+    if not setups:
+        raise HTTPException(status_code=404, detail="No recorded setup of this CPU and GPU meets the criteria")
+    games = [{"game_id": str(setup["game_id"]), "resolution": setup["resolution"],
+              "setting_name": setup["setting_name"], "fps": setup.get("fps"), "ram": setup["ram"],
+              "verified": setup.get("verified")} for setup in setups]
+    return FastJSONResponse({"cpu_id": cpu_id, "gpu_id": gpu_id, "ram": ram, "total": len(games), "games": games})
+
+
 @router.get("/game-requirements/all", response_model=List[Dict[str, Any]])
-async def get_all_game_requirements():
+async def get_all_game_requirements(
+        request: Request,
+        collection: AsyncIOMotorCollection = Depends(get_requirements_collection)):
     """
     TODO remove on release - FOR DEBUGGING ONLY
     Gets all requirements from the DB.
+    With "Accept: application/x-ndjson" or ?stream=true the setups are streamed from the DB cursor.
 
     :return: list of dictionaries of all games and setups performances as recorded in the DB.
     Consists of basic information of combination provided & FPS & notes & source
     """
     try:
-        cursor = collection.find()
+        cursor = collection.find(batch_size=STREAM_BATCH_SIZE)
+        media_type = stream_format(request)
+        if media_type:
+            return await stream_documents(iterate_setup_responses(cursor), dumps, media_type,
+                                          "No requirements found")
         documents = await cursor.to_list(length=None)
-        result = []
-        for document in documents:
-            game_id = str(document["game_id"])  # Convert _id to string
-            for setup in document["setups"]:
-                result.append(GameSetupRequest(game_id=game_id,
-                                               cpu_id=setup["cpu_id"],
-                                               gpu_id=setup["gpu_id"],
-                                               ram=setup["ram"],
-                                               resolution=document["resolution"],
-                                               setting_name=document["setting_name"],
-                                               fps=setup.get("fps"),
-                                               id=str(document["_id"])
-                                               ).model_dump())
-        return result  # Returns all documents as JSON
+        if is_flat_storage():
+            result = [to_setup_response(document, document, document["_id"], validate=False)
+                      for document in documents]
+        else:
+            result = []
+            for document in documents:
+                for setup in document["setups"]:
+                    result.append(to_setup_response(document, setup, document["_id"], validate=False))
+        setup_serializer.validate(result)
+        return FastJSONResponse(result)  # Returns all documents as JSON
+    except HTTPException as http_exception:
+        raise http_exception
     except Exception as e:
         print(f"Error fetching documents: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
 
-# return [Cpu(**cpu, id=str(cpu["_id"])) for cpu in cpus]
+
+async def iterate_setup_responses(cursor) -> AsyncIterator[dict]:
+    """
+    :param cursor: cursor over the setups collection (embedded or flat layout).
+    :return: async iterator of the response of every setup.
+    """
+    async for document in cursor:
+        if "setups" not in document:
+            yield to_setup_response(document, document, document["_id"])
+            continue
+        for setup in document["setups"]:
+            yield to_setup_response(document, setup, document["_id"])
+
+
+async def resolve_batch(collection: AsyncIOMotorCollection,
+                        batch: BatchRequirementsRequest) -> AsyncIterator[Tuple[str, Optional[dict]]]:
+    """
+    Resolve every combination of the batch with one query per BATCH_CHUNK_SIZE combinations.
+    Matches are yielded as soon as their query returns them, combinations without a match are yielded last.
+
+    :param collection: collection the setups are stored in (embedded or flat layout).
+    :param batch: the rig and the combinations to check.
+    :return: async iterator of (combination key, setup response or None).
+    """
+    combinations = {combination_key(c.game_id, c.resolution, c.setting_name): c for c in batch.combinations}
+    pending = list(combinations.values())
+    resolved = set()
+    setup_filter = {"cpu_id": batch.cpu_id, "gpu_id": batch.gpu_id, "ram": {"$lte": batch.ram}}
+    if batch.fps is not None:
+        setup_filter["fps"] = {"$lte": batch.fps}
+
+    for start in range(0, len(pending), BATCH_CHUNK_SIZE):
+        or_filter = [c.model_dump() for c in pending[start:start + BATCH_CHUNK_SIZE]]
+        if is_flat_storage():
+            # Keep the setup with the most RAM still within the rig's RAM per combination
+            best = {}
+            async for doc in collection.find({"$or": or_filter, **setup_filter}):
+                key = combination_key(doc["game_id"], doc["resolution"], doc["setting_name"])
+                if key not in best or doc["ram"] > best[key]["ram"]:
+                    best[key] = doc
+            for key, doc in best.items():
+                resolved.add(key)
+                yield key, to_setup_response(doc, doc, doc["_id"])
+        else:
+            # $elemMatch projects only the first matching setup of each document, like get_requirement's loop
+            projection = {"game_id": 1, "resolution": 1, "setting_name": 1,
+                          "setups": {"$elemMatch": setup_filter}}
+            async for doc in collection.find({"$or": or_filter}, projection):
+                setups = doc.get("setups") or []
+                if not setups:
+                    continue
+                key = combination_key(doc["game_id"], doc["resolution"], doc["setting_name"])
+                resolved.add(key)
+                yield key, to_setup_response(doc, setups[0], doc["_id"])
+
+    for key in combinations:
+        if key not in resolved:
+            yield key, None
+
+
+@router.post("/game-requirements/batch")
+async def get_requirements_batch(
+        batch: BatchRequirementsRequest,
+        request: Request,
+        collection: AsyncIOMotorCollection = Depends(get_requirements_collection)):
+    """
+    Checks one rig against many game/resolution/setting combinations in a single call.
+    The combinations are resolved with a bounded number of $or queries instead of one request per combination.
+    With "Accept: application/x-ndjson" each result is streamed as its own JSON line as soon as it resolves.
+
+    :param batch: cpu_id, gpu_id, ram, optional fps and the list of combinations (up to 500).
+    :return: {"results": {"<game_id>|<resolution>|<setting_name>": setup or null}}
+    """
+    if wants_ndjson(request):
+        async def stream_lines():
+            async for key, result in resolve_batch(collection, batch):
+                yield dumps({"key": key, "result": result}) + b"\n"
+
+        return StreamingResponse(stream_lines(), media_type=NDJSON_MEDIA_TYPE)
+    try:
+        return {"results": {key: result async for key, result in resolve_batch(collection, batch)}}
+    except Exception as e:
+        print(f"Error fetching documents: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
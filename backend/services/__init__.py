@@ -0,0 +1,20 @@
+"""
+services module: Contains in-process state shared by the routes (caches, indexes).
+
+Modules:
+- hardware_catalog: in-memory catalog of all CPUs/GPUs with brand and model indexes
+- hardware_suggest: prefix/trigram autocomplete index built from the hardware catalog
+- setups: embedded/flat storage layouts of the benchmark setups
+- estimator: FPS estimates for hardware combinations without a recorded benchmark
+- upgrades: cheapest CPU/GPU swap reaching a target FPS
+- playable: (cpu, gpu) -> setups reverse index answering which games a rig runs
+- matrix: materialized per game/cpu/gpu requirement matrices and the task keeping them up to date
+- game_search: in-memory BM25 search over the games catalog
+- game_filters: in-memory per facet value bitmaps of the games, for filtering with facet counts
+- genre_facets: in-memory genre -> amount of games index, updated one game at a time
+- row_config: in-memory copy of backend/config/row-config.json, reloaded when the file changes
+- home: home page rows of the row config resolved with their games
+- refreshing: TTL holder for values built from a collection
+- invalidation: change stream (or polling) feed telling the caches about writes
+- response_cache: ETag/LRU cache of the catalog routes' responses and its middleware
+"""
@@ -0,0 +1,217 @@
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_requirements_collection
+from backend.services.refreshing import RefreshingCache
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.setups import (REQUIREMENTS_COLLECTIONS, added_setups, combination_key, flatten_setups,
+                                     setup_listeners)
+
+"""
+Estimates the FPS of hardware combinations that were never benchmarked, from the setups that were.
+
+Model: log(fps) = combination score + cpu score + gpu score
+where a combination is a game/resolution/setting. Scores are fitted by alternating ridge means (backfitting):
+each kind of score in turn becomes the shrunk mean of its setups' residuals against the two other kinds,
+until the scores stop moving. A sweep is O(setups) with no k x k matrix, and a refit after new setups is
+warm-started from the previous scores so it only takes a few sweeps. Every estimate comes with a
+prediction interval.
+"""
+# Ridge term shrinking the scores of parts with few setups
+RIDGE = 1e-3
+# z value of the reported prediction interval (95%)
+INTERVAL_Z = 1.96
+INTERVAL_CONFIDENCE = 0.95
+# Log-space spread used while there are fewer setups than fitted scores
+DEFAULT_LOG_SIGMA = 0.25
+MIN_LOG_SIGMA = 0.02
+# Backfitting stops once no score moves by more than FIT_TOLERANCE, or after FIT_MAX_SWEEPS sweeps
+FIT_TOLERANCE = 1e-9
+FIT_MAX_SWEEPS = 500
+
+KINDS = ("combination", "cpu", "gpu")
+
+
+class Estimate(NamedTuple):
+    fps: float
+    fps_low: float
+    fps_high: float
+    confidence: float
+    samples: int
+
+
+class PerformanceEstimator:
+    """
+    Incrementally trained log-additive FPS model.
+    """
+
+    def __init__(self, ridge: float = RIDGE):
+        self._ridge = ridge
+        self._params: Dict[Tuple[str, str], int] = {}
+        # Kind of every score (position in KINDS)
+        self._kinds = np.zeros(16, dtype=np.int64)
+        # Score indexes (one column per kind) and log(fps) of every setup
+        self._rows = np.zeros((16, len(KINDS)), dtype=np.int64)
+        self._y = np.zeros(16)
+        self.samples = 0
+        self._theta = np.zeros(0)
+        self._counts = np.zeros(0)
+        self._fitted = False
+        self._sigma = DEFAULT_LOG_SIGMA
+
+    def _param(self, kind: str, key: str) -> int:
+        index = self._params.get((kind, key))
+        if index is None:
+            index = len(self._params)
+            self._params[(kind, key)] = index
+            if index >= len(self._kinds):
+                # Amortized doubling
+                self._kinds = np.concatenate((self._kinds, np.zeros(len(self._kinds), dtype=np.int64)))
+            self._kinds[index] = KINDS.index(kind)
+        return index
+
+    def _features(self, game_id, resolution: str, setting_name: str, cpu_id, gpu_id) -> Optional[List[int]]:
+        indexes = [self._params.get(("combination", combination_key(game_id, resolution, setting_name))),
+                   self._params.get(("cpu", str(cpu_id))),
+                   self._params.get(("gpu", str(gpu_id)))]
+        return None if None in indexes else indexes
+
+    def add_setup(self, setup: dict):
+        """
+        Add one benchmarked setup to the training data, the model is refitted on the next estimate.
+
+        :param setup: flat setup document (game_id, resolution, setting_name, cpu_id, gpu_id, fps).
+        """
+        fps = setup.get("fps")
+        if not fps or fps <= 0:
+            return
+        if self.samples >= len(self._y):
+            # Amortized doubling
+            self._rows = np.concatenate((self._rows, np.zeros_like(self._rows)))
+            self._y = np.concatenate((self._y, np.zeros_like(self._y)))
+        self._rows[self.samples] = [self._param("combination", combination_key(setup["game_id"], setup["resolution"],
+                                                                               setup["setting_name"])),
+                                    self._param("cpu", str(setup["cpu_id"])),
+                                    self._param("gpu", str(setup["gpu_id"]))]
+        self._y[self.samples] = math.log(fps)
+        self.samples += 1
+        self._fitted = False
+
+    def fit(self):
+        """
+        Backfit the scores, starting from the previous ones (new scores start at 0), and the residual spread.
+        """
+        k = len(self._params)
+        if k == 0:
+            return
+        rows, y = self._rows[:self.samples], self._y[:self.samples]
+        theta = np.zeros(k)
+        theta[:len(self._theta)] = self._theta
+        self._counts = np.bincount(rows.ravel(), minlength=k).astype(np.float64)
+        kinds = self._kinds[:k]
+        predicted = theta[rows].sum(axis=1)
+        for _ in range(FIT_MAX_SWEEPS):
+            previous = theta.copy()
+            for column in range(len(KINDS)):
+                indexes = rows[:, column]
+                # Residuals against the two other kinds
+                residuals = y - predicted + theta[indexes]
+                mask = kinds == column
+                sums = np.bincount(indexes, weights=residuals, minlength=k)
+                theta[mask] = sums[mask] / (self._counts[mask] + self._ridge)
+                predicted = y - residuals + theta[indexes]
+            # Scores are only defined up to a shift between kinds: keep the hardware scores centred
+            for column in (1, 2):
+                shift = float(theta[rows[:, column]].mean())
+                theta[kinds == column] -= shift
+                theta[kinds == 0] += shift
+            if np.abs(theta - previous).max() < FIT_TOLERANCE:
+                break
+        self._theta = theta
+        rss = float(((y - theta[rows].sum(axis=1)) ** 2).sum())
+        dof = self.samples - k
+        self._sigma = max(math.sqrt(rss / dof), MIN_LOG_SIGMA) if dof > 0 else DEFAULT_LOG_SIGMA
+        self._fitted = True
+
+    def score(self, kind: str, key) -> Optional[float]:
+        """
+        Relative performance score of a fitted parameter (log-FPS scale, higher is faster).
+
+        :param kind: "cpu", "gpu" or "combination".
+        :param key: hardware id, or combination key.
+        :return: the score, None if it never appeared in any setup.
+        """
+        index = self._params.get((kind, str(key)))
+        if index is None:
+            return None
+        if not self._fitted:
+            self.fit()
+        return float(self._theta[index])
+
+    def estimate(self, game_id, resolution: str, setting_name: str, cpu_id, gpu_id) -> Optional[Estimate]:
+        """
+        Predict the FPS of a combination.
+
+        :return: the estimate with its 95% prediction interval,
+        None if the game/resolution/setting, the CPU or the GPU never appeared in any setup.
+        """
+        indexes = self._features(game_id, resolution, setting_name, cpu_id, gpu_id)
+        if indexes is None:
+            return None
+        if not self._fitted:
+            self.fit()
+        mean = float(self._theta[indexes].sum())
+        # Variance of every score taken alone (no covariance between them): sigma^2 / (setups + ridge)
+        variance = self._sigma ** 2 * (1.0 + float((1.0 / (self._counts[indexes] + self._ridge)).sum()))
+        half_width = INTERVAL_Z * math.sqrt(variance)
+        return Estimate(fps=round(math.exp(mean), 1),
+                        fps_low=round(math.exp(mean - half_width), 1),
+                        fps_high=round(math.exp(mean + half_width), 1),
+                        confidence=INTERVAL_CONFIDENCE,
+                        samples=self.samples)
+
+    @classmethod
+    async def from_collection(cls, collection: AsyncIOMotorCollection) -> "PerformanceEstimator":
+        """
+        Train a model on every setup in the DB (embedded or flat layout).
+
+        :param collection: collection the setups are stored in.
+        :return: the fitted estimator.
+        """
+        estimator = cls()
+        async for doc in collection.find():
+            for setup in (flatten_setups(doc) if "setups" in doc else [doc]):
+                estimator.add_setup(setup)
+        estimator.fit()
+        return estimator
+
+
+def _on_setup_added(setup: dict):
+    estimator_cache.update(lambda estimator: estimator.add_setup(setup))
+
+
+estimator_cache: RefreshingCache[PerformanceEstimator] = RefreshingCache(PerformanceEstimator.from_collection,
+                                                                         "estimator_ttl_seconds")
+# New setups (reported by the change feed) train the loaded model right away
+setup_listeners.append(_on_setup_added)
+
+
+def _on_requirements_changed(event: InvalidationEvent):
+    # Added setups (flat or embedded) arrive through setup_listeners, any other write rebuilds the model
+    if added_setups(event) is None:
+        estimator_cache.invalidate()
+
+
+invalidation_bus.subscribe(REQUIREMENTS_COLLECTIONS, _on_requirements_changed)
+
+
+async def get_performance_estimator(
+        collection: AsyncIOMotorCollection = Depends(get_requirements_collection)) -> PerformanceEstimator:
+    """
+    FastAPI dependency returning the current performance estimator.
+    """
+    return await estimator_cache.get(collection)
@@ -0,0 +1,234 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_games_collection
+from backend.services.game_search import browse_key
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.refreshing import RefreshingCache
+from backend.utils.genres import normalize_genre
+
+"""
+In-memory faceted filtering of the games catalog, answering /api/games/filter without querying MongoDB.
+
+Games are numbered in browse order (newest release first, then by name). For every facet value
+(E.G api=dx12) the index keeps the set of game numbers having it, compressed like a roaring bitmap:
+values few games have are sorted arrays of game numbers, the others packed bitsets (one bit per game).
+A query intersects the selected values (several values of one facet are OR-ed, facets AND-ed), and counts
+every value of every facet against the other facets' filters, so the counts tell how many games
+picking that value would leave.
+"""
+# Facet name -> game field holding its values
+FACET_FIELDS = {
+    "genre": "genres",
+    "api": "api_support",
+    "upscaler": "upscale_support",
+    "resolution": "available_resolutions",
+    "ssd": "is_ssd_recommended",
+    "publisher": "publisher",
+    "developer": "developer",
+    "year": "release_date",
+}
+# Most values of a facet returned with the counts
+MAX_FACET_VALUES = 50
+
+# Set bits of every byte
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+
+def facet_key(value) -> str:
+    """
+    E.G: "Nvidia  DLSS" -> "nvidia dlss", True -> "true", 2020 -> "2020"
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return normalize_genre(str(value))
+
+
+class Facet:
+    """
+    Games having each value of one facet, compressed per value: a value few games have is kept as its
+    sorted game numbers (all of them concatenated, so they are counted in one pass), the others as packed bitsets.
+    """
+
+    def __init__(self, numbers: Dict[str, List[int]], labels: Dict[str, str], size: int):
+        """
+        :param numbers: value -> sorted numbers of the games having it.
+        :param labels: value -> display name.
+        :param size: amount of games in the index.
+        """
+        self.keys = sorted(numbers)
+        self.labels = [labels[key] for key in self.keys]
+        self._positions = {key: position for position, key in enumerate(self.keys)}
+        # Packed bitsets of the dense values, by position
+        self._bits: Dict[int, np.ndarray] = {}
+        # Game numbers of the sparse values, and the position of the value of each number
+        sparse_numbers: List[int] = []
+        sparse_positions: List[int] = []
+        for position, key in enumerate(self.keys):
+            # 4 bytes per number against one bit per game
+            if len(numbers[key]) * 32 < size:
+                sparse_numbers += numbers[key]
+                sparse_positions += [position] * len(numbers[key])
+            else:
+                self._bits[position] = to_bits(np.array(numbers[key], dtype=np.int64), size)
+        self._numbers = np.array(sparse_numbers, dtype=np.int64)
+        self._sparse_positions = np.array(sparse_positions, dtype=np.int64)
+        # Slice of the numbers of every sparse value
+        self._lengths = np.bincount(self._sparse_positions, minlength=len(self.keys))
+        self._starts = np.cumsum(self._lengths) - self._lengths
+
+    def games(self, keys: Iterable[str], size: int) -> np.ndarray:
+        """
+        :return: packed bitset of the games having any of the values.
+        """
+        selected = np.zeros(size, dtype=bool)
+        bits = np.packbits(selected)
+        for key in keys:
+            position = self._positions.get(key)
+            if position is None:
+                continue
+            if position in self._bits:
+                bits |= self._bits[position]
+            else:
+                start = self._starts[position]
+                selected[self._numbers[start:start + self._lengths[position]]] = True
+        return bits | np.packbits(selected)
+
+    def counts(self, bits: np.ndarray) -> np.ndarray:
+        """
+        :param bits: packed bitset of games.
+        :return: amount of these games having each value, by position.
+        """
+        hits = (bits[self._numbers >> 3] >> (7 - (self._numbers & 7))) & 1
+        counts = np.bincount(self._sparse_positions, weights=hits, minlength=len(self.keys)).astype(np.int64)
+        for position, value_bits in self._bits.items():
+            counts[position] = _POPCOUNT[value_bits & bits].sum()
+        return counts
+
+    def top(self, bits: np.ndarray, limit: int = MAX_FACET_VALUES) -> List[dict]:
+        """
+        :return: the values these games have as {"value", "label", "count"}, most games first.
+        """
+        counts = self.counts(bits)
+        positions = np.flatnonzero(counts)
+        # Keys are sorted, ties keep that order
+        positions = positions[np.lexsort((positions, -counts[positions]))][:limit]
+        return [{"value": self.keys[position], "label": self.labels[position], "count": int(counts[position])}
+                for position in positions]
+
+
+def to_bits(numbers: np.ndarray, size: int) -> np.ndarray:
+    """
+    :return: packed bitset of the given game numbers.
+    """
+    selected = np.zeros(size, dtype=bool)
+    selected[numbers] = True
+    return np.packbits(selected)
+
+
+class GameFilterIndex:
+    """
+    Facet value -> games index over every game of the catalog.
+    """
+
+    def __init__(self, games: List[dict]):
+        self.games = sorted(games, key=browse_key)
+        self.size = len(self.games)
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+        self._names = np.array([str(game.get("name", "")).casefold() for game in self.games], dtype=str)
+        numbers: Dict[str, Dict[str, List[int]]] = {facet: defaultdict(list) for facet in FACET_FIELDS}
+        labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACET_FIELDS}
+        for number, game in enumerate(self.games):
+            for facet, field in FACET_FIELDS.items():
+                values = game.get(field)
+                for value in (values if isinstance(values, list) else [values]):
+                    if value is None or value == "":
+                        continue
+                    key = facet_key(value)
+                    # Games are numbered in order, every list stays sorted
+                    if not numbers[facet][key] or numbers[facet][key][-1] != number:
+                        numbers[facet][key].append(number)
+                    labels[facet].setdefault(key, value if isinstance(value, str) else key)
+        self.facets: Dict[str, Facet] = {facet: Facet(numbers[facet], labels[facet], self.size)
+                                         for facet in FACET_FIELDS}
+
+    @classmethod
+    async def from_collection(cls, collection: AsyncIOMotorCollection) -> "GameFilterIndex":
+        """
+        :param collection: the games collection.
+        """
+        return cls(await collection.find().to_list(length=None))
+
+    def _facet_bits(self, facet: str, values: Iterable) -> np.ndarray:
+        """
+        :return: bitset of the games having any of the values of the facet.
+        """
+        return self.facets[facet].games((facet_key(value) for value in values), self.size)
+
+    def _name_bits(self, name: str) -> np.ndarray:
+        return np.packbits(np.char.find(self._names, name.casefold()) >= 0) if self.size else self._all
+
+    def filter(self, selected: Dict[str, List[str]], name: Optional[str] = None,
+               year_from: Optional[int] = None, year_to: Optional[int] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[int, List[dict], Dict[str, List[dict]]]:
+        """
+        Filter the games and count the facet values.
+
+        :param selected: facet name -> values, a game must have one of the values of every facet.
+                         E.G: {"api": ["DX12", "Vulkan"], "ssd": ["true"]}
+        :param name: text the game's name must contain (not case-sensitive).
+        :param year_from: earliest release year (inclusive).
+        :param year_to: latest release year (inclusive).
+        :param limit: size of the page.
+        :param offset: matches skipped before the page.
+        :return: the total amount of matches, the page of game documents (browse order), and per facet
+                 its values as {"value", "label", "count"}, counted against the other facets' filters, most games first.
+        """
+        filters: Dict[str, np.ndarray] = {facet: self._facet_bits(facet, values)
+                                          for facet, values in selected.items() if values}
+        if year_from is not None or year_to is not None:
+            years = [key for key in self.facets["year"].keys if key.isdigit()
+                     and (year_from is None or int(key) >= year_from) and (year_to is None or int(key) <= year_to)]
+            year_bits = self._facet_bits("year", years)
+            filters["year"] = filters["year"] & year_bits if "year" in filters else year_bits
+        always = self._name_bits(name) if name else self._all
+
+        matched = always.copy()
+        for bits in filters.values():
+            matched &= bits
+        numbers = np.flatnonzero(np.unpackbits(matched, count=self.size))
+        page = [self.games[number] for number in numbers[offset:offset + limit]]
+
+        facets = {}
+        for facet_name, facet in self.facets.items():
+            # Disjunctive counts: the facet's own filter is left out, so its other values still count
+            base = always.copy()
+            for other, bits in filters.items():
+                if other != facet_name:
+                    base &= bits
+            facets[facet_name] = facet.top(base)
+        return len(numbers), page, facets
+
+
+game_filters_cache: RefreshingCache[GameFilterIndex] = RefreshingCache(GameFilterIndex.from_collection,
+                                                                       "game_filters_ttl_seconds")
+
+
+def _on_games_changed(event: InvalidationEvent):
+    game_filters_cache.invalidate()
+
+
+invalidation_bus.subscribe("games", _on_games_changed)
+
+
+async def get_game_filter_index(
+        collection: AsyncIOMotorCollection = Depends(get_games_collection)) -> GameFilterIndex:
+    """
+    FastAPI dependency returning the current game filter index.
+    """
+    return await game_filters_cache.get(collection)
@@ -0,0 +1,251 @@
+import bisect
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_games_collection
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.refreshing import RefreshingCache
+from backend.utils.genres import genre_keys, normalize_genre
+
+"""
+In-memory full-text search over the games catalog, answering /api/games/search without querying MongoDB.
+
+Names, publishers, developers and genres are tokenised into an inverted index scored with BM25F:
+term frequencies are weighted per field (a name match counts more than a publisher match) and the
+score of every (term, game) pair is computed once when the index is built, and queries add up numpy arrays.
+Every query token must match a game, either exactly, as a prefix of a word ("witch" finds "Witcher")
+or with a typo ("wicther" finds "Witcher"), prefix and typo matches scoring less than exact ones.
+Filters (year range, genre, API, upscaler) are masks over the games, combined with the matches.
+"""
+# Relative weight of a match in each field
+FIELD_WEIGHTS = {"name": 3.0, "publisher": 1.0, "developer": 1.0, "genres": 1.5}
+# BM25 term frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+# Score multipliers of the non exact matches
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+# Words expanded per query token, keeps short prefixes like "s" cheap
+MAX_PREFIX_EXPANSIONS = 100
+# Shortest token matched with typos (1 edit), and the length from which 2 edits are allowed
+MIN_FUZZY_LENGTH = 4
+LONG_TOKEN_LENGTH = 8
+# Words compared with a misspelled token
+MAX_FUZZY_CANDIDATES = 50
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    E.G: "The Witcher 3: Wild Hunt" -> ["the", "witcher", "3", "wild", "hunt"]
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def within_distance(a: str, b: str, max_distance: int) -> bool:
+    """
+    :return: True if a and b are at most max_distance edits apart.
+    An edit inserts, deletes or replaces a character, or swaps two adjacent ones ("wicther" -> "witcher").
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    before_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        # A swap reaches back two rows, so stop only once both rows are too far
+        if min(current) > max_distance and min(previous) > max_distance:
+            return False
+        before_previous, previous = previous, current
+    return previous[-1] <= max_distance
+
+
+def browse_key(game: dict) -> tuple:
+    """
+    Browse order of the games: newest release first, then by name.
+    """
+    return -(game.get("release_date") or 0), str(game.get("name", ""))
+
+
+def _field_values(game: dict, field: str) -> Iterable[str]:
+    value = game.get(field)
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)] if value is not None else []
+
+
+class GameSearchIndex:
+    """
+    Inverted index over every game of the catalog.
+    Games are numbered in browse order (newest release first, then by name), so equal scores rank by number.
+    """
+
+    def __init__(self, games: List[dict]):
+        self.games = sorted(games, key=browse_key)
+        term_frequencies: Dict[str, Dict[int, float]] = defaultdict(dict)
+        lengths = np.zeros(len(self.games))
+        for game_id, game in enumerate(self.games):
+            for field, weight in FIELD_WEIGHTS.items():
+                for value in _field_values(game, field):
+                    for term in tokenize(value):
+                        postings = term_frequencies[term]
+                        postings[game_id] = postings.get(game_id, 0.0) + weight
+                        lengths[game_id] += weight
+
+        # BM25F score of every (term, game) pair, as (game numbers, scores) arrays
+        average_length = lengths.mean() if len(self.games) else 1.0
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, postings in term_frequencies.items():
+            idf = math.log(1 + (len(self.games) - len(postings) + 0.5) / (len(postings) + 0.5))
+            game_ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            scores = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[game_ids] / average_length))
+            self._postings[term] = (game_ids, scores)
+        self._terms = sorted(self._postings)
+        self._trigrams: Dict[str, List[str]] = defaultdict(list)
+        for term in self._terms:
+            for trigram in trigrams(term):
+                self._trigrams[trigram].append(term)
+
+        # Filters
+        self._years = np.array([game["release_date"] if isinstance(game.get("release_date"), int) else -1
+                                for game in self.games], dtype=np.int64)
+        self._by_genre: Dict[str, List[int]] = defaultdict(list)
+        self._by_api: Dict[str, List[int]] = defaultdict(list)
+        self._by_upscaler: Dict[str, List[int]] = defaultdict(list)
+        for game_id, game in enumerate(self.games):
+            # Genres are keyed like the genre_keys field /api/games/category matches
+            for key in genre_keys(_field_values(game, "genres")):
+                self._by_genre[key].append(game_id)
+            for index, field in ((self._by_api, "api_support"), (self._by_upscaler, "upscale_support")):
+                for value in {value.lower() for value in _field_values(game, field)}:
+                    index[value].append(game_id)
+
+    @classmethod
+    async def from_collection(cls, collection: AsyncIOMotorCollection) -> "GameSearchIndex":
+        """
+        :param collection: the games collection.
+        """
+        return cls(await collection.find().to_list(length=None))
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """
+        :param token: one query token.
+        :return: the indexed terms the token matches, with the weight of the match.
+        Typos are only looked for when the token matches no word exactly or as a prefix.
+        """
+        matches = {token: 1.0} if token in self._postings else {}
+        i = bisect.bisect_left(self._terms, token)
+        expanded = 0
+        while i < len(self._terms) and expanded < MAX_PREFIX_EXPANSIONS and self._terms[i].startswith(token):
+            matches.setdefault(self._terms[i], PREFIX_WEIGHT)
+            expanded += 1
+            i += 1
+        if not matches and len(token) >= MIN_FUZZY_LENGTH:
+            max_distance = 2 if len(token) >= LONG_TOKEN_LENGTH else 1
+            shared = Counter(term for trigram in trigrams(token) for term in self._trigrams.get(trigram, []))
+            # Words sharing the most trigrams with the token are the likeliest to be close
+            for term, _ in shared.most_common(MAX_FUZZY_CANDIDATES):
+                if within_distance(token, term, max_distance):
+                    matches[term] = FUZZY_WEIGHT
+        return list(matches.items())
+
+    def _token_scores(self, token: str) -> np.ndarray:
+        """
+        :return: score of every game for the token, 0 where it doesn't match.
+        """
+        scores = np.zeros(len(self.games))
+        for term, weight in self.expand(token):
+            game_ids, term_scores = self._postings[term]
+            scores[game_ids] = np.maximum(scores[game_ids], weight * term_scores)
+        return scores
+
+    def _filtered(self, year_from: Optional[int], year_to: Optional[int], genre: Optional[str],
+                  api: Optional[str], upscaler: Optional[str]) -> np.ndarray:
+        """
+        :return: mask of the games passing every filter.
+        """
+        allowed = np.ones(len(self.games), dtype=bool)
+        if year_from is not None:
+            allowed &= self._years >= year_from
+        if year_to is not None:
+            allowed &= (self._years <= year_to) & (self._years >= 0)
+        for index, value, key in ((self._by_genre, genre, normalize_genre), (self._by_api, api, str.lower),
+                                  (self._by_upscaler, upscaler, str.lower)):
+            if value is not None:
+                matching = np.zeros(len(self.games), dtype=bool)
+                matching[index.get(key(value), [])] = True
+                allowed &= matching
+        return allowed
+
+    def search(self, query: Optional[str] = None, year_from: Optional[int] = None, year_to: Optional[int] = None,
+               genre: Optional[str] = None, api: Optional[str] = None, upscaler: Optional[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[int, List[dict]]:
+        """
+        Rank the games matching every token of the query and passing every filter.
+
+        :param query: free text, E.G "witcher cd projekt". Without it the filtered games are listed newest first.
+        :param year_from: earliest release year (inclusive).
+        :param year_to: latest release year (inclusive).
+        :param genre: genre the games must have (not case-sensitive). E.G RPG
+        :param api: graphics API the games must support. E.G DX12
+        :param upscaler: upscaler the games must support. E.G DLSS
+        :param limit: size of the page.
+        :param offset: matches skipped before the page.
+        :return: the total amount of matches and the page of game documents, best first.
+        """
+        matched = self._filtered(year_from, year_to, genre, api, upscaler)
+        scores = np.zeros(len(self.games))
+        # Every token must match
+        for token in tokenize(query or ""):
+            token_scores = self._token_scores(token)
+            matched &= token_scores > 0
+            scores += token_scores
+        game_ids = np.flatnonzero(matched)
+        end = offset + limit
+        if end < len(game_ids):
+            # Only sort the games scoring at least as much as the last one of the page
+            threshold = np.partition(scores[game_ids], len(game_ids) - end)[len(game_ids) - end]
+            candidates = game_ids[scores[game_ids] >= threshold]
+        else:
+            candidates = game_ids
+        # Best score first, ties in browse order
+        page = candidates[np.lexsort((candidates, -scores[candidates]))][offset:end]
+        return len(game_ids), [self.games[game_id] for game_id in page]
+
+
+game_search_cache: RefreshingCache[GameSearchIndex] = RefreshingCache(GameSearchIndex.from_collection,
+                                                                      "game_search_ttl_seconds")
+
+
+def _on_games_changed(event: InvalidationEvent):
+    game_search_cache.invalidate()
+
+
+invalidation_bus.subscribe("games", _on_games_changed)
+
+
+async def get_game_search_index(
+        collection: AsyncIOMotorCollection = Depends(get_games_collection)) -> GameSearchIndex:
+    """
+    FastAPI dependency returning the current game search index.
+    """
+    return await game_search_cache.get(collection)
@@ -0,0 +1,117 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_games_collection
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.refreshing import RefreshingCache
+from backend.utils.genres import normalize_genre
+
+"""
+In-memory genre facet: how many games have each genre, answering GET /api/games/genres without querying MongoDB.
+
+The index is built once from the games' genres, then kept up to date one game at a time from the
+invalidation feed (inserted, updated, replaced and deleted games). Whole-collection invalidations
+(polling, scripts) rebuild it.
+"""
+# Change stream operations applied to the index one game at a time
+DOCUMENT_OPERATIONS = ("insert", "update", "replace")
+
+
+class GenreFacetIndex:
+    """
+    Genre counts of the games, with the genres of every game so a change can be undone.
+    """
+
+    def __init__(self, games: List[dict]):
+        """
+        :param games: game documents, only _id and genres are read.
+        """
+        # Normalised genres of every game with their spelling, by _id
+        self._game_genres: Dict[Any, Dict[str, str]] = {}
+        self._counts: Counter = Counter()
+        # Spellings of every normalised genre ("RPG", "rpg"), the most used one is its label
+        self._spellings: Dict[str, Counter] = {}
+        for game in games:
+            self.add(game)
+
+    @classmethod
+    async def from_collection(cls, collection: AsyncIOMotorCollection) -> "GenreFacetIndex":
+        """
+        :param collection: the games collection.
+        """
+        return cls(await collection.find({}, {"genres": 1}).to_list(length=None))
+
+    def add(self, game: dict):
+        """
+        Count a game, replacing its previous genres if it was already counted.
+        """
+        self.remove(game["_id"])
+        spellings = {}
+        for genre in game.get("genres") or []:
+            if isinstance(genre, str) and genre.strip():
+                spellings.setdefault(normalize_genre(genre), genre.strip())
+        self._game_genres[game["_id"]] = spellings
+        for key, spelling in spellings.items():
+            self._counts[key] += 1
+            self._spellings.setdefault(key, Counter())[spelling] += 1
+
+    def remove(self, game_id):
+        """
+        Stop counting a game (nothing happens if it wasn't counted).
+        """
+        for key, spelling in self._game_genres.pop(game_id, {}).items():
+            self._counts[key] -= 1
+            self._spellings[key][spelling] -= 1
+            if self._spellings[key][spelling] <= 0:
+                del self._spellings[key][spelling]
+            if self._counts[key] <= 0:
+                del self._counts[key]
+                del self._spellings[key]
+
+    def apply(self, event: InvalidationEvent) -> bool:
+        """
+        :param event: change of the games collection.
+        :return: False if the event can't be applied one game at a time and the index must be rebuilt.
+        """
+        if event.operation == "delete" and event.document_id is not None:
+            self.remove(event.document_id)
+            return True
+        if event.operation in DOCUMENT_OPERATIONS and event.document is not None:
+            self.add(event.document)
+            return True
+        return False
+
+    def facets(self, prefix: Optional[str] = None) -> List[dict]:
+        """
+        :param prefix: only the genres starting with it (not case-sensitive).
+        :return: {"genre": normalised genre, "label": display name, "count": amount of games}, most games first.
+        """
+        key_prefix = normalize_genre(prefix) if prefix else ""
+        return [{"genre": key, "label": self._spellings[key].most_common(1)[0][0], "count": count}
+                for key, count in sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+                if key.startswith(key_prefix)]
+
+
+genre_facets_cache: RefreshingCache[GenreFacetIndex] = RefreshingCache(GenreFacetIndex.from_collection,
+                                                                       "genre_facets_ttl_seconds")
+
+
+def _on_games_changed(event: InvalidationEvent):
+    def apply(index: GenreFacetIndex):
+        if not index.apply(event):
+            genre_facets_cache.invalidate()
+
+    genre_facets_cache.update(apply)
+
+
+invalidation_bus.subscribe("games", _on_games_changed)
+
+
+async def get_genre_facets(collection: AsyncIOMotorCollection = Depends(get_games_collection)) -> GenreFacetIndex:
+    """
+    FastAPI dependency returning the current genre facet index.
+    """
+    return await genre_facets_cache.get(collection)
@@ -0,0 +1,223 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Set
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.config import get_settings
+from backend.app.database import get_hardware_collection
+from backend.services.invalidation import invalidation_bus
+
+"""
+Process-local catalog of the hardware collection.
+The catalog changes rarely, so it is loaded once (on startup or on first use) and every CPU/GPU route
+is answered from in-memory indexes instead of a regex scan of the collection.
+"""
+logger = logging.getLogger(__name__)
+
+HARDWARE_TYPES = ("cpu", "gpu")
+# Header every hardware response carries so clients can tell when their copy is stale
+CATALOG_VERSION_HEADER = "X-Catalog-Version"
+# After a failed reload, keep serving the old snapshot this long before trying the DB again
+RELOAD_RETRY_SECONDS = 30
+
+_TOKEN_PATTERN = re.compile(r"[a-z]+|\d+")
+
+
+def model_tokens(text: str) -> List[str]:
+    """
+    Split a model name into lower-case letter and digit runs.
+    E.G: "GeForce RTX 4060TI (16GB)" -> ["geforce", "rtx", "4060", "ti", "16", "gb"]
+
+    :param text: model or full name of the hardware.
+    :return: list of normalized tokens.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the hardware collection at one point in time, with its lookup indexes.
+    """
+
+    def __init__(self, docs_by_type: Dict[str, List[dict]]):
+        self.loaded_at = time.monotonic()
+        self._by_type: Dict[str, List[dict]] = {type_: list(docs_by_type.get(type_, [])) for type_ in HARDWARE_TYPES}
+        self._by_id: Dict[str, dict] = {}
+        self._by_brand: Dict[str, Dict[str, List[dict]]] = {}
+        self._token_ids: Dict[str, Dict[str, Set[str]]] = {}
+        self._sorted_tokens: Dict[str, List[str]] = {}
+
+        digest = hashlib.sha1()
+        for type_, docs in self._by_type.items():
+            brands: Dict[str, List[dict]] = {}
+            token_ids: Dict[str, Set[str]] = {}
+            for doc in docs:
+                doc_id = str(doc["_id"])
+                self._by_id[doc_id] = doc
+                brands.setdefault(doc.get("brand", "").lower(), []).append(doc)
+                for token in model_tokens(f'{doc.get("model", "")} {doc.get("fullname", "")}'):
+                    token_ids.setdefault(token, set()).add(doc_id)
+                digest.update(f'{type_}|{doc_id}|{doc.get("brand")}|{doc.get("model")}|'
+                              f'{doc.get("fullname")}|{doc.get("type")}\n'.encode())
+            self._by_brand[type_] = brands
+            self._token_ids[type_] = token_ids
+            self._sorted_tokens[type_] = sorted(token_ids)
+        self.version = digest.hexdigest()[:16]
+
+    def all(self, type_: str) -> List[dict]:
+        """
+        :param type_: "cpu" or "gpu"
+        :return: every hardware document of the given type.
+        """
+        return self._by_type[type_]
+
+    def get(self, hardware_id: str) -> Optional[dict]:
+        """
+        :param hardware_id: MongoDB id of the hardware as a string.
+        :return: the hardware document, None if it isn't in the catalog.
+        """
+        return self._by_id.get(hardware_id)
+
+    def by_brand(self, type_: str, brand: str) -> List[dict]:
+        """
+        :param type_: "cpu" or "gpu"
+        :param brand: brand name (not case-sensitive). E.G: AMD
+        :return: hardware of the given type and brand.
+        """
+        return self._by_brand[type_].get(brand.lower(), [])
+
+    def by_model(self, type_: str, model: str) -> List[dict]:
+        """
+        Every token of the given model must be a prefix of a token of the hardware's model or full name.
+        E.G: "4060ti", "rtx 4060 ti" and "RTX4060 Ti" all match "GeForce RTX 4060TI (16GB)".
+
+        :param type_: "cpu" or "gpu"
+        :param model: model as typed by the user.
+        :return: matching hardware in catalog order.
+        """
+        query_tokens = model_tokens(model)
+        if not query_tokens:
+            return []
+        matching_ids: Optional[Set[str]] = None
+        for token in query_tokens:
+            token_ids = self._ids_with_prefix(type_, token)
+            matching_ids = token_ids if matching_ids is None else matching_ids & token_ids
+            if not matching_ids:
+                return []
+        return [doc for doc in self._by_type[type_] if str(doc["_id"]) in matching_ids]
+
+    def _ids_with_prefix(self, type_: str, prefix: str) -> Set[str]:
+        sorted_tokens = self._sorted_tokens[type_]
+        token_ids = self._token_ids[type_]
+        ids: Set[str] = set()
+        i = bisect.bisect_left(sorted_tokens, prefix)
+        while i < len(sorted_tokens) and sorted_tokens[i].startswith(prefix):
+            ids |= token_ids[sorted_tokens[i]]
+            i += 1
+        return ids
+
+
+class HardwareCatalog:
+    """
+    Holds the current CatalogSnapshot and reloads it from the DB when it is older than the TTL
+    or was invalidated on demand.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self._ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._stale = False
+        self._failed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._ttl_seconds if self._ttl_seconds is not None else get_settings().hardware_catalog_ttl_seconds
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def is_fresh(self) -> bool:
+        return (self._snapshot is not None and not self._stale
+                and time.monotonic() - self._snapshot.loaded_at < self.ttl_seconds)
+
+    async def refresh(self, collection: AsyncIOMotorCollection) -> CatalogSnapshot:
+        """
+        Load every CPU and GPU from the DB and swap in a new snapshot.
+
+        :param collection: the hardware collection.
+        :return: the new snapshot.
+        """
+        # Invalidations arriving while we load mark the new snapshot stale again
+        self._stale = False
+        docs_by_type = {}
+        for type_ in HARDWARE_TYPES:
+            type_regex = {"$regex": re.compile(type_, re.IGNORECASE)}
+            docs_by_type[type_] = await collection.find({"type": type_regex}).to_list(length=None) or []
+        self._snapshot = CatalogSnapshot(docs_by_type)
+        return self._snapshot
+
+    async def get(self, collection: AsyncIOMotorCollection) -> CatalogSnapshot:
+        """
+        Return the current snapshot, reloading it first if it expired.
+        If the reload fails while an older snapshot exists, the older one keeps being served.
+
+        :param collection: the hardware collection.
+        :return: current snapshot.
+        """
+        if self.is_fresh() or self._retry_pending():
+            return self._snapshot
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self.is_fresh():
+                return self._snapshot
+            try:
+                snapshot = await self.refresh(collection)
+                self._failed_at = None
+                return snapshot
+            except Exception as e:
+                self._stale = True
+                if self._snapshot is None:
+                    raise
+                self._failed_at = time.monotonic()
+                logger.warning("Reloading hardware catalog failed, serving version %s: %s",
+                               self._snapshot.version, e)
+                return self._snapshot
+
+    def _retry_pending(self) -> bool:
+        return (self._snapshot is not None and self._failed_at is not None
+                and time.monotonic() - self._failed_at < RELOAD_RETRY_SECONDS)
+
+    def invalidate(self):
+        """
+        Mark the catalog stale so the next request reloads it.
+        """
+        self._stale = True
+
+    def clear(self):
+        """
+        Drop the snapshot entirely (used by tests).
+        """
+        self._snapshot = None
+        self._stale = False
+        self._failed_at = None
+
+
+hardware_catalog = HardwareCatalog()
+# Writes to the hardware collection (E.G by scripts/hardware) reload the catalog on the next request
+invalidation_bus.subscribe("hardware", lambda event: hardware_catalog.invalidate())
+
+
+async def get_hardware_catalog(
+        collection: AsyncIOMotorCollection = Depends(get_hardware_collection)) -> CatalogSnapshot:
+    """
+    FastAPI dependency returning the current hardware catalog snapshot.
+    """
+    return await hardware_catalog.get(collection)
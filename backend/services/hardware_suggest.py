@@ -0,0 +1,141 @@
+import bisect
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend.services.hardware_catalog import HARDWARE_TYPES, CatalogSnapshot, model_tokens
+
+"""
+Autocomplete index over the hardware catalog.
+Names are compacted to lower-case letters and digits only, so "4060ti", "rtx 4060 ti" and
+"GeForce RTX 4060TI (16GB)" all land on the same keys. Lookups go through a sorted array of keys
+(prefix matches) and fall back to a trigram map (typos, missing characters).
+"""
+# Minimal share of the query's trigrams a name must contain to be suggested as a fuzzy match
+MIN_TRIGRAM_SIMILARITY = 0.5
+# Upper bound of prefix matches examined per query, keeps short queries like "r" cheap
+MAX_PREFIX_CANDIDATES = 500
+
+# Scores of the match kinds, higher is better
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+TOKEN_PREFIX_SCORE = 1.5
+
+
+def compact(text: str) -> str:
+    """
+    E.G: "GeForce RTX 4060TI (16GB)" -> "geforcertx4060ti16gb"
+
+    :param text: any hardware name or user input.
+    :return: lower-case letters and digits of the text only.
+    """
+    return "".join(model_tokens(text))
+
+
+def trigrams(text: str) -> List[str]:
+    """
+    :param text: compacted text.
+    :return: every 3 character substring of the text.
+    """
+    return [text[i:i + 3] for i in range(len(text) - 2)]
+
+
+class SuggestIndex:
+    """
+    Prefix and trigram index over every CPU/GPU of one catalog snapshot.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.version = snapshot.version
+        # entry = (hardware type, document, compacted model, compacted full name)
+        self._entries: List[Tuple[str, dict, str, str]] = []
+        keys: List[Tuple[str, int, float]] = []
+        self._trigrams: Dict[str, Set[int]] = {}
+        for type_ in HARDWARE_TYPES:
+            for doc in snapshot.all(type_):
+                entry_id = len(self._entries)
+                model = compact(doc.get("model", ""))
+                fullname = compact(doc.get("fullname", ""))
+                self._entries.append((type_, doc, model, fullname))
+                for trigram in set(trigrams(model)) | set(trigrams(fullname)):
+                    self._trigrams.setdefault(trigram, set()).add(entry_id)
+                for name in {model, fullname}:
+                    if not name:
+                        continue
+                    keys.append((name, entry_id, PREFIX_SCORE))
+                    # Every suffix starting at a token boundary, so "4060ti" finds "rtx4060ti"
+                    tokens = model_tokens(doc.get("model", "") if name == model else doc.get("fullname", ""))
+                    offset = 0
+                    for token in tokens[:-1]:
+                        offset += len(token)
+                        keys.append((name[offset:], entry_id, TOKEN_PREFIX_SCORE))
+        keys.sort()
+        self._keys = [key for key, _, _ in keys]
+        self._key_entries = [(entry_id, score) for _, entry_id, score in keys]
+
+    def suggest(self, query: str, type_: Optional[str] = None, limit: int = 10) -> List[Tuple[dict, str, float]]:
+        """
+        Rank the hardware names matching the query.
+
+        :param query: user input, any spacing and casing.
+        :param type_: "cpu" or "gpu" to restrict the results, None for both.
+        :param limit: maximal amount of suggestions.
+        :return: list of (hardware document, hardware type, score) sorted from best to worst.
+        """
+        q = compact(query)
+        if not q or limit <= 0:
+            return []
+        scores: Dict[int, float] = {}
+
+        # Prefix matches from the sorted key array, exact matches (the key equal to the query) come first
+        i = bisect.bisect_left(self._keys, q)
+        examined = 0
+        while i < len(self._keys) and examined < MAX_PREFIX_CANDIDATES and self._keys[i].startswith(q):
+            entry_id, score = self._key_entries[i]
+            i += 1
+            if type_ is not None and self._entries[entry_id][0] != type_:
+                continue
+            _, _, model, fullname = self._entries[entry_id]
+            if q == model or q == fullname:
+                score = EXACT_SCORE
+            if score > scores.get(entry_id, 0.0):
+                scores[entry_id] = score
+            examined += 1
+            # Keys of the other type aren't examined, stop once the page is full of the requested one
+            if type_ is not None and len(scores) >= limit:
+                break
+
+        # Fuzzy matches only when prefixes didn't fill the page
+        query_trigrams = set(trigrams(q))
+        if len(scores) < limit and query_trigrams:
+            postings = sorted((self._trigrams.get(trigram, set()) for trigram in query_trigrams), key=len)
+            needed = math.ceil(MIN_TRIGRAM_SIMILARITY * len(postings))
+            # A name sharing `needed` trigrams must appear in at least one of the rarest len - needed + 1 lists
+            candidates = set().union(*postings[:len(postings) - needed + 1])
+            for entry_id in candidates:
+                if entry_id in scores or (type_ is not None and self._entries[entry_id][0] != type_):
+                    continue
+                similarity = sum(entry_id in posting for posting in postings) / len(postings)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    scores[entry_id] = similarity
+
+        # Best score first, then the shortest (most specific) name
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self._entries[item[0]][3]),
+                                                          self._entries[item[0]][3]))
+        return [(self._entries[entry_id][1], self._entries[entry_id][0], score)
+                for entry_id, score in ranked[:limit]]
+
+
+_cached_index: Optional[SuggestIndex] = None
+
+
+def get_suggest_index(snapshot: CatalogSnapshot) -> SuggestIndex:
+    """
+    The index is rebuilt only when the catalog was reloaded with different content.
+
+    :param snapshot: current hardware catalog snapshot.
+    :return: suggestion index of the snapshot.
+    """
+    global _cached_index
+    if _cached_index is None or _cached_index.version != snapshot.version:
+        _cached_index = SuggestIndex(snapshot)
+    return _cached_index
@@ -0,0 +1,133 @@
+import asyncio
+import json
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING
+
+from backend.models.game import GAME_CARD_FIELDS, GameCard
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.response_cache import make_etag
+from backend.services.row_config import LoadedFile
+from backend.utils.genres import genre_filter
+from backend.utils.serialization import ModelSerializer, dumps
+
+"""
+Home page rows resolved on the server: GET /api/games/home returns every row of the row config
+(backend/config/row-config.json) with its games, instead of the frontend calling the row's fetch_url once per row.
+
+The queries of the rows run concurrently and return game cards. The result is kept serialised in memory
+until the games change (invalidation feed) or the row config is reloaded.
+"""
+# Most games of a single row
+MAX_ROW_SIZE = 100
+NEWLY_ADDED_DEFAULT_LIMIT = 10
+
+card_serializer = ModelSerializer(GameCard)
+CARD_PROJECTION = {field: 1 for field in GAME_CARD_FIELDS}
+
+
+class RowQuery(NamedTuple):
+    filter: dict
+    sort: Optional[list]
+    limit: Optional[int]
+
+
+def _newly_added_query(params: dict) -> RowQuery:
+    return RowQuery({}, [("created_at", DESCENDING)], params.get("limit", NEWLY_ADDED_DEFAULT_LIMIT))
+
+
+def _category_query(params: dict) -> RowQuery:
+    # Same match as GET /games/category
+    return RowQuery(genre_filter(params["genre"], params.get("prefix", False)), None, params.get("limit"))
+
+
+def _all_games_query(params: dict) -> RowQuery:
+    return RowQuery({}, [("_id", ASCENDING)], params.get("limit"))
+
+
+# Query of the route each row's fetch_url points to
+ROW_QUERIES: Dict[str, Callable[[dict], RowQuery]] = {
+    "/games/newly_added": _newly_added_query,
+    "/games/category": _category_query,
+    "/games/": _all_games_query,
+    "/games": _all_games_query,
+}
+
+
+async def fetch_row(collection: AsyncIOMotorCollection, row: dict) -> dict:
+    """
+    :param collection: the games collection.
+    :param row: row of the row config. E.G: {"row_id": "rpg", "fetch_url": "/games/category", "params": {...}}
+    :return: the row with its game cards under "games".
+    Rows of an unknown fetch_url get "games": None so the frontend can still fetch them itself.
+    """
+    make_query = ROW_QUERIES.get(row.get("fetch_url"))
+    if make_query is None:
+        return {**row, "games": None}
+    query = make_query(row.get("params") or {})
+    limit = min(query.limit or MAX_ROW_SIZE, MAX_ROW_SIZE)
+    cursor = collection.find(query.filter, CARD_PROJECTION)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    games = await cursor.limit(limit).to_list(length=limit)
+    return {**row, "games": card_serializer.documents(games)}
+
+
+async def build_home(collection: AsyncIOMotorCollection, rows: List[dict]) -> bytes:
+    """
+    :param collection: the games collection.
+    :param rows: the row config.
+    :return: JSON of every row with its games, in the row config's order.
+    """
+    return dumps(list(await asyncio.gather(*(fetch_row(collection, row) for row in rows))))
+
+
+class HomeCache:
+    """
+    Serialised home rows of the current row config, dropped when the games change.
+    """
+
+    def __init__(self):
+        self._config_etag: Optional[str] = None
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        # Bumped by every invalidation, rows built before one aren't stored
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self, collection: AsyncIOMotorCollection, config: LoadedFile) -> Tuple[bytes, str]:
+        """
+        :param collection: the games collection.
+        :param config: the current row config (see backend.services.row_config).
+        :return: the JSON of the rows and its ETag, built first if needed.
+        :raises: ValueError: if the row config isn't a list of rows.
+        """
+        if self._body is not None and self._config_etag == config.etag:
+            return self._body, self._etag
+        async with self._lock:
+            # Another request may have built them while we waited for the lock
+            if self._body is None or self._config_etag != config.etag:
+                rows = json.loads(config.body)
+                if not isinstance(rows, list):
+                    raise ValueError("the row config must be a list of rows")
+                generation = self._generation
+                body = await build_home(collection, rows)
+                if generation != self._generation:
+                    return body, make_etag(body)
+                self._body, self._etag, self._config_etag = body, make_etag(body), config.etag
+        return self._body, self._etag
+
+    def invalidate(self):
+        self._body = None
+        self._generation += 1
+
+
+home_cache = HomeCache()
+
+
+def _on_games_changed(event: InvalidationEvent):
+    home_cache.invalidate()
+
+
+invalidation_bus.subscribe("games", _on_games_changed)
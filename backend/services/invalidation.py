@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+
+from backend.app.config import get_settings
+
+"""
+Tells the in-process caches about writes made anywhere (E.G by the scripts in scripts/games and scripts/hardware).
+
+The ChangeFeed task, started in the app's lifespan, follows a MongoDB change stream over the watched
+collections and publishes an InvalidationEvent per change on the invalidation_bus. Change streams need a
+replica set; on a standalone server the feed polls the versions writers bump with publish_invalidation()
+instead and publishes a whole-collection event when one changes.
+
+Caches subscribe per collection, E.G:
+    invalidation_bus.subscribe("hardware", lambda event: hardware_catalog.invalidate())
+"""
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS_COLLECTION = "cache_invalidations"
+WATCHED_COLLECTIONS = ("games", "hardware", "game_requirements", "game_setups")
+# Operation of the events published by the polling fallback - the whole collection may have changed
+INVALIDATE_ALL = "invalidate"
+# Wait before reopening a change stream that failed
+RETRY_SECONDS = 5
+
+
+class InvalidationEvent(NamedTuple):
+    collection: str
+    # Change stream operationType (insert, update, replace, delete...) or INVALIDATE_ALL
+    operation: str
+    document_id: Any = None
+    # Document after the change, when the change stream could look it up
+    document: Optional[dict] = None
+    # updateDescription of an update (updatedFields, removedFields, truncatedArrays)
+    changes: Optional[dict] = None
+
+
+class InvalidationBus:
+    """
+    Dispatches invalidation events to the callbacks subscribed to their collection.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[InvalidationEvent], None]]] = defaultdict(list)
+
+    def subscribe(self, collections: Union[str, Iterable[str]], callback: Callable[[InvalidationEvent], None]):
+        """
+        :param collections: name (or names) of the collections the callback cares about.
+        :param callback: called with every InvalidationEvent of these collections.
+        """
+        for collection in ([collections] if isinstance(collections, str) else collections):
+            self._subscribers[collection].append(callback)
+
+    def unsubscribe(self, collections: Union[str, Iterable[str]], callback: Callable[[InvalidationEvent], None]):
+        for collection in ([collections] if isinstance(collections, str) else collections):
+            if callback in self._subscribers.get(collection, []):
+                self._subscribers[collection].remove(callback)
+
+    def publish(self, event: InvalidationEvent):
+        for callback in self._subscribers.get(event.collection, []):
+            try:
+                callback(event)
+            except Exception as e:
+                # One broken cache must not stop the others from being invalidated
+                logger.error("Invalidation callback failed for %s: %s", event, e)
+
+
+invalidation_bus = InvalidationBus()
+
+
+async def publish_invalidation(db: AsyncIOMotorDatabase, *collections: str):
+    """
+    Invalidate the caches of the given collections in every app process, E.G after a script's writes.
+    Needed when the app polls (no change streams), harmless otherwise.
+
+    :param db: the application's database.
+    :param collections: names of the written collections. E.G "games"
+    """
+    for collection in collections:
+        invalidation_bus.publish(InvalidationEvent(collection, INVALIDATE_ALL))
+        await db[INVALIDATIONS_COLLECTION].update_one(
+            {"_id": collection}, {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}}, upsert=True)
+
+
+def to_event(change: dict) -> InvalidationEvent:
+    """
+    :param change: change stream document.
+    """
+    return InvalidationEvent(collection=change["ns"]["coll"],
+                             operation=change["operationType"],
+                             document_id=change.get("documentKey", {}).get("_id"),
+                             document=change.get("fullDocument"),
+                             changes=change.get("updateDescription"))
+
+
+class ChangeFeed:
+    """
+    Background task publishing the changes of the watched collections on an InvalidationBus.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, bus: InvalidationBus = invalidation_bus,
+                 collections: Iterable[str] = WATCHED_COLLECTIONS):
+        self.db = db
+        self.bus = bus
+        self.collections = tuple(collections)
+        self._resume_token = None
+        self._versions: Optional[Dict[str, int]] = None
+
+    async def run(self):
+        """
+        Follow the change stream until cancelled, falling back to polling when change streams are unavailable.
+        """
+        while True:
+            try:
+                await self.follow_changes()
+            except (OperationFailure, NotImplementedError) as e:
+                logger.info("Change streams unavailable (%s), polling %s instead", e, INVALIDATIONS_COLLECTION)
+                await self.poll()
+            except Exception as e:
+                logger.warning("Change stream failed, reopening in %s seconds: %s", RETRY_SECONDS, e)
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def follow_changes(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.collections)}}}]
+        async with self.db.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+            async for change in stream:
+                self._resume_token = change["_id"]
+                self.bus.publish(to_event(change))
+
+    async def poll_once(self):
+        """
+        Publish an INVALIDATE_ALL event for every collection whose version changed since the last poll.
+        """
+        versions = {}
+        async for doc in self.db[INVALIDATIONS_COLLECTION].find({"_id": {"$in": list(self.collections)}}):
+            versions[doc["_id"]] = doc.get("version", 0)
+        # The first poll only records where the versions start
+        if self._versions is not None:
+            for collection, version in versions.items():
+                if self._versions.get(collection, 0) != version:
+                    self.bus.publish(InvalidationEvent(collection, INVALIDATE_ALL))
+        self._versions = versions
+
+    async def poll(self):
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.warning("Could not poll %s: %s", INVALIDATIONS_COLLECTION, e)
+            await asyncio.sleep(get_settings().invalidation_poll_seconds)
@@ -0,0 +1,49 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+"""
+Leases electing the single process that runs a background task, when the app runs several workers.
+
+A lease is one document of the leases collection: {_id: task name, owner, expires_at}. Its owner renews it
+well before it expires, any other process takes it over once it has expired (E.G its owner was stopped).
+"""
+LEASES_COLLECTION = "leases"
+LEASE_SECONDS = 60
+
+
+class LeaderLease:
+    """
+    Lease of one task held by this process or another one.
+    """
+
+    def __init__(self, name: str, seconds: float = LEASE_SECONDS):
+        """
+        :param name: name of the task. E.G "matrix_maintainer"
+        :param seconds: time the lease lasts without being renewed.
+        """
+        self.name = name
+        self.seconds = seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self, collection: AsyncIOMotorCollection) -> bool:
+        """
+        Take the lease if it is free or expired, renew it if this process holds it.
+
+        :param collection: the leases collection.
+        :return: True if this process holds the lease.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            # When another process holds the lease the filter matches nothing and the upsert hits its _id
+            await collection.update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.seconds)}},
+                upsert=True)
+        except DuplicateKeyError:
+            return False
+        return True
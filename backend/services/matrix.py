@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_leases_collection, get_matrix_collection, get_requirements_collection
+from backend.services.invalidation import INVALIDATE_ALL, RETRY_SECONDS, InvalidationEvent, invalidation_bus
+from backend.services.leases import LeaderLease
+from backend.services.setups import REQUIREMENTS_COLLECTIONS, is_flat_storage
+
+"""
+Materialized "can you run it" matrix: one game_matrices document per (game, cpu, gpu) holding every
+verified setup of the pair, for every resolution and setting, sorted by resolution, setting and RAM.
+GET /api/req/matrix answers a whole rig in a single indexed read instead of one get_requirement per cell.
+
+Matrices are built by an aggregation pipeline over the setups (embedded or flat layout) merged into
+game_matrices. The MatrixMaintainer task, started in the app's lifespan, rebuilds the matrices of every
+game whose setups change (from the invalidation feed). It runs in every worker but only the one holding
+the "matrix_maintainer" lease rebuilds, starting with every matrix when it takes the lease (E.G on startup).
+Build them all by hand with:
+    python -m scripts.games.build_matrices
+"""
+logger = logging.getLogger(__name__)
+
+MATRIX_COLLECTION = "game_matrices"
+MATRIX_KEY_FIELDS = ("game_id", "cpu_id", "gpu_id")
+# Wait after a change before rebuilding, so a burst of writes (E.G a bulk import) rebuilds once
+REBUILD_DELAY_SECONDS = 1.0
+# Interval between two renewals of the maintainer's lease (or attempts to take it)
+LEASE_RENEW_SECONDS = 10
+
+
+def matrix_pipeline(built_at: datetime, game_ids: Optional[List] = None, flat: Optional[bool] = None) -> List[dict]:
+    """
+    Aggregation grouping the verified setups into one matrix document per game, cpu and gpu.
+
+    :param built_at: stamp of the build, matrices not rebuilt by it are stale.
+    :param game_ids: games to build, all of them if None.
+    :param flat: True to read the flat game_setups layout, defaults to the requirements_storage setting.
+    :return: the pipeline stages (without the final $merge).
+    """
+    flat = is_flat_storage() if flat is None else flat
+    setup = "$" if flat else "$setups."
+    stages: List[dict] = []
+    if game_ids is not None:
+        stages.append({"$match": {"game_id": {"$in": list(game_ids)}}})
+    if not flat:
+        stages.append({"$unwind": "$setups"})
+    stages += [
+        {"$match": {f"{setup[1:]}verified": True}},
+        {"$sort": {"resolution": 1, "setting_name": 1, f"{setup[1:]}ram": 1}},
+        {"$group": {
+            "_id": {"game_id": "$game_id", "cpu_id": f"{setup}cpu_id", "gpu_id": f"{setup}gpu_id"},
+            "cells": {"$push": {"resolution": "$resolution", "setting_name": "$setting_name",
+                                "ram": f"{setup}ram", "fps": f"{setup}fps", "taken_by": f"{setup}taken_by",
+                                "notes": f"{setup}notes"}},
+        }},
+        {"$project": {"_id": 0, "game_id": "$_id.game_id", "cpu_id": "$_id.cpu_id", "gpu_id": "$_id.gpu_id",
+                      "cells": 1, "built_at": {"$literal": built_at}}},
+    ]
+    return stages
+
+
+async def build_matrices(source: AsyncIOMotorCollection, matrices: AsyncIOMotorCollection,
+                         game_ids: Optional[List] = None):
+    """
+    Rebuild the matrices of the given games, and drop the ones of pairs without verified setups anymore.
+
+    :param source: collection the setups are stored in (see get_requirements_collection).
+    :param matrices: the game_matrices collection.
+    :param game_ids: games to rebuild, all of them if None.
+    """
+    built_at = datetime.now(timezone.utc)
+    pipeline = matrix_pipeline(built_at, game_ids) + [
+        {"$merge": {"into": matrices.name, "on": list(MATRIX_KEY_FIELDS),
+                    "whenMatched": "replace", "whenNotMatched": "insert"}}]
+    await source.aggregate(pipeline).to_list(length=None)
+    stale = {"built_at": {"$lt": built_at}}
+    if game_ids is not None:
+        stale["game_id"] = {"$in": list(game_ids)}
+    await matrices.delete_many(stale)
+
+
+def best_cells(matrix_doc: dict, ram: int) -> List[dict]:
+    """
+    :param matrix_doc: game_matrices document.
+    :param ram: RAM of the rig in GB.
+    :return: per resolution and setting, the setup with the most RAM still within the rig's RAM.
+    """
+    best: Dict[tuple, dict] = {}
+    # Cells are sorted by RAM within each resolution and setting, the last fitting one wins
+    for cell in matrix_doc["cells"]:
+        if cell["ram"] <= ram:
+            best[(cell["resolution"], cell["setting_name"])] = cell
+    return list(best.values())
+
+
+class MatrixMaintainer:
+    """
+    Background task rebuilding the matrices of the games whose setups changed, in the process holding its lease.
+    """
+
+    def __init__(self, lease: Optional[LeaderLease] = None):
+        self._pending: Set = set()
+        self._rebuild_all = False
+        self._changed = asyncio.Event()
+        self._lease = lease or LeaderLease("matrix_maintainer")
+        self.is_leader = False
+
+    def on_change(self, event: InvalidationEvent):
+        game_id = (event.document or {}).get("game_id")
+        # Whole collection invalidations and deletes (no document left to read the game from) rebuild everything
+        if event.operation == INVALIDATE_ALL or game_id is None:
+            self._rebuild_all = True
+        else:
+            self._pending.add(game_id)
+        self._changed.set()
+
+    async def rebuild_pending(self):
+        game_ids = None if self._rebuild_all else list(self._pending)
+        self._rebuild_all = False
+        self._pending.clear()
+        try:
+            await build_matrices(get_requirements_collection(), get_matrix_collection(), game_ids)
+        except Exception:
+            # Keep the games pending for the next attempt
+            if game_ids is None:
+                self._rebuild_all = True
+            else:
+                self._pending.update(game_ids)
+            self._changed.set()
+            raise
+
+    async def check_lease(self) -> bool:
+        """
+        Take or renew the lease. Taking it schedules a rebuild of every matrix: they were never built (startup)
+        or the previous holder may have stopped before rebuilding its last changes.
+        Other processes drop their pending changes, the holder rebuilds them.
+
+        :return: True if this process holds the lease.
+        """
+        try:
+            leader = await self._lease.acquire(get_leases_collection())
+        except Exception as e:
+            logger.error("Could not check the matrix maintainer's lease: %s", e)
+            leader = False
+        if leader and not self.is_leader:
+            self._rebuild_all = True
+            self._changed.set()
+        elif not leader:
+            self._rebuild_all = False
+            self._pending.clear()
+            self._changed.clear()
+        self.is_leader = leader
+        return leader
+
+    async def run(self):
+        """
+        Rebuild matrices after setup changes until cancelled.
+        """
+        invalidation_bus.subscribe(REQUIREMENTS_COLLECTIONS, self.on_change)
+        try:
+            while True:
+                if not await self.check_lease():
+                    await asyncio.sleep(LEASE_RENEW_SECONDS)
+                    continue
+                try:
+                    await asyncio.wait_for(self._changed.wait(), LEASE_RENEW_SECONDS)
+                except asyncio.TimeoutError:
+                    continue
+                await asyncio.sleep(REBUILD_DELAY_SECONDS)
+                self._changed.clear()
+                try:
+                    await self.rebuild_pending()
+                except Exception as e:
+                    logger.error("Could not rebuild the requirement matrices, retrying in %s seconds: %s",
+                                 RETRY_SECONDS, e)
+                    await asyncio.sleep(RETRY_SECONDS)
+        finally:
+            invalidation_bus.unsubscribe(REQUIREMENTS_COLLECTIONS, self.on_change)
@@ -0,0 +1,167 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_requirements_collection
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.refreshing import RefreshingCache
+from backend.services.setups import REQUIREMENTS_COLLECTIONS, added_setups, flatten_setups, setup_listeners
+
+"""
+"Games my rig can run": reverse index from a (CPU, GPU) pair to every recorded setup of the pair,
+answering /api/req/playable for the whole catalog with one lookup instead of one get_requirement per game.
+
+The setups of a pair are kept as numpy columns sorted so that, within every game, the best setup comes
+first (highest setting, then highest resolution, then most FPS). A query masks the setups the rig meets
+(RAM, resolution, minimum FPS) and keeps the first remaining setup of every game.
+New setups only mark their pair for a rebuild on its next query.
+"""
+# Usual presets from worst to best, settings named otherwise rank below all of them
+SETTING_ORDER = ("lowest", "very low", "low", "medium", "high", "very high", "ultra", "ultra high", "epic",
+                 "extreme", "max", "maximum")
+_SETTING_RANKS = {name: rank for rank, name in enumerate(SETTING_ORDER)}
+
+
+def setting_rank(setting_name: str) -> int:
+    """
+    E.G: "Ultra" -> 6, "Custom" -> -1
+    """
+    return _SETTING_RANKS.get(" ".join(str(setting_name).lower().split()), -1)
+
+
+def resolution_pixels(resolution: str) -> int:
+    """
+    E.G: "1920x1080" -> 2073600, 0 if the resolution can't be parsed.
+    """
+    try:
+        width, height = str(resolution).lower().split("x")
+        return int(width) * int(height)
+    except ValueError:
+        return 0
+
+
+def quality_key(setup: dict) -> tuple:
+    """
+    Sort key putting the best setup first: highest setting, highest resolution, most FPS, least RAM.
+    """
+    return (-setting_rank(setup["setting_name"]), -resolution_pixels(setup["resolution"]),
+            -(setup.get("fps") or 0), setup["ram"])
+
+
+class PairSetups:
+    """
+    Setups of one CPU and GPU as columns, grouped by game with the best setup of every game first.
+    """
+
+    def __init__(self, setups: List[dict]):
+        games = [str(setup["game_id"]) for setup in setups]
+        qualities = [quality_key(setup) for setup in setups]
+        order = sorted(range(len(setups)), key=lambda row: (games[row], qualities[row]))
+        self.setups = [setups[row] for row in order]
+        # Games are sorted, so their codes are too
+        _, self._game_codes = np.unique([games[row] for row in order], return_inverse=True)
+        self._resolutions = np.array([setup["resolution"] for setup in self.setups], dtype=str)
+        self._ram = np.array([setup["ram"] for setup in self.setups], dtype=np.float64)
+        # Setups without a recorded FPS never meet a minimum FPS
+        self._fps = np.array([setup["fps"] if setup.get("fps") is not None else np.nan for setup in self.setups],
+                             dtype=np.float64)
+        # Position of every setup in best first order, across games
+        self._quality = np.empty(len(self.setups), dtype=np.int64)
+        self._quality[sorted(range(len(order)), key=lambda row: qualities[order[row]])] = np.arange(len(order))
+
+    def best(self, ram: int, resolution: Optional[str] = None, min_fps: Optional[float] = None) -> List[dict]:
+        """
+        :return: the best setup of every game the rig meets, best first.
+        """
+        meets = self._ram <= ram
+        if resolution is not None:
+            meets &= self._resolutions == resolution
+        if min_fps is not None:
+            meets &= self._fps >= min_fps
+        rows = np.flatnonzero(meets)
+        codes = self._game_codes[rows]
+        # The first remaining row of every game is its best one
+        first = rows[np.concatenate(([True], codes[1:] != codes[:-1]))] if len(rows) else rows
+        return [self.setups[row] for row in first[np.argsort(self._quality[first])]]
+
+
+class PlayableIndex:
+    """
+    (cpu_id, gpu_id) -> setups of the pair, over every recorded setup.
+    """
+
+    def __init__(self):
+        self._setups: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        self._pairs: Dict[Tuple[str, str], PairSetups] = {}
+        # Pairs with setups added since their columns were built
+        self._stale: Set[Tuple[str, str]] = set()
+
+    def add_setup(self, setup: dict):
+        """
+        :param setup: flat setup document.
+        """
+        pair = (str(setup["cpu_id"]), str(setup["gpu_id"]))
+        self._setups[pair].append(setup)
+        self._stale.add(pair)
+
+    def playable(self, cpu_id, gpu_id, ram: int, resolution: Optional[str] = None,
+                 min_fps: Optional[float] = None) -> Optional[List[dict]]:
+        """
+        :param cpu_id: CPU's id.
+        :param gpu_id: GPU's id.
+        :param ram: RAM of the rig in GB, setups needing more don't count.
+        :param resolution: only the setups of this resolution. E.G 2560x1440
+        :param min_fps: only the setups reaching this FPS.
+        :return: the best setup of every game the rig meets, best setting first.
+        None if no setup of the CPU and GPU is recorded.
+        """
+        pair = (str(cpu_id), str(gpu_id))
+        if pair not in self._setups:
+            return None
+        if pair in self._stale or pair not in self._pairs:
+            self._pairs[pair] = PairSetups(self._setups[pair])
+            self._stale.discard(pair)
+        return self._pairs[pair].best(ram, resolution, min_fps)
+
+    @classmethod
+    async def from_collection(cls, collection: AsyncIOMotorCollection) -> "PlayableIndex":
+        """
+        Build the index from every setup in the DB (embedded or flat layout).
+
+        :param collection: collection the setups are stored in.
+        """
+        index = cls()
+        async for doc in collection.find():
+            for setup in (flatten_setups(doc) if "setups" in doc else [doc]):
+                index.add_setup(setup)
+        return index
+
+
+def _on_setup_added(setup: dict):
+    playable_index_cache.update(lambda index: index.add_setup(setup))
+
+
+playable_index_cache: RefreshingCache[PlayableIndex] = RefreshingCache(PlayableIndex.from_collection,
+                                                                       "playable_index_ttl_seconds")
+setup_listeners.append(_on_setup_added)
+
+
+def _on_requirements_changed(event: InvalidationEvent):
+    # Added setups (flat or embedded) arrive through setup_listeners, any other write rebuilds the index
+    if added_setups(event) is None:
+        playable_index_cache.invalidate()
+
+
+invalidation_bus.subscribe(REQUIREMENTS_COLLECTIONS, _on_requirements_changed)
+
+
+async def get_playable_index(
+        collection: AsyncIOMotorCollection = Depends(get_requirements_collection)) -> PlayableIndex:
+    """
+    FastAPI dependency returning the current playable index.
+    """
+    return await playable_index_cache.get(collection)
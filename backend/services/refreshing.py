@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.config import get_settings
+
+T = TypeVar("T")
+logger = logging.getLogger(__name__)
+
+
+class RefreshingCache(Generic[T]):
+    """
+    Holds a value built from a collection (E.G an index over all setups).
+    The value is rebuilt on first use, when older than its TTL, or after invalidate().
+    A build that an invalidation (or update) happened during may have read the collection before the write,
+    it is returned to the request that waited for it but not kept.
+
+    With serve_stale, only the first build is waited for: afterwards requests keep getting the previous value
+    while a background task rebuilds it. Updates made during that rebuild are applied again to the new value
+    (so they must be idempotent), and an invalidation during it only marks the new value stale.
+    """
+
+    def __init__(self, build: Callable[[AsyncIOMotorCollection], Awaitable[T]], ttl_setting: str,
+                 serve_stale: bool = False):
+        """
+        :param build: coroutine function building the value from the collection.
+        :param ttl_setting: name of the Settings field holding the TTL in seconds.
+        :param serve_stale: serve the previous value while rebuilding it in the background.
+        """
+        self._build = build
+        self._ttl_setting = ttl_setting
+        self._serve_stale = serve_stale
+        self._value: Optional[T] = None
+        self._built_at = 0.0
+        # Bumped by every invalidation, builds started at an older generation aren't kept (or are kept stale)
+        self._generation = 0
+        self._building = False
+        # Updates made during the build in progress, applied again to its value (serve_stale only)
+        self._pending: List[Callable[[T], None]] = []
+        self._refresh: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def value(self) -> Optional[T]:
+        """
+        :return: the current value, None if it wasn't built yet (or was invalidated).
+        """
+        return self._value
+
+    def is_fresh(self) -> bool:
+        return (self._value is not None
+                and time.monotonic() - self._built_at < getattr(get_settings(), self._ttl_setting))
+
+    async def get(self, collection: AsyncIOMotorCollection) -> T:
+        """
+        :param collection: collection the value is built from.
+        :return: the current value, rebuilt first if needed.
+        """
+        if self.is_fresh():
+            return self._value
+        if self._serve_stale and self._value is not None:
+            if self._refresh is None or self._refresh.done():
+                self._refresh = asyncio.create_task(self._refresh_in_background(collection))
+            return self._value
+        async with self._lock:
+            # Another request may have rebuilt it while we waited for the lock
+            if not self.is_fresh():
+                return await self._rebuild(collection)
+        return self._value
+
+    async def _rebuild(self, collection: AsyncIOMotorCollection) -> T:
+        generation = self._generation
+        self._building = True
+        self._pending = []
+        try:
+            value = await self._build(collection)
+        finally:
+            self._building = False
+        if generation != self._generation and not self._serve_stale:
+            return value
+        for apply in self._pending:
+            apply(value)
+        self._pending = []
+        self._value = value
+        # Invalidated during the build: keep the value but rebuild it again on the next request
+        self._built_at = time.monotonic() if generation == self._generation else -math.inf
+        return value
+
+    async def _refresh_in_background(self, collection: AsyncIOMotorCollection):
+        try:
+            async with self._lock:
+                if not self.is_fresh():
+                    await self._rebuild(collection)
+        except Exception as e:
+            logger.error("Could not rebuild %s, serving the previous value: %s", self._build.__qualname__, e)
+
+    def invalidate(self):
+        """
+        Drop the value so the next request rebuilds it (with serve_stale, only mark it stale).
+        """
+        if self._serve_stale:
+            self._built_at = -math.inf
+        else:
+            self._value = None
+        self._generation += 1
+
+    def update(self, apply: Callable[[T], None]):
+        """
+        Apply a write to the current value in place (E.G add a new setup to an index).
+        A build in progress may have missed the write, so it is thrown away (with serve_stale, the write is
+        applied to its value too).
+
+        :param apply: function updating the value.
+        """
+        if self._building:
+            if self._serve_stale:
+                self._pending.append(apply)
+            else:
+                self._generation += 1
+        if self._value is not None:
+            apply(self._value)
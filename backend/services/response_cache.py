@@ -0,0 +1,220 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from backend.app.config import get_settings
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.utils.streaming import NDJSON_MEDIA_TYPE, STREAM_VALUES
+
+"""
+Response cache of the read-only catalog routes (games, hardware, row config, home page rows).
+
+Successful GET responses are stored serialised, keyed by path and query parameters, in an LRU bounded
+by entry count and total size. Every response gets a strong ETag (hash of its body), If-None-Match
+is answered with 304 and Cache-Control tells clients how long they may reuse it.
+
+Entries are tagged by the data they were built from and dropped when the invalidation feed
+(backend.services.invalidation) reports a write to that collection. They also expire after their
+rule's max-age, so a feed that is disabled or down delays changes by max-age at most.
+"""
+# Tags are named after the collection the responses are built from
+GAMES_TAG = "games"
+HARDWARE_TAG = "hardware"
+ROW_CONFIG_TAG = "row-config"
+# Home page rows, built from the row config and the games
+HOME_TAG = "home"
+
+
+class CacheRule(NamedTuple):
+    path_prefix: str
+    tag: str
+    max_age: int
+
+
+# First matching prefix wins
+CACHE_RULES = (
+    CacheRule("/api/games/row-config", ROW_CONFIG_TAG, 300),
+    CacheRule("/api/games/home", HOME_TAG, 60),
+    CacheRule("/api/games", GAMES_TAG, 60),
+    CacheRule("/api/hardware", HARDWARE_TAG, 300),
+)
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    tag: str
+    # time.monotonic() after which the entry is dropped
+    expires_at: float
+
+
+def match_rule(path: str) -> Optional[CacheRule]:
+    return next((rule for rule in CACHE_RULES if path.startswith(rule.path_prefix)), None)
+
+
+def make_etag(body: bytes) -> str:
+    """
+    :return: strong ETag of a response body.
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    :param if_none_match: If-None-Match header. E.G: "abc", W/"def" or *
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
+    return etag in candidates
+
+
+def is_streamed(headers: Dict[bytes, bytes], query_string: bytes) -> bool:
+    """
+    :return: True if the request asks for a streamed response (see backend.utils.streaming.stream_format).
+    """
+    stream = dict(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)).get("stream", "")
+    return NDJSON_MEDIA_TYPE.encode() in headers.get(b"accept", b"") or stream.lower() in STREAM_VALUES
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """
+    :return: key of a request, query parameters are sorted so their order doesn't matter.
+    """
+    query = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{path}?{urlencode(query)}"
+
+
+class ResponseCache:
+    """
+    LRU of serialised responses, bounded by entry count and total body size.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        :param max_entries: most responses kept, defaults to the response_cache_max_entries setting.
+        :param max_bytes: most body bytes kept, defaults to the response_cache_max_bytes setting.
+        """
+        settings = get_settings()
+        self.max_entries = max_entries or settings.response_cache_max_entries
+        self.max_bytes = max_bytes or settings.response_cache_max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.size = 0
+        # Bumped by every invalidation, a response rendered before one isn't stored
+        self.generations: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        :return: the entry, None if there is none or it expired (it is dropped then).
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse, generation: int):
+        """
+        Store a response, evicting the least recently used ones to stay within the limits.
+
+        :param generation: generation of the entry's tag when rendering started.
+        """
+        if generation != self.generations.get(entry.tag, 0) or len(entry.body) > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+    def invalidate(self, *tags: str):
+        """
+        Drop every response built from the given data.
+
+        :param tags: E.G GAMES_TAG, HARDWARE_TAG
+        """
+        for tag in tags:
+            self.generations[tag] = self.generations.get(tag, 0) + 1
+        for key in [key for key, entry in self._entries.items() if entry.tag in tags]:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+response_cache = ResponseCache()
+
+
+def _on_collection_changed(event: InvalidationEvent):
+    response_cache.invalidate(event.collection)
+    if event.collection == GAMES_TAG:
+        response_cache.invalidate(HOME_TAG)
+
+
+invalidation_bus.subscribe((GAMES_TAG, HARDWARE_TAG), _on_collection_changed)
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware serving the CACHE_RULES routes from the response cache.
+    Streamed responses (NDJSON, ?stream=true) are never cached, entries expire after their rule's max-age.
+    """
+
+    def __init__(self, app, cache: Optional[ResponseCache] = None):
+        self.app = app
+        self.cache = cache if cache is not None else response_cache
+
+    async def __call__(self, scope, receive, send):
+        rule = match_rule(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        headers = dict(scope.get("headers", [])) if rule else {}
+        query_string = scope.get("query_string", b"")
+        if rule is None or not get_settings().response_cache_enabled or is_streamed(headers, query_string):
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(scope["path"], query_string)
+        entry = self.cache.get(key)
+        if entry is None:
+            generation = self.cache.generations.get(rule.tag, 0)
+            messages = []
+
+            async def capture(message):
+                messages.append(message)
+
+            await self.app(scope, receive, capture)
+            start = messages[0]
+            if start["status"] != 200:
+                for message in messages:
+                    await send(message)
+                return
+            body = b"".join(message.get("body", b"") for message in messages[1:])
+            response_headers = [(name, value) for name, value in start["headers"]
+                                if name.lower() not in (b"content-length", b"etag", b"cache-control")]
+            entry = CachedResponse(200, response_headers, body, make_etag(body), rule.tag,
+                                   time.monotonic() + rule.max_age)
+            self.cache.put(key, entry, generation)
+
+        cache_headers = [(b"etag", entry.etag.encode()), (b"cache-control", f"public, max-age={rule.max_age}".encode())]
+        if etag_matches(headers.get(b"if-none-match", b"").decode("latin-1"), entry.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": entry.status,
+                    "headers": entry.headers + cache_headers + [(b"content-length", str(len(entry.body)).encode())]})
+        await send({"type": "http.response.body", "body": entry.body})
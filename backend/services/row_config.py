@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+from backend.app.config import get_settings
+from backend.services.response_cache import HOME_TAG, ROW_CONFIG_TAG, make_etag, response_cache
+from backend.utils.serialization import dumps
+
+"""
+In-memory copy of the JSON config files served as is, E.G the rows of the home page (row-config.json).
+
+The file is parsed once and kept as serialised bytes with their ETag, so requests do no file I/O.
+Every row_config_check_seconds its mtime and size are checked (in a thread, off the event loop) and the file is
+reloaded when they changed, dropping the cached responses built from it. The check runs in a task started in the
+app's lifespan (see watch()), since the response cache answers the routes without calling them, and on a request
+when the last check is older than the interval. A file that fails to parse (E.G half written) is logged
+and the last good version keeps being served.
+"""
+logger = logging.getLogger(__name__)
+
+ROW_CONFIG_PATH = Path(__file__).parent.parent / "config" / "row-config.json"
+
+
+class LoadedFile(NamedTuple):
+    body: bytes
+    etag: str
+    # (mtime in ns, size) of the file the body was read from
+    version: tuple
+
+
+def _file_version(path: Path) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(path: Path) -> LoadedFile:
+    version = _file_version(path)
+    body = dumps(json.loads(path.read_bytes()))
+    return LoadedFile(body, make_etag(body), version)
+
+
+class JsonFileCache:
+    """
+    Serialised content of a JSON file, reloaded when the file changes.
+    """
+
+    def __init__(self, path: Path, cache_tags: Tuple[str, ...] = ()):
+        """
+        :param path: the JSON file.
+        :param cache_tags: response cache tags to invalidate when the file is reloaded. E.G ROW_CONFIG_TAG
+        """
+        self.path = path
+        self.cache_tags = cache_tags
+        self._loaded: Optional[LoadedFile] = None
+        self._checked_at = 0.0
+
+    async def get(self) -> LoadedFile:
+        """
+        :return: the file's content, checked for changes at most every row_config_check_seconds.
+        :raises: FileNotFoundError, ValueError: if the file was never loaded and can't be.
+        """
+        if self._loaded is not None and time.monotonic() - self._checked_at < get_settings().row_config_check_seconds:
+            return self._loaded
+        return await self.refresh()
+
+    async def refresh(self) -> LoadedFile:
+        """
+        Reload the file if it changed since it was loaded, and invalidate the cache tags if it was.
+
+        :return: the file's content.
+        :raises: FileNotFoundError, ValueError: if the file was never loaded and can't be.
+        """
+        self._checked_at = time.monotonic()
+        try:
+            if self._loaded is not None and await asyncio.to_thread(_file_version, self.path) == self._loaded.version:
+                return self._loaded
+            loaded = await asyncio.to_thread(_load, self.path)
+        except (OSError, ValueError) as e:
+            if self._loaded is None:
+                raise
+            logger.error("Could not reload %s, serving the previous version: %s", self.path, e)
+            return self._loaded
+        if self._loaded is not None and self.cache_tags:
+            response_cache.invalidate(*self.cache_tags)
+        self._loaded = loaded
+        return loaded
+
+    async def watch(self):
+        """
+        Check the file for changes every row_config_check_seconds until cancelled.
+        """
+        while True:
+            await asyncio.sleep(get_settings().row_config_check_seconds)
+            try:
+                await self.refresh()
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load %s: %s", self.path, e)
+
+    def clear(self):
+        self._loaded = None
+        self._checked_at = 0.0
+
+
+# The home page rows are built from the row config too
+row_config = JsonFileCache(ROW_CONFIG_PATH, (ROW_CONFIG_TAG, HOME_TAG))
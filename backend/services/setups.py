@@ -0,0 +1,203 @@
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from backend.app.config import get_settings
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+
+"""
+Storage layouts of the benchmark setups.
+
+- embedded: one game_requirements document per game/resolution/setting with all its setups in a "setups" array.
+- flat: one game_setups document per setup, found with a single indexed point query on
+  (game_id, resolution, setting_name, cpu_id, gpu_id, ram).
+"""
+EMBEDDED_STORAGE = "embedded"
+FLAT_STORAGE = "flat"
+SETUPS_COLLECTION = "game_setups"
+REQUIREMENTS_COLLECTIONS = ("game_requirements", SETUPS_COLLECTION)
+
+# Fields identifying a requirement document (embedded) and a single setup (flat)
+COMBINATION_FIELDS = ("game_id", "resolution", "setting_name")
+SETUP_KEY_FIELDS = COMBINATION_FIELDS + ("cpu_id", "gpu_id", "ram")
+DUPLICATE_KEY_ERROR = 11000
+
+# Called with every new flat setup document, so in-memory indexes can update without a full rebuild
+setup_listeners: List[Callable[[dict], None]] = []
+# Ids (or setup keys, for embedded setups) of the last notified setups -
+# a change stream resumed after an error can report the same write again
+_notified_ids = deque(maxlen=1024)
+# Updated field of an element set in (E.G pushed to) the setups array of an embedded document. E.G "setups.12"
+_SETUP_ELEMENT_FIELD = re.compile(r"setups\.\d+")
+# Collections whose unique index was already found (see check_unique_index)
+_indexed_collections: Set[str] = set()
+
+
+def is_flat_storage() -> bool:
+    """
+    :return: True if the setups are read from the flat game_setups collection.
+    """
+    return get_settings().requirements_storage == FLAT_STORAGE
+
+
+def flatten_setups(requirement_doc: dict) -> List[dict]:
+    """
+    Turn an embedded game_requirements document into one document per setup.
+
+    :param requirement_doc: document with game_id, resolution, setting_name and a setups array.
+    :return: list of flat setup documents (without _id).
+    """
+    combination = {field: requirement_doc[field] for field in COMBINATION_FIELDS}
+    return [{**combination, **setup} for setup in requirement_doc.get("setups", [])]
+
+
+def combination_key(game_id, resolution: str, setting_name: str) -> str:
+    """
+    :return: key of a game/resolution/setting combination. E.G: "g1|1920x1080|Ultra"
+    """
+    return f"{game_id}|{resolution}|{setting_name}"
+
+
+def setup_key(setup_doc: dict) -> Dict:
+    """
+    :param setup_doc: flat setup document.
+    :return: the filter matching exactly this setup in the flat collection.
+    """
+    return {field: setup_doc[field] for field in SETUP_KEY_FIELDS}
+
+
+def setup_upsert(setup_doc: dict) -> UpdateOne:
+    """
+    Single atomic write adding a setup unless the same cpu/gpu/ram is already recorded for its combination.
+
+    - flat: upsert on the setup key, only setting the fields when inserting.
+    - embedded: push into the combination's document, whose filter excludes documents already holding the setup.
+      When it already does, the upsert tries to create a second document for the combination and fails
+      on the unique game/resolution/setting index instead - see add_setups().
+
+    :param setup_doc: flat setup document (combination and setup fields).
+    """
+    if is_flat_storage():
+        return UpdateOne(setup_key(setup_doc), {"$setOnInsert": setup_doc}, upsert=True)
+    combination = {field: setup_doc[field] for field in COMBINATION_FIELDS}
+    setup = {field: value for field, value in setup_doc.items() if field not in COMBINATION_FIELDS}
+    same_setup = {field: setup_doc[field] for field in SETUP_KEY_FIELDS if field not in COMBINATION_FIELDS}
+    return UpdateOne({**combination, "setups": {"$not": {"$elemMatch": same_setup}}},
+                     {"$push": {"setups": setup}}, upsert=True)
+
+
+async def check_unique_index(collection: AsyncIOMotorCollection):
+    """
+    Setups already recorded are only skipped thanks to the collection's unique index (see backend.app.indexes):
+    without it every upsert of the embedded layout creates another document for the combination.
+    Checked once per collection and process.
+
+    :param collection: the collection the setups are stored in.
+    :raises: RuntimeError: if the collection has no unique index on the key of its documents.
+    """
+    if collection.full_name in _indexed_collections:
+        return
+    fields = SETUP_KEY_FIELDS if is_flat_storage() else COMBINATION_FIELDS
+    indexes = await collection.index_information()
+    if not any(index.get("unique") and tuple(field for field, _ in index["key"]) == fields
+               for index in indexes.values()):
+        raise RuntimeError(f"{collection.full_name} has no unique index on {', '.join(fields)}, "
+                           "create it first with: python -m backend.app.indexes ensure")
+    _indexed_collections.add(collection.full_name)
+
+
+async def add_setups(collection: AsyncIOMotorCollection, setup_docs: List[dict]) -> int:
+    """
+    Add setups in one unordered bulk write, skipping the ones already recorded.
+    Safe to call from parallel writers: duplicate key errors are either setups already recorded or two writers
+    creating the same combination's document at once - the latter are retried once, when the document exists.
+
+    :param collection: the collection the setups are stored in (see get_requirements_collection).
+    :param setup_docs: flat setup documents (combination and setup fields).
+    :return: amount of setups added.
+    :raises: RuntimeError: if the collection lacks its unique index, see check_unique_index().
+    """
+    await check_unique_index(collection)
+    operations = [setup_upsert(setup_doc) for setup_doc in setup_docs]
+    added = 0
+    for _ in range(2):
+        if not operations:
+            break
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            return added + result.upserted_count + result.modified_count
+        except BulkWriteError as e:
+            added += e.details["nUpserted"] + e.details["nModified"]
+            errors = e.details["writeErrors"]
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            operations = [operations[error["index"]] for error in errors]
+    return added
+
+
+async def add_setup(collection: AsyncIOMotorCollection, setup_doc: dict) -> bool:
+    """
+    :param collection: the collection the setups are stored in (see get_requirements_collection).
+    :param setup_doc: flat setup document (combination and setup fields).
+    :return: True if the setup was added, False if the same cpu/gpu/ram was already recorded.
+    """
+    return await add_setups(collection, [setup_doc]) == 1
+
+
+def notify_setup_added(setup_doc: dict):
+    """
+    Let every in-memory index know about a new setup.
+
+    :param setup_doc: flat setup document.
+    """
+    setup_id = setup_doc.get("_id")
+    if setup_id is None and all(field in setup_doc for field in SETUP_KEY_FIELDS):
+        setup_id = tuple(setup_doc[field] for field in SETUP_KEY_FIELDS)
+    if setup_id is not None:
+        if setup_id in _notified_ids:
+            return
+        _notified_ids.append(setup_id)
+    for listener in setup_listeners:
+        listener(setup_doc)
+
+
+def added_setups(event: InvalidationEvent) -> Optional[List[dict]]:
+    """
+    Setups a write only added, which indexes can add incrementally:
+    - insert: the flat setup, or every setup of the new embedded document.
+    - update of an embedded document: the elements set at new positions of its setups array (E.G by $push),
+      read from the updateDescription. Changes to other fields than setups add nothing.
+
+    :return: the added flat setup documents, None if the write may have changed or removed setups
+    (delete, replace, an existing setup edited, no looked up document...): indexes have to be rebuilt.
+    """
+    if event.document is None:
+        return None
+    if event.operation == "insert":
+        return flatten_setups(event.document) if "setups" in event.document else [event.document]
+    if event.operation != "update" or event.changes is None or "setups" not in event.document:
+        return None
+    if (any(field.split(".")[0] == "setups" for field in event.changes.get("removedFields", []))
+            or event.changes.get("truncatedArrays")):
+        return None
+    combination = {field: event.document[field] for field in COMBINATION_FIELDS}
+    added = []
+    for field, value in event.changes.get("updatedFields", {}).items():
+        if _SETUP_ELEMENT_FIELD.fullmatch(field):
+            added.append({**combination, **value})
+        elif field.split(".")[0] == "setups":
+            # The whole array or a field of an existing setup
+            return None
+    return added
+
+
+def _on_requirements_changed(event: InvalidationEvent):
+    for setup_doc in added_setups(event) or []:
+        notify_setup_added(setup_doc)
+
+
+invalidation_bus.subscribe(REQUIREMENTS_COLLECTIONS, _on_requirements_changed)
@@ -0,0 +1,245 @@
+import asyncio
+import bisect
+import math
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from backend.app.database import get_requirements_collection
+from backend.services.estimator import PerformanceEstimator
+from backend.services.refreshing import RefreshingCache
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.setups import (REQUIREMENTS_COLLECTIONS, SETUP_KEY_FIELDS, added_setups, combination_key,
+                                     flatten_setups, setup_listeners)
+
+"""
+Recommends the cheapest CPU and/or GPU swap reaching a target FPS, from the recorded setups.
+
+There are no prices in the DB, so a part's cost is its performance tier: its fitted score in the
+FPS model of services.estimator (the weakest part that still reaches the target is the cheapest one).
+Options are ranked by amount of swapped parts, then by tier.
+
+Per game/resolution/setting the setups are sorted by FPS and, for every FPS threshold, the Pareto
+frontier of the setups reaching it is precomputed (a setup is dominated when another one needs a
+part of a lower or equal tier on every axis and no more RAM). A request is a bisect on the target
+FPS plus a pass over a frontier of a few entries.
+
+Building the whole index is CPU-heavy (seconds at 200k setups): it runs in a worker thread, and the previous
+index keeps answering until the new one is ready.
+"""
+GPU_SWAP = "gpu"
+CPU_SWAP = "cpu"
+BOTH_SWAP = "cpu+gpu"
+
+
+def dominates(cost: Tuple, other: Tuple) -> bool:
+    return all(a <= b for a, b in zip(cost, other))
+
+
+class Staircase:
+    """
+    Setups sorted by FPS (descending) with the Pareto frontier of every prefix,
+    I.E of the setups reaching every FPS threshold.
+    """
+
+    def __init__(self, setups: List[dict], cost: Callable[[dict], Tuple]):
+        """
+        :param setups: flat setup documents.
+        :param cost: costs of a setup to minimize (tiers, ram).
+        """
+        ordered = sorted(setups, key=lambda setup: -setup["fps"])
+        self._neg_fps = [-setup["fps"] for setup in ordered]
+        self._frontiers: List[List[Tuple[Tuple, dict]]] = []
+        frontier: List[Tuple[Tuple, dict]] = []
+        for setup in ordered:
+            setup_cost = cost(setup)
+            # An equal cost seen before has a higher FPS, so it wins
+            if not any(dominates(kept, setup_cost) for kept, _ in frontier):
+                frontier = [(kept, doc) for kept, doc in frontier if not dominates(setup_cost, kept)]
+                frontier.append((setup_cost, setup))
+            # Frontiers are never modified in place, unchanged prefixes share the same list
+            self._frontiers.append(frontier)
+
+    def frontier(self, target_fps: float) -> List[Tuple[Tuple, dict]]:
+        """
+        :return: the (cost, setup) pairs of the Pareto frontier of the setups reaching target_fps.
+        """
+        reaching = bisect.bisect_right(self._neg_fps, -target_fps)
+        return self._frontiers[reaching - 1] if reaching else []
+
+
+class CombinationIndex:
+    """
+    Staircases of one game/resolution/setting: per CPU (GPU swaps), per GPU (CPU swaps) and overall (both).
+    """
+
+    def __init__(self, setups: List[dict], tier: Callable[[str, str], float]):
+        self.setups = setups
+        self.by_pair: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        by_cpu: Dict[str, List[dict]] = defaultdict(list)
+        by_gpu: Dict[str, List[dict]] = defaultdict(list)
+        for setup in setups:
+            cpu_id, gpu_id = str(setup["cpu_id"]), str(setup["gpu_id"])
+            self.by_pair[(cpu_id, gpu_id)].append(setup)
+            by_cpu[cpu_id].append(setup)
+            by_gpu[gpu_id].append(setup)
+
+        def gpu_cost(setup):
+            return tier("gpu", setup["gpu_id"]), setup["ram"]
+
+        def cpu_cost(setup):
+            return tier("cpu", setup["cpu_id"]), setup["ram"]
+
+        self.gpu_swaps = {cpu_id: Staircase(docs, gpu_cost) for cpu_id, docs in by_cpu.items()}
+        self.cpu_swaps = {gpu_id: Staircase(docs, cpu_cost) for gpu_id, docs in by_gpu.items()}
+        self.both_swaps = Staircase(setups, lambda setup: (tier("cpu", setup["cpu_id"]),
+                                                           tier("gpu", setup["gpu_id"]), setup["ram"]))
+
+
+def _cheapest(staircase: Optional[Staircase], target_fps: float, ram: int,
+              allowed: Callable[[dict], bool]) -> Optional[Tuple[float, dict]]:
+    if staircase is None:
+        return None
+    candidates = [(sum(cost[:-1]), setup) for cost, setup in staircase.frontier(target_fps)
+                  if setup["ram"] <= ram and allowed(setup)]
+    return min(candidates, key=lambda candidate: (candidate[0], candidate[1]["fps"]), default=None)
+
+
+class UpgradeIndex:
+    """
+    Upgrade recommendations over every recorded setup.
+    A new setup changes the tiers of the whole model, so every combination is rebuilt on its next query.
+    """
+
+    def __init__(self):
+        self._estimator = PerformanceEstimator()
+        self._setups: Dict[str, List[dict]] = defaultdict(list)
+        self._combinations: Dict[str, CombinationIndex] = {}
+        # Bumped by every added setup, combinations built at an older version are rebuilt on their next query
+        self._version = 0
+        self._built_versions: Dict[str, int] = {}
+        # Keys of the setups added so far: a setup written during a rebuild is added again to the new index
+        self._setup_keys: Set[Tuple] = set()
+
+    def tier(self, kind: str, hardware_id) -> float:
+        """
+        :return: performance tier of a part (its log-FPS score), infinite if it was never benchmarked.
+        """
+        score = self._estimator.score(kind, hardware_id)
+        return math.inf if score is None else score
+
+    def add_setup(self, setup: dict):
+        """
+        Add a setup, the combinations are rebuilt with the refitted tiers on their next query.
+        A setup already added (same game/resolution/setting/cpu/gpu/ram) is ignored.
+
+        :param setup: flat setup document.
+        """
+        if not setup.get("fps") or setup["fps"] <= 0:
+            return
+        setup_key = tuple(str(setup[field]) for field in SETUP_KEY_FIELDS)
+        if setup_key in self._setup_keys:
+            return
+        self._setup_keys.add(setup_key)
+        key = combination_key(setup["game_id"], setup["resolution"], setup["setting_name"])
+        self._setups[key].append(setup)
+        self._estimator.add_setup(setup)
+        self._version += 1
+
+    def build(self):
+        """
+        Rebuild every combination (with tiers fitted on all setups).
+        """
+        self._estimator.fit()
+        self._combinations = {key: CombinationIndex(setups, self.tier) for key, setups in self._setups.items()}
+        self._built_versions = dict.fromkeys(self._combinations, self._version)
+
+    def _combination(self, key: str) -> Optional[CombinationIndex]:
+        if key not in self._setups:
+            return None
+        if self._built_versions.get(key) != self._version:
+            self._combinations[key] = CombinationIndex(self._setups[key], self.tier)
+            self._built_versions[key] = self._version
+        return self._combinations[key]
+
+    def recommend(self, game_id, resolution: str, setting_name: str, cpu_id, gpu_id, ram: int,
+                  target_fps: float) -> Optional[dict]:
+        """
+        :return: the current FPS, the cheapest option of every swap kind and the overall recommendation
+        (None if nothing recorded reaches the target), None if the combination has no recorded setups.
+        """
+        combination = self._combination(combination_key(game_id, resolution, setting_name))
+        if combination is None:
+            return None
+        cpu_id, gpu_id = str(cpu_id), str(gpu_id)
+        current = [setup["fps"] for setup in combination.by_pair.get((cpu_id, gpu_id), []) if setup["ram"] <= ram]
+        current_fps = max(current, default=None)
+
+        options = []
+        cheapest = {
+            GPU_SWAP: _cheapest(combination.gpu_swaps.get(cpu_id), target_fps, ram,
+                                lambda setup: str(setup["gpu_id"]) != gpu_id),
+            CPU_SWAP: _cheapest(combination.cpu_swaps.get(gpu_id), target_fps, ram,
+                                lambda setup: str(setup["cpu_id"]) != cpu_id),
+            BOTH_SWAP: _cheapest(combination.both_swaps, target_fps, ram,
+                                 lambda setup: str(setup["cpu_id"]) != cpu_id and str(setup["gpu_id"]) != gpu_id),
+        }
+        for kind, found in cheapest.items():
+            if found is not None:
+                tier, setup = found
+                options.append({"swap": kind, "cpu_id": str(setup["cpu_id"]), "gpu_id": str(setup["gpu_id"]),
+                                "ram": setup["ram"], "fps": setup["fps"], "tier": round(tier, 3)})
+        # Single swaps first, then the lowest tier
+        options.sort(key=lambda option: (option["swap"] == BOTH_SWAP, option["tier"]))
+        meets_target = current_fps is not None and current_fps >= target_fps
+        return {"current_fps": current_fps,
+                "meets_target": meets_target,
+                "recommendation": None if meets_target or not options else options[0],
+                "options": options}
+
+    @classmethod
+    async def from_collection(cls, collection: AsyncIOMotorCollection) -> "UpgradeIndex":
+        """
+        Build the index from every setup in the DB (embedded or flat layout), in a worker thread.
+
+        :param collection: collection the setups are stored in.
+        """
+        docs = [doc async for doc in collection.find()]
+
+        def build() -> "UpgradeIndex":
+            index = cls()
+            for doc in docs:
+                for setup in (flatten_setups(doc) if "setups" in doc else [doc]):
+                    index.add_setup(setup)
+            index.build()
+            return index
+
+        return await asyncio.to_thread(build)
+
+
+def _on_setup_added(setup: dict):
+    upgrade_index_cache.update(lambda index: index.add_setup(setup))
+
+
+upgrade_index_cache: RefreshingCache[UpgradeIndex] = RefreshingCache(UpgradeIndex.from_collection,
+                                                                     "upgrade_index_ttl_seconds", serve_stale=True)
+setup_listeners.append(_on_setup_added)
+
+
+def _on_requirements_changed(event: InvalidationEvent):
+    # Added setups (flat or embedded) arrive through setup_listeners, any other write rebuilds the index
+    if added_setups(event) is None:
+        upgrade_index_cache.invalidate()
+
+
+invalidation_bus.subscribe(REQUIREMENTS_COLLECTIONS, _on_requirements_changed)
+
+
+async def get_upgrade_index(
+        collection: AsyncIOMotorCollection = Depends(get_requirements_collection)) -> UpgradeIndex:
+    """
+    FastAPI dependency returning the current upgrade index.
+    """
+    return await upgrade_index_cache.get(collection)
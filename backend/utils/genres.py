@@ -0,0 +1,47 @@
+import re
+from typing import Iterable, List
+
+"""
+Normalised genres. Games store their genres as entered ("Action RPG") in genres, and the normalised
+keys ("action rpg") in genre_keys, a multikey indexed field the genre queries match exactly or by prefix.
+"""
+GENRE_KEYS_FIELD = "genre_keys"
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_genre(genre: str) -> str:
+    """
+    E.G: "  Action   RPG " -> "action rpg"
+    """
+    return _SPACES_RE.sub(" ", genre.strip()).casefold()
+
+
+def genre_keys(genres: Iterable[str]) -> List[str]:
+    """
+    :param genres: genres of a game.
+    :return: the distinct normalised genres, the value of GENRE_KEYS_FIELD.
+    """
+    return sorted({normalize_genre(genre) for genre in genres if isinstance(genre, str) and genre.strip()})
+
+
+def genre_filter(genre: str, prefix: bool = False) -> dict:
+    """
+    :param genre: genre asked for, not case-sensitive.
+    :param prefix: match the genres starting with it ("action" matches "action rpg") instead of equal to it.
+    :return: games filter served by the genre_keys index (a prefix is an anchored, escaped regex).
+    """
+    key = normalize_genre(genre)
+    if prefix:
+        return {GENRE_KEYS_FIELD: {"$regex": "^" + re.escape(key)}}
+    return {GENRE_KEYS_FIELD: key}
+
+
+def genre_matches(genres: Iterable[str], genre: str, prefix: bool = False) -> bool:
+    """
+    :return: True if a game with these genres matches genre_filter(genre, prefix).
+    """
+    key = normalize_genre(genre)
+    if prefix:
+        return any(game_key.startswith(key) for game_key in genre_keys(genres))
+    return key in genre_keys(genres)
@@ -0,0 +1,122 @@
+import json
+import time
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+from backend.app.config import get_settings
+from backend.app.metrics import JSON_ENCODE_DURATION, SERIALIZATION_DURATION
+
+try:
+    import orjson
+except ImportError:  # Optional - the standard json module is used without it
+    orjson = None
+
+"""
+Fast serialization of DB documents into responses.
+
+Routes used to build a Pydantic model per document and let FastAPI validate it against the response_model
+and re-encode it with jsonable_encoder. Instead, a ModelSerializer picks the model's fields out of each
+document, validates the whole list in one TypeAdapter call (skipped when trust_db_documents is set) and
+writes it with orjson, which encodes datetimes natively and ObjectIds through default().
+Routes still declare their response_model for the OpenAPI schema.
+"""
+
+
+def _encode_bson(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # ObjectId and anything else BSON specific
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    :param content: JSON compatible content that may hold ObjectIds and datetimes.
+    :return: its JSON bytes.
+    """
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(content, default=_encode_bson)
+    return json.dumps(content, default=_encode_bson, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response written with orjson (when installed), also accepting ObjectIds.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        JSON_ENCODE_DURATION.observe(time.perf_counter() - start)
+        return body
+
+
+class ModelSerializer:
+    """
+    Turns DB documents into the JSON of a response model without building a model per document.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        """
+        :param model: the response model. Its "id" field is filled with the document's _id as a string.
+        """
+        self.model = model
+        self.fields = tuple(field for field in model.model_fields if field != "id")
+        self._has_id = "id" in model.model_fields
+        self._list_adapter = TypeAdapter(List[model])
+
+    def document(self, doc: dict, fields: Optional[Iterable[str]] = None) -> dict:
+        """
+        :param doc: document from the DB.
+        :param fields: subset of the model's fields to keep, all of them by default.
+        :return: the response dictionary of the document.
+        """
+        item = {field: doc[field] for field in (fields or self.fields) if field in doc}
+        if self._has_id:
+            item["id"] = str(doc["_id"])
+        return item
+
+    def validate(self, items: List[dict]):
+        """
+        Validate response dictionaries against the model in a single call, unless the DB is trusted.
+
+        :raises: pydantic.ValidationError: if a document doesn't match the model.
+        """
+        if not get_settings().trust_db_documents:
+            self._list_adapter.validate_python(items)
+
+    def documents(self, docs: Iterable[dict], fields: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        :param docs: documents from the DB.
+        :param fields: subset of the model's fields to keep. Partial documents aren't validated.
+        :return: the response dictionaries of the documents.
+        """
+        start = time.perf_counter()
+        items = [self.document(doc, fields) for doc in docs]
+        if fields is None:
+            self.validate(items)
+        SERIALIZATION_DURATION.observe(time.perf_counter() - start, self.model.__name__)
+        return items
+
+    def dump(self, doc: dict, fields: Optional[Iterable[str]] = None) -> bytes:
+        """
+        :return: the JSON of a single document, E.G for streaming. Partial documents aren't validated.
+        """
+        item = self.document(doc, fields)
+        if fields is None:
+            self.validate([item])
+        return dumps(item)
+
+    def response(self, docs: Iterable[dict], **kwargs) -> FastJSONResponse:
+        """
+        :param docs: documents from the DB.
+        :param kwargs: extra arguments of the response (E.G headers).
+        :return: JSON response of the list of documents.
+        """
+        return FastJSONResponse(self.documents(docs), **kwargs)
@@ -0,0 +1,79 @@
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Optional, Union
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+"""
+Opt-in streaming of large list responses.
+
+- "Accept: application/x-ndjson": one JSON document per line.
+- "?stream=true": a regular JSON array, sent in chunks.
+
+Documents are serialised one by one while the Motor cursor is iterated in batches,
+so memory stays flat however large the collection is.
+"""
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+# Documents fetched from MongoDB per round trip while streaming
+STREAM_BATCH_SIZE = 500
+# Values of the stream query parameter asking for a chunked JSON array
+STREAM_VALUES = ("1", "true")
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_format(request: Request) -> Optional[str]:
+    """
+    :return: the media type to stream the response in, None for a regular response.
+    """
+    if wants_ndjson(request):
+        return NDJSON_MEDIA_TYPE
+    if request.query_params.get("stream", "").lower() in STREAM_VALUES:
+        return JSON_MEDIA_TYPE
+    return None
+
+
+async def _iterate(documents: Union[AsyncIterable, Iterable]) -> AsyncIterator:
+    if hasattr(documents, "__aiter__"):
+        async for document in documents:
+            yield document
+    else:
+        for document in documents:
+            yield document
+
+
+async def stream_documents(documents: Union[AsyncIterable, Iterable],
+                           serialize: Callable[[dict], bytes],
+                           media_type: str,
+                           not_found_detail: str) -> StreamingResponse:
+    """
+    Stream documents as NDJSON or as a chunked JSON array.
+    The first document is fetched before the response starts, so an empty result is still a 404.
+
+    :param documents: Motor cursor, async generator or list of documents.
+    :param serialize: turns one document into its JSON bytes. E.G ModelSerializer.dump
+    :param media_type: NDJSON_MEDIA_TYPE or JSON_MEDIA_TYPE, see stream_format().
+    :param not_found_detail: detail of the 404 raised when there are no documents.
+    :return: the streaming response.
+    """
+    iterator = _iterate(documents)
+    try:
+        first = await anext(iterator)
+    except StopAsyncIteration:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    async def ndjson_lines():
+        yield serialize(first) + b"\n"
+        async for document in iterator:
+            yield serialize(document) + b"\n"
+
+    async def array_chunks():
+        yield b"[" + serialize(first)
+        async for document in iterator:
+            yield b"," + serialize(document)
+        yield b"]"
+
+    body = ndjson_lines() if media_type == NDJSON_MEDIA_TYPE else array_chunks()
+    return StreamingResponse(body, media_type=media_type)
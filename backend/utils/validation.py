@@ -1,7 +1,119 @@
 import re
-from typing import Optional, List
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
 from fastapi import HTTPException
 
+from backend.app.config import get_settings
+from backend.services.hardware_catalog import model_tokens
+from backend.utils.genres import genre_matches
+
+"""
+Post-query consistency checks of the routes' results.
+
+Every check of a parameter tuple (E.G the name's regex) is compiled once into a validator object,
+kept in a bounded LRU, so validating a list is a single pass without per-item compiling or allocating.
+The checks can be skipped entirely with the skip_consistency_checks setting - empty results still raise 404.
+"""
+# Validators kept per kind (distinct parameter tuples)
+VALIDATOR_CACHE_SIZE = 256
+
+Check = Tuple[Callable[[dict], bool], str]
+
+
+class ListValidator:
+    """
+    Compiled consistency checks of one query.
+    """
+
+    def __init__(self, not_found_detail: str, checks: List[Check], limit: Optional[int] = None):
+        """
+        :param not_found_detail: detail of the 404 raised for an empty list.
+        :param checks: (predicate every item must pass, detail of the 500 raised otherwise).
+        :param limit: most items the list may hold, None for no limit.
+        """
+        self.not_found_detail = not_found_detail
+        self.checks = checks
+        self.limit = limit
+
+    def __call__(self, items: list):
+        """
+        - Raises 404 if the list is empty.
+        - Raises 500 if the list is longer than the limit or an item fails a check.
+        """
+        if not items:
+            raise HTTPException(status_code=404, detail=self.not_found_detail)
+        if get_settings().skip_consistency_checks:
+            return
+        if self.limit is not None and len(items) > self.limit:
+            raise HTTPException(status_code=500, detail="Too many games found")
+        for item in items:
+            for check, detail in self.checks:
+                if not check(item):
+                    raise HTTPException(status_code=500, detail=detail)
+
+
+def _matches(pattern: "re.Pattern", field: str) -> Callable[[dict], bool]:
+    return lambda item: pattern.search(item.get(field, "")) is not None
+
+
+@lru_cache(maxsize=VALIDATOR_CACHE_SIZE)
+def hardware_validator(type_: str, brand: Optional[str] = None, model: Optional[str] = None) -> ListValidator:
+    """
+    :return: the validator of a CPU/GPU query, see validate_hardware_list.
+    """
+    # Case-insensitive full matches compare without lowering every item's fields
+    type_pattern = re.compile(re.escape(type_), re.IGNORECASE)
+    checks: List[Check] = [(lambda item: type_pattern.fullmatch(item.get("type", "")) is not None,
+                            f"Non-{type_} hardware found in {type_} route")]
+    if brand:
+        brand_pattern = re.compile(re.escape(brand), re.IGNORECASE)
+        checks.append((lambda item: brand_pattern.fullmatch(item.get("brand", "")) is not None,
+                       f"Wrong brand found in {type_}s fetched"))
+    if model:
+        # Same match as the catalog: every token of the model starts a token of the model or full name
+        query_tokens = model_tokens(model)
+        checks.append((lambda item: _has_token_prefixes(item, query_tokens),
+                       f"Wrong model regex found in {type_}s fetched"))
+        return ListValidator(f"No {type_} found matching model {model}", checks)
+    return ListValidator(f"No {type_} found", checks)
+
+
+def _has_token_prefixes(item: dict, query_tokens: List[str]) -> bool:
+    item_tokens = model_tokens(item.get("model", "")) + model_tokens(item.get("fullname", ""))
+    return all(any(token.startswith(query_token) for token in item_tokens) for query_token in query_tokens)
+
+
+@lru_cache(maxsize=VALIDATOR_CACHE_SIZE)
+def games_validator(limit: Optional[int] = None,
+                    name: Optional[str] = None,
+                    publisher: Optional[str] = None,
+                    developer: Optional[str] = None,
+                    release_date: Optional[int] = None,
+                    genre: Optional[str] = None,
+                    genre_prefix: bool = False) -> ListValidator:
+    """
+    :return: the validator of a games query, see validate_games_list.
+    """
+    checks: List[Check] = []
+    # Ensure the name's, publisher's and developer's regexes match the game's fields (if used)
+    if name is not None:
+        checks.append((_matches(re.compile(name, re.IGNORECASE), "name"), "Wrong name found in games route"))
+    if publisher is not None:
+        checks.append((_matches(re.compile(publisher, re.IGNORECASE), "publisher"),
+                       "Wrong publisher found in games route"))
+    if developer is not None:
+        checks.append((_matches(re.compile(developer, re.IGNORECASE), "developer"),
+                       "Wrong developer found in games route"))
+    # Ensure the release date matches (years should be equal)
+    if release_date is not None:
+        checks.append((lambda item: item.get("release_date", "") == release_date,
+                       "Wrong release date found in games route"))
+    # Ensure the genre (or a genre starting with it) is in the game's genres list
+    if genre is not None:
+        checks.append((lambda item: genre_matches(item.get("genres", []), genre, genre_prefix),
+                       "genre not found in game's genres in games route"))
+    return ListValidator("No games found", checks, limit)
+
 
 def validate_hardware_list(
         hardware: list,
@@ -20,27 +132,9 @@ def validate_hardware_list(
        :param hardware: List of CPU/GPU dictionaries from the DB.
        :param type_: CPU or GPU type for check
        :param brand: Optional brand filter to validate against.
-       :param model: Optional model regex to validate against.
+       :param model: Optional model (as typed by the user) to validate against, named in the 404's detail.
        """
-    # If hardware list is empty count it as no CPU/GPU found error
-    if not hardware:
-        raise HTTPException(status_code=404, detail=f"No {type_} found")
-    # Ensure only relevant CPUs have been fetched from DB
-    model_pattern = re.compile(re.escape(model), re.IGNORECASE) if model else None
-    for item in hardware:
-        # Check no GPUs were fetched
-        if item.get("type", "").lower() != type_:
-            raise HTTPException(status_code=500, detail=f"Non-{type_} hardware found in {type_} route")
-        # Ensure only relevant brand's CPUs have been fetched
-        if brand and item.get("brand", "").lower() != brand.lower():
-            raise HTTPException(status_code=500, detail=f"Wrong brand found in {type_}s fetched")
-        # Ensure only relevant CPU models have been fetched
-        if model_pattern:
-            if not (
-                    model_pattern.search(item.get("model", "")) or
-                    model_pattern.search(item.get("fullname", ""))
-            ):
-                raise HTTPException(status_code=500, detail=f"Wrong model regex found in {type_}s fetched")
+    hardware_validator(type_, brand, model)(hardware)
 
 
 def validate_games_list(games: list,
@@ -49,7 +143,8 @@ def validate_games_list(games: list,
                         publisher: Optional[str] = None,
                         developer: Optional[str] = None,
                         release_date: Optional[int] = None,
-                        genre: Optional[str] = None
+                        genre: Optional[str] = None,
+                        genre_prefix: bool = False
                         ):
     """
        Validates the list of games fetched from the DB.
@@ -64,37 +159,7 @@ def validate_games_list(games: list,
        :param publisher: desired publisher of a game
        :param developer: desired developer of a game
        :param release_date: desired release year (int) of a game
-       :param genre: desired genre of a game
+       :param genre: desired genre of a game (not case-sensitive)
+       :param genre_prefix: True if the games only need a genre starting with genre
        """
-    # If games list is empty count it as no games found error
-    if not games:
-        raise HTTPException(status_code=404, detail="No games found")
-    # Ensure the correct amount of games was returned
-    if limit is not None and len(games) > limit:
-        raise HTTPException(status_code=500, detail="Too many games found")
-
-    # Ensure only relevant games have been fetched from DB
-    for item in games:
-        # Ensure the name's regex matches the game's name (if used)
-        name_pattern = re.compile(name, re.IGNORECASE) if name else None
-        if name is not None and not name_pattern.search(item.get("name", "")):#
-            raise HTTPException(status_code=500, detail="Wrong name found in games route")
-
-        # Ensure the publisher's regex matches the game's publisher (if used)
-        publisher_pattern = re.compile(publisher, re.IGNORECASE) if publisher else None
-        if publisher is not None and not publisher_pattern.search(item.get("publisher", "")):#
-            raise HTTPException(status_code=500, detail="Wrong publisher found in games route")
-
-        # Ensure the developer's regex matches the game's developer
-        developer_pattern = re.compile(developer, re.IGNORECASE) if developer else None
-        if developer is not None and not developer_pattern.search(item.get("developer", "")):
-            raise HTTPException(status_code=500, detail="Wrong developer found in games route")
-
-        # Ensure the release date matches (years should be equal)
-        if release_date is not None and item.get("release_date", "") != release_date:
-            raise HTTPException(status_code=500, detail="Wrong release date found in games route")
-
-        # Ensure the genre's regex is in the game's genres list
-        genre_pattern = re.compile(genre, re.IGNORECASE) if genre else None
-        if genre is not None and not any(genre_pattern.search(g) for g in item.get("genres", [])):
-            raise HTTPException(status_code=500, detail="genre not found in game's genres in games route")
+    games_validator(limit, name, publisher, developer, release_date, genre, genre_prefix)(games)
@@ -0,0 +1,7 @@
+"""
+Benchmarks module: Offline performance measurements, run with python -m benchmarks.<name>.
+
+Modules:
+- serialization: per-document Pydantic models vs the ModelSerializer fast path.
+- load: concurrent clients against the whole app and an in-process fake MongoDB, results stored as JSON.
+"""
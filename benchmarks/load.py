@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from httpx import ASGITransport, AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.config import get_settings
+from backend.app.database import mongodb
+from backend.app.main import app
+from backend.services.setups import FLAT_STORAGE, SETUPS_COLLECTION, flatten_setups
+from backend.utils.genres import GENRE_KEYS_FIELD, genre_keys
+from benchmarks.serialization import synthetic_games
+
+"""
+Offline load test of the API, against an in-process fake MongoDB (mongomock-motor).
+
+The fake DB is seeded with synthetic games, hardware and benchmark setups, then every endpoint is driven
+through httpx.ASGITransport by concurrent clients. Latency percentiles and requests/sec per endpoint are
+printed and stored as JSON, so runs of two commits can be compared:
+
+    python -m benchmarks.load --games 10000 --hardware 5000 --setups 100000
+    git checkout other-branch
+    python -m benchmarks.load --games 10000 --hardware 5000 --setups 100000 --compare benchmarks/results/<first>.json
+
+Absolute numbers include mongomock's pure Python query engine - compare runs, not servers.
+Seeding millions of setups works, but takes a while.
+"""
+RESOLUTIONS = ("1920x1080", "2560x1440", "3840x2160")
+SETTINGS = ("Low", "Medium", "High", "Ultra")
+RAM_SIZES = (8, 16, 32)
+# Setups only use the first parts of each type, so the estimator and upgrade index see overlapping rigs
+BENCHMARKED_PARTS = 50
+INSERT_CHUNK_SIZE = 10000
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class Catalog(NamedTuple):
+    game_ids: List[str]
+    cpu_ids: List[str]
+    gpu_ids: List[str]
+    # (game_id, resolution, setting_name, cpu_id, gpu_id, ram) of recorded setups
+    setups: List[tuple]
+
+
+def synthetic_hardware(amount: int, rng: random.Random) -> List[dict]:
+    hardware = []
+    for i in range(amount):
+        type_, brands = ("CPU", ("Intel", "AMD")) if i % 2 == 0 else ("GPU", ("NVIDIA", "AMD", "Intel"))
+        brand = rng.choice(brands)
+        model = f"Model {i}"
+        hardware.append({"brand": brand, "model": model, "fullname": f"{brand} {model}", "type": type_})
+    return hardware
+
+
+def synthetic_requirements(catalog: Catalog, amount: int, rng: random.Random) -> List[dict]:
+    """
+    :return: embedded game_requirements documents holding amount setups in total.
+    """
+    cpus = catalog.cpu_ids[:BENCHMARKED_PARTS]
+    gpus = catalog.gpu_ids[:BENCHMARKED_PARTS]
+    documents: Dict[tuple, dict] = {}
+    for i in range(amount):
+        combination = (rng.choice(catalog.game_ids), rng.choice(RESOLUTIONS), rng.choice(SETTINGS))
+        document = documents.setdefault(combination, {"game_id": combination[0], "resolution": combination[1],
+                                                      "setting_name": combination[2], "setups": []})
+        cpu_index, gpu_index = rng.randrange(len(cpus)), rng.randrange(len(gpus))
+        fps = int(30 + cpu_index + 2 * gpu_index + rng.gauss(0, 5))
+        document["setups"].append({"cpu_id": cpus[cpu_index], "gpu_id": gpus[gpu_index], "ram": rng.choice(RAM_SIZES),
+                                   "fps": max(fps, 1), "taken_by": "benchmark", "notes": "", "verified": True})
+    return list(documents.values())
+
+
+async def insert_chunked(collection, documents: List[dict]):
+    for start in range(0, len(documents), INSERT_CHUNK_SIZE):
+        await collection.insert_many(documents[start:start + INSERT_CHUNK_SIZE])
+
+
+async def seed(db, games: int, hardware: int, setups: int, rng: random.Random) -> Catalog:
+    """
+    Fill the fake DB with a synthetic catalog.
+
+    :return: the ids of what was inserted, to build the requests from.
+    """
+    game_docs = synthetic_games(games)
+    for i, game in enumerate(game_docs):
+        game["genres"] = rng.sample(["Action", "RPG", "Shooter", "Strategy", "Racing", "Indie"], 2)
+        game[GENRE_KEYS_FIELD] = genre_keys(game["genres"])
+        game["created_at"] = datetime(2025, 1, 1, tzinfo=timezone.utc).replace(minute=i % 60, second=i % 59)
+    await insert_chunked(db["games"], game_docs)
+    hardware_docs = synthetic_hardware(hardware, rng)
+    await insert_chunked(db["hardware"], hardware_docs)
+
+    catalog = Catalog(game_ids=[str(game["_id"]) for game in game_docs],
+                      cpu_ids=[str(doc["_id"]) for doc in hardware_docs if doc["type"] == "CPU"],
+                      gpu_ids=[str(doc["_id"]) for doc in hardware_docs if doc["type"] == "GPU"],
+                      setups=[])
+    requirement_docs = synthetic_requirements(catalog, setups, rng)
+    if get_settings().requirements_storage == FLAT_STORAGE:
+        await insert_chunked(db[SETUPS_COLLECTION], [setup for doc in requirement_docs for setup in flatten_setups(doc)])
+    else:
+        await insert_chunked(db["game_requirements"], requirement_docs)
+    for doc in requirement_docs:
+        for setup in doc["setups"]:
+            catalog.setups.append((doc["game_id"], doc["resolution"], doc["setting_name"],
+                                   setup["cpu_id"], setup["gpu_id"], setup["ram"]))
+    return catalog
+
+
+def endpoints(catalog: Catalog, rng: random.Random) -> Dict[str, Callable[[], str]]:
+    """
+    :return: name of every benchmarked endpoint, with a function building one of its request paths.
+    """
+
+    def setup_query() -> str:
+        game_id, resolution, setting_name, cpu_id, gpu_id, ram = rng.choice(catalog.setups)
+        return (f"game_id={game_id}&resolution={resolution}&setting_name={setting_name}"
+                f"&cpu_id={cpu_id}&gpu_id={gpu_id}")
+
+    return {
+        "games_page": lambda: "/api/games?limit=50&sort=newest",
+        "games_cards": lambda: "/api/games?limit=50&view=card",
+        "games_category": lambda: "/api/games/category?genre=RPG&limit=20",
+        "games_newly_added": lambda: "/api/games/newly_added?limit=10",
+        "games_home": lambda: "/api/games/home",
+        "games_genres": lambda: "/api/games/genres",
+        "games_filter": lambda: "/api/games/filter?genre=RPG&api=DX12&year_from=2015",
+        "cpus": lambda: "/api/hardware/cpus",
+        "gpus_brand": lambda: "/api/hardware/gpus/brand?brand=NVIDIA",
+        "hardware_suggest": lambda: f"/api/hardware/suggest?q=model {rng.randrange(100)}",
+        "requirement": lambda: f"/api/req/game-requirements/?{setup_query()}&ram=32",
+        "estimate": lambda: f"/api/req/game-requirements/estimate?{setup_query()}",
+        "upgrade": lambda: f"/api/req/upgrade?{setup_query()}&ram=32&target_fps=90",
+        "playable": lambda: f"/api/req/playable?{setup_query()}&ram=32",
+    }
+
+
+def percentile(latencies: List[float], fraction: float) -> float:
+    """
+    :param latencies: sorted latencies.
+    :return: nearest-rank percentile.
+    """
+    return latencies[max(0, math.ceil(fraction * len(latencies)) - 1)]
+
+
+async def measure(client: AsyncClient, make_path: Callable[[], str], requests: int, concurrency: int) -> dict:
+    """
+    Send requests from concurrent clients, each sending its next request once the previous one is answered.
+
+    :return: requests/sec, latency percentiles (ms) and the amount of failed (5xx) requests.
+    """
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client_loop():
+        nonlocal errors
+        # The clients share the iterator, so exactly `requests` requests are sent
+        for _ in remaining:
+            path = make_path()
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"requests": requests, "concurrency": concurrency, "errors": errors,
+            "rps": round(requests / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3)}
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None):
+    print(f"{'endpoint':<20}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results.items():
+        line = f"{name:<20}{result['rps']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}{result['errors']:>8}"
+        previous = (baseline or {}).get(name)
+        if previous:
+            line += (f"   req/s {(result['rps'] / previous['rps'] - 1) * 100:+.1f}%"
+                     f"  p99 {(result['p99_ms'] / previous['p99_ms'] - 1) * 100:+.1f}%")
+        print(line)
+
+
+async def run(args) -> dict:
+    settings = get_settings()
+    settings.requirements_storage = args.storage
+    settings.response_cache_enabled = args.response_cache
+    rng = random.Random(args.seed)
+
+    # The app's dependencies read their collections from the process wide client, point it at the fake DB
+    mongodb.client = AsyncMongoMockClient()
+    mongodb.db = mongodb.client[settings.mongo_db_name]
+    seed_start = time.perf_counter()
+    catalog = await seed(mongodb.db, args.games, args.hardware, args.setups, rng)
+    print(f"Seeded {args.games} games, {args.hardware} hardware and {args.setups} setups "
+          f"in {time.perf_counter() - seed_start:.1f}s")
+
+    selected = endpoints(catalog, rng)
+    if args.endpoints:
+        selected = {name: selected[name] for name in args.endpoints.split(",")}
+    results = {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for name, make_path in selected.items():
+            # Warm up the in-memory caches (catalog, estimator, upgrade index) outside of the measurement
+            for _ in range(args.warmup):
+                await client.get(make_path())
+            results[name] = await measure(client, make_path, args.requests, args.concurrency)
+    return {"commit": current_commit(), "created_at": datetime.now(timezone.utc).isoformat(),
+            "config": vars(args), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the API against an in-process fake MongoDB")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--hardware", type=int, default=5000)
+    parser.add_argument("--setups", type=int, default=100000)
+    parser.add_argument("--storage", choices=("embedded", FLAT_STORAGE), default="embedded")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per endpoint")
+    parser.add_argument("--endpoints", help="comma separated endpoint names, all by default")
+    parser.add_argument("--response-cache", action="store_true", help="serve the catalog routes from the cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON results path, defaults to benchmarks/results/")
+    parser.add_argument("--compare", type=Path, help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    report["config"] = {key: str(value) if isinstance(value, Path) else value for key, value in report["config"].items()}
+    baseline = json.loads(args.compare.read_text())["results"] if args.compare else None
+    print_results(report["results"], baseline)
+
+    output = args.output or RESULTS_DIR / f"load-{report['commit'] or 'unknown'}-{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from backend.models.game import Game
+from backend.utils.serialization import ModelSerializer, dumps
+
+"""
+Micro-benchmark of the /api/games response serialization.
+
+- models: Game(**doc) per document, then jsonable_encoder and json.dumps (what FastAPI did per request).
+- fast: ModelSerializer - field picking, one list validation and orjson.
+- trusted: the fast path without validation (trust_db_documents).
+
+Usage:
+    python -m benchmarks.serialization --games 5000 --repeat 5
+"""
+
+
+def synthetic_games(amount: int) -> list:
+    return [{
+        "_id": ObjectId(),
+        "game_id": f"g{i}",
+        "name": f"Game {i}",
+        "publisher": "Publisher",
+        "developer": "Developer",
+        "release_date": 2000 + i % 25,
+        "genres": ["Action", "RPG"],
+        "desc": "A description of the game. " * 10,
+        "trailer_url": f"https://example.com/trailer/{i}",
+        "portrait_url": f"https://example.com/portrait/{i}",
+        "buy_links": [f"https://store.example.com/{i}"],
+        "landscape_s": f"https://example.com/s/{i}",
+        "landscape_m": f"https://example.com/m/{i}",
+        "landscape_l": f"https://example.com/l/{i}",
+        "landscape_xl": f"https://example.com/xl/{i}",
+        "available_resolutions": ["1920x1080", "2560x1440", "3840x2160"],
+        "supported_settings": ["Low", "Medium", "High", "Ultra"],
+        "is_ssd_recommended": True,
+        "upscale_support": ["DLSS", "FSR"],
+        "api_support": ["DX12", "Vulkan"],
+        "created_at": datetime(2025, 1, 1),
+    } for i in range(amount)]
+
+
+def serialize_with_models(games: list) -> bytes:
+    models = [Game(**game, id=str(game["_id"])) for game in games]
+    return json.dumps(jsonable_encoder(models)).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the /api/games response serialization")
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    games = synthetic_games(args.games)
+    serializer = ModelSerializer(Game)
+    candidates = {
+        "models": lambda: serialize_with_models(games),
+        "fast": lambda: dumps(serializer.documents(games)),
+        "trusted": lambda: dumps([serializer.document(game) for game in games]),
+    }
+    results = {name: min(timeit.repeat(run, number=1, repeat=args.repeat)) for name, run in candidates.items()}
+    for name, seconds in results.items():
+        print(f"{name:>8}: {seconds * 1000:8.1f} ms  ({results['models'] / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
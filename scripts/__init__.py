@@ -4,14 +4,7 @@ Scripts module: Contains MongoDB query functions for the DB.
 Modules:
 - games: each file for handling game-related database operations.
 - hardware: each file for handling hardware-related database operations.
-"""
-
-from motor.motor_asyncio import AsyncIOMotorClient
-
-# Import specific functions or classes to expose them at the package level
 
-# TODO remove after finishing editing DB
-
-# Connect to MongoDB (this assumes MongoDB is running on localhost)
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]  # Use your desired database name
\ No newline at end of file
+Scripts connect through the shared client in backend.app.database:
+call mongodb.connect() at the start of main() and mongodb.close() when done.
+"""
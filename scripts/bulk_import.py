@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Type, get_origin
+
+from pydantic import BaseModel, ValidationError, field_validator
+from pymongo import UpdateOne
+
+from backend.app.database import mongodb
+from backend.models.game import Game
+from backend.routes.requirements import GameSetupRequest
+from backend.services.hardware_catalog import HARDWARE_TYPES
+from backend.services.invalidation import publish_invalidation
+from backend.services.setups import COMBINATION_FIELDS, SETUPS_COLLECTION, is_flat_storage, setup_key, setup_upsert
+from backend.utils.genres import GENRE_KEYS_FIELD, genre_keys
+
+"""
+Bulk import of games, hardware or benchmark setups from CSV or JSONL files.
+
+Rows are read lazily, validated one by one (invalid rows are reported and skipped) and upserted in batches
+with unordered bulk_write calls, so importing a large benchmark dump takes a few round trips per thousand rows.
+Upserts are keyed like the single-record scripts (game_id, hardware_id + type, the setup key), so importing
+the same file again updates instead of duplicating. Setups already recorded are skipped, like
+backend.services.setups.add_setups does.
+
+After every written batch the amount of rows done is saved to a checkpoint file next to the input.
+If the import fails, running the same command again resumes after the last written batch.
+
+In CSV files list fields (E.G genres) are "|" separated or a JSON array.
+
+Usage:
+    python -m scripts.bulk_import setups techpowerup.csv --batch-size 2000
+    python -m scripts.bulk_import games games.jsonl --restart   # ignore the checkpoint
+"""
+BATCH_SIZE = 1000
+# Batches between two progress lines
+PROGRESS_EVERY = 10
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+class GameRow(Game):
+    # Derived from the name and release year when missing, like scripts/games/add_game.py
+    game_id: Optional[str] = None
+    # Set to the import time for new games
+    created_at: Optional[datetime] = None
+    id: Optional[str] = None
+
+
+class HardwareRow(BaseModel):
+    brand: str
+    model: str
+    fullname: str
+    type: str
+    # Derived from the brand and model when missing, like scripts/hardware/add_one_cpu.py
+    hardware_id: Optional[str] = None
+
+    @field_validator("type")
+    @classmethod
+    def hardware_type(cls, value: str) -> str:
+        """
+        Either case is accepted, stored as "cpu"/"gpu" like the single-record scripts in scripts/hardware.
+        """
+        if value.lower() not in HARDWARE_TYPES:
+            raise ValueError("type must be cpu or gpu")
+        return value.lower()
+
+
+class SetupRow(GameSetupRequest):
+    taken_by: str = ""
+    notes: str = ""
+    verified: bool = False
+    id: Optional[str] = None
+
+
+class ImportKind(NamedTuple):
+    model: Type[BaseModel]
+    collection: Callable[[], str]
+    # Turns a validated row into its document
+    document: Callable[[BaseModel], dict]
+    # Identifies a document, the last row of a batch wins when two share a key
+    key: Callable[[dict], tuple]
+    # Write operations of a batch of documents
+    operations: Callable[[List[dict]], List[UpdateOne]]
+
+
+class ImportReport(NamedTuple):
+    rows: int
+    written: int
+    invalid: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def game_document(row: GameRow) -> dict:
+    document = row.model_dump(exclude={"id"})
+    if document["game_id"] is None:
+        document["game_id"] = row.name.lower().replace(' ', '_') + "_" + str(row.release_date)
+    document[GENRE_KEYS_FIELD] = genre_keys(row.genres)
+    return document
+
+
+def game_operations(documents: List[dict]) -> List[UpdateOne]:
+    operations = []
+    for document in documents:
+        update = {"$set": {field: value for field, value in document.items() if value is not None}}
+        if document["created_at"] is None:
+            # Re-importing a game keeps the date it was first added
+            update["$setOnInsert"] = {"created_at": datetime.now(timezone.utc)}
+        operations.append(UpdateOne({"game_id": document["game_id"]}, update, upsert=True))
+    return operations
+
+
+def hardware_document(row: HardwareRow) -> dict:
+    document = row.model_dump()
+    if document["hardware_id"] is None:
+        document["hardware_id"] = row.brand.lower() + "_" + row.model.lower().replace(' ', '_')
+    return document
+
+
+def hardware_operations(documents: List[dict]) -> List[UpdateOne]:
+    # Documents stored with another type spelling are rewritten first by scripts/hardware/migrate_hardware_types.py
+    return [UpdateOne({"hardware_id": document["hardware_id"], "type": document["type"]},
+                      {"$set": document}, upsert=True) for document in documents]
+
+
+def setup_operations(documents: List[dict]) -> List[UpdateOne]:
+    """
+    Setups already recorded (same cpu/gpu/ram in their combination) are kept as they are, like add_setups().
+
+    Flat storage: one upsert per setup, only writing when inserting.
+    Embedded storage: one pipeline upsert per combination, appending the imported setups that its setups array
+    doesn't hold yet in a single atomic write - writing a batch again gives the same document.
+    Update pipelines need MongoDB 4.2 or later.
+    """
+    if is_flat_storage():
+        return [setup_upsert(document) for document in documents]
+    by_combination: Dict[tuple, List[dict]] = {}
+    for document in documents:
+        by_combination.setdefault(tuple(document[field] for field in COMBINATION_FIELDS), []).append(document)
+    operations = []
+    for combination, setups in by_combination.items():
+        setups = [{field: value for field, value in setup.items() if field not in COMBINATION_FIELDS}
+                  for setup in setups]
+        recorded = {"$ifNull": ["$setups", []]}
+        recorded_keys = {"$map": {"input": recorded, "as": "setup",
+                                  "in": {"cpu_id": "$$setup.cpu_id", "gpu_id": "$$setup.gpu_id", "ram": "$$setup.ram"}}}
+        new = {"$filter": {"input": {"$literal": setups}, "as": "setup",
+                           "cond": {"$not": {"$in": [{"cpu_id": "$$setup.cpu_id", "gpu_id": "$$setup.gpu_id",
+                                                      "ram": "$$setup.ram"}, recorded_keys]}}}}
+        operations.append(UpdateOne(dict(zip(COMBINATION_FIELDS, combination)),
+                                    [{"$set": {"setups": {"$concatArrays": [recorded, new]}}}], upsert=True))
+    return operations
+
+
+IMPORT_KINDS: Dict[str, ImportKind] = {
+    "games": ImportKind(GameRow, lambda: "games", game_document,
+                        lambda document: (document["game_id"],), game_operations),
+    "hardware": ImportKind(HardwareRow, lambda: "hardware", hardware_document,
+                           lambda document: (document["hardware_id"], document["type"]), hardware_operations),
+    "setups": ImportKind(SetupRow, lambda: SETUPS_COLLECTION if is_flat_storage() else "game_requirements",
+                         lambda row: row.model_dump(exclude={"id"}),
+                         lambda document: tuple(setup_key(document).values()), setup_operations),
+}
+
+
+def _csv_row(row: Dict[str, str], model: Type[BaseModel]) -> dict:
+    """
+    Empty cells are left out (so defaults apply) and list fields are split.
+    """
+    values = {}
+    for field, value in row.items():
+        if value is None or value == "":
+            continue
+        model_field = model.model_fields.get(field)
+        if model_field is not None and get_origin(model_field.annotation) is list:
+            value = json.loads(value) if value.startswith("[") else [item.strip() for item in value.split("|")]
+        values[field] = value
+    return values
+
+
+def read_rows(path: Path, model: Type[BaseModel]) -> Iterator[dict]:
+    """
+    :param path: .csv, .jsonl or .ndjson file.
+    :param model: row model, tells which CSV columns are lists.
+    :return: iterator over the raw rows of the file.
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        if path.suffix == ".csv":
+            for row in csv.DictReader(file):
+                yield _csv_row(row, model)
+        elif path.suffix in (".jsonl", ".ndjson"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported file type '{path.suffix}', expected .csv, .jsonl or .ndjson")
+
+
+def load_checkpoint(checkpoint: Path, source: Path, kind: str) -> int:
+    """
+    :return: amount of rows of the source already imported, 0 without a matching checkpoint.
+    """
+    if not checkpoint.exists():
+        return 0
+    saved = json.loads(checkpoint.read_text())
+    if (saved.get("source") != str(source.resolve()) or saved.get("kind") != kind
+            or saved.get("size") != source.stat().st_size):
+        print(f"Ignoring checkpoint {checkpoint}, it was saved for another file or version of it")
+        return 0
+    return saved["rows"]
+
+
+def save_checkpoint(checkpoint: Path, source: Path, kind: str, rows: int):
+    temporary = checkpoint.with_name(checkpoint.name + ".tmp")
+    temporary.write_text(json.dumps({"source": str(source.resolve()), "kind": kind,
+                                     "size": source.stat().st_size, "rows": rows}))
+    # Atomic, a crash never leaves a half written checkpoint
+    os.replace(temporary, checkpoint)
+
+
+async def import_rows(kind_name: str, rows: Iterable[dict], collection, batch_size: int = BATCH_SIZE,
+                      skip: int = 0, on_batch: Optional[Callable[[int], None]] = None) -> ImportReport:
+    """
+    Validate and upsert rows in batches.
+
+    :param kind_name: "games", "hardware" or "setups".
+    :param rows: raw rows, E.G from read_rows().
+    :param collection: collection to write to.
+    :param batch_size: amount of rows written per batch.
+    :param skip: amount of leading rows already imported (resuming from a checkpoint).
+    :param on_batch: called with the amount of rows done after every written batch.
+    :return: report of the imported rows.
+    """
+    kind = IMPORT_KINDS[kind_name]
+    start = time.perf_counter()
+    rows_done = skip
+    written = invalid = batches = 0
+    batch: Dict[tuple, dict] = {}
+
+    async def flush():
+        nonlocal written, batches
+        if batch:
+            await collection.bulk_write(kind.operations(list(batch.values())), ordered=False)
+            written += len(batch)
+            batch.clear()
+        batches += 1
+        if on_batch is not None:
+            on_batch(rows_done)
+        if batches % PROGRESS_EVERY == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{rows_done} rows done, {written / elapsed:.0f} rows/s")
+
+    for row_number, raw in enumerate(rows, 1):
+        if row_number <= skip:
+            continue
+        try:
+            document = kind.document(kind.model.model_validate(raw))
+            batch[kind.key(document)] = document
+        except ValidationError as e:
+            invalid += 1
+            print(f"Skipping invalid row {row_number}: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+        rows_done = row_number
+        if row_number % batch_size == 0:
+            await flush()
+    if rows_done % batch_size:
+        await flush()
+    return ImportReport(rows_done - skip, written, invalid, time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk import games, hardware or setups from CSV or JSONL files")
+    parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--checkpoint", type=Path, help="checkpoint file, defaults to <path>.checkpoint")
+    parser.add_argument("--restart", action="store_true", help="import from the first row, ignoring the checkpoint")
+    args = parser.parse_args()
+
+    kind = IMPORT_KINDS[args.kind]
+    checkpoint = args.checkpoint or args.path.with_name(args.path.name + CHECKPOINT_SUFFIX)
+    skip = 0 if args.restart else load_checkpoint(checkpoint, args.path, args.kind)
+    if skip:
+        print(f"Resuming after row {skip} (from {checkpoint})")
+
+    mongodb.connect()
+    try:
+        collection_name = kind.collection()
+        report = await import_rows(args.kind, read_rows(args.path, kind.model), mongodb.get_collection(collection_name),
+                                   args.batch_size, skip,
+                                   lambda rows: save_checkpoint(checkpoint, args.path, args.kind, rows))
+        checkpoint.unlink(missing_ok=True)
+        # Running app processes drop their caches built from the collection
+        await publish_invalidation(mongodb.db, collection_name)
+        print(f"Imported {report.written} {args.kind} ({report.invalid} invalid rows skipped) into "
+              f"'{collection_name}' in {report.seconds:.1f}s, {report.rows_per_second:.0f} rows/s")
+    finally:
+        mongodb.close()
+
+
+# Run the script
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,9 @@
 import asyncio
 from datetime import datetime, timezone
 
-from motor.motor_asyncio import AsyncIOMotorClient
-
-# Connect to MongoDB
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]
-collection = db.games
+from backend.app.database import mongodb
+from backend.services.invalidation import publish_invalidation
+from backend.utils.genres import GENRE_KEYS_FIELD, genre_keys
 
 
 # TODO add OS_support
@@ -55,13 +52,16 @@ async def add_one_game(name,
     :param available_resolutions: array of available resolutions in game
     """
     game_id = name.lower().replace(' ', '_') + "_" + str(release_date)
-    await db.games.insert_one({
+    collection = mongodb.get_collection("games")
+    await collection.insert_one({
         "game_id": game_id,
         "name": name,
         "publisher": publisher,
         "developer": developer,
         "release_date": release_date,
         "genres": genres,
+        # Normalised genres the category queries match
+        GENRE_KEYS_FIELD: genre_keys(genres),
         "desc": desc,
         "is_ssd_recommended": is_ssd_required,
         "upscale_support": upscale_support,
@@ -77,10 +77,20 @@ async def add_one_game(name,
         "supported_settings": supported_settings,
         "available_resolutions": available_resolutions,
     })
+    # Running app processes drop their cached game responses
+    await publish_invalidation(mongodb.db, "games")
     print(f"Game '{name}' added to the database.")
 
 
 async def main():
+    mongodb.connect()
+    try:
+        await add_cyberpunk()
+    finally:
+        mongodb.close()
+
+
+async def add_cyberpunk():
     name = "Cyberpunk 2077"
 
     publisher = "CD PROJEKT RED"
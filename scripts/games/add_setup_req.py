@@ -1,28 +1,22 @@
 import asyncio
+from typing import List
 
 from bson import ObjectId
-from dns.e164 import query
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from backend.routes.cpus import get_all_cpus
+from backend.app.database import get_requirements_collection, mongodb
+from backend.app.indexes import REQUIRED_INDEXES, ensure_indexes
+from backend.services.invalidation import publish_invalidation
+from backend.services.setups import SETUPS_COLLECTION, add_setups, is_flat_storage
 
-# Connect to MongoDB
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]
-collection = db.game_requirements
 
-
-async def add_new_req(game_id, resolution, setting_name, cpu_id, gpu_id, ram, fps, taken_by, notes, verified):
-    # The info needed to find our document for inserting now.
-    find_query = {
+def new_setup_doc(game_id, resolution, setting_name, cpu_id, gpu_id, ram, fps, taken_by, notes, verified) -> dict:
+    """
+    :return: the flat setup document of a benchmark result.
+    """
+    return {
         "game_id": ObjectId(game_id),
         "resolution": resolution,
         "setting_name": setting_name,
-    }
-    # Check if there is a document in the DB for the combination of game-resolution-setting.
-    existing_document = await collection.find_one(find_query)
-    # The new setup as an object
-    new_setup = {
         "cpu_id": cpu_id,
         "gpu_id": gpu_id,
         "ram": ram,
@@ -32,72 +26,65 @@ async def add_new_req(game_id, resolution, setting_name, cpu_id, gpu_id, ram, fp
         "verified": verified,
     }
 
-    if existing_document:
-        # Found a document with the same combination - check if we already have a matching setup recorded.
-        for setup in existing_document["setups"]:
-            if (setup["cpu_id"] == new_setup["cpu_id"]
-                    and setup["gpu_id"] == new_setup["gpu_id"]
-                    and setup["ram"] == new_setup["ram"]):
-                print("Setup exists. No Changes made.")
-                return
 
-            # Add the new setup to the document
-            await collection.update_one(find_query, {"$addToSet": {"setups": new_setup}})
-            print("Setup added to existing document")
+async def add_new_reqs(setup_docs: List[dict]) -> int:
+    """
+    Add benchmark setups, skipping the ones whose game/resolution/setting and cpu/gpu/ram are already recorded.
+    Every setup is a single atomic upsert and the whole list a single bulk write (see backend.services.setups).
 
-    # There is no matching doc. Congratulations! we will create one and insert the setup
-    else:
-        new_doc = {
-            "game_id": ObjectId(game_id),
-            "resolution": resolution,
-            "setting_name": setting_name,
-            "setups": [new_setup],
-        }
-        await collection.insert_one(new_doc)
-        print("New document created and setup inserted")
+    :param setup_docs: setups built with new_setup_doc().
+    :return: amount of setups added.
+    """
+    added = await add_setups(get_requirements_collection(), setup_docs)
+    if added:
+        # Running app processes rebuild their indexes of the setups
+        await publish_invalidation(mongodb.db, SETUPS_COLLECTION if is_flat_storage() else "game_requirements")
+    print(f"{added} setups added, {len(setup_docs) - added} already recorded")
+    return added
+
+
+async def add_new_req(game_id, resolution, setting_name, cpu_id, gpu_id, ram, fps, taken_by, notes, verified):
+    return await add_new_reqs([new_setup_doc(game_id, resolution, setting_name, cpu_id, gpu_id, ram, fps,
+                                             taken_by, notes, verified)])
 
 
 async def main():
-    # FHD
-    await add_new_req(
-        game_id=ObjectId("67dc8f83ad86710d1835b4b7"),  # KCD2
-        resolution="1920x1080",
-        setting_name="Ultra",
-        cpu_id=ObjectId("67d71a8a78bb4d95617f0eaa"),  # 9800x3d
-        gpu_id=ObjectId(""),  #
-        ram=32,
-        fps=,
-        taken_by="TechPowerUp",
-        notes="",
-        verified=True,
-    )
-    # 2K
-    await add_new_req(
-        game_id=ObjectId("67dc8f83ad86710d1835b4b7"),  # KCD2
-        resolution="2560x1440",
-        setting_name="Ultra",
-        cpu_id=ObjectId("67d71a8a78bb4d95617f0eaa"),  # 9800x3d
-        gpu_id=ObjectId(""),  #
-        ram=32,
-        fps=,
-        taken_by="TechPowerUp",
-        notes="",
-        verified=True,
-    )
-    # 4K
-    await add_new_req(
+    mongodb.connect()
+    try:
+        # Setups already recorded are skipped thanks to the collection's unique index
+        collection_name = SETUPS_COLLECTION if is_flat_storage() else "game_requirements"
+        await ensure_indexes(mongodb.db, [spec for spec in REQUIRED_INDEXES
+                                          if spec.collection == collection_name and spec.unique])
+        await add_kcd2_setups()
+    finally:
+        mongodb.close()
+
+
+async def add_kcd2_setups():
+    # TODO fill in the GPU and the FPS of each TechPowerUp run before running
+    gpu_id = None
+    fps_by_resolution = {
+        "1920x1080": None,  # FHD
+        "2560x1440": None,  # 2K
+        "3840x2160": None,  # 4K
+    }
+    if gpu_id is None or None in fps_by_resolution.values():
+        print("KCD2 setups are missing their GPU or FPS, nothing added")
+        return
+    await add_new_reqs([new_setup_doc(
         game_id=ObjectId("67dc8f83ad86710d1835b4b7"),  # KCD2
-        resolution="3840x2160",
+        resolution=resolution,
         setting_name="Ultra",
         cpu_id=ObjectId("67d71a8a78bb4d95617f0eaa"),  # 9800x3d
-        gpu_id=ObjectId(""),  #
+        gpu_id=ObjectId(gpu_id),
         ram=32,
-        fps=,
+        fps=fps,
         taken_by="TechPowerUp",
         notes="",
         verified=True,
-    )
+    ) for resolution, fps in fps_by_resolution.items()])
 
 
 # Run the script
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,22 @@
+import asyncio
+
+from backend.app.database import get_matrix_collection, get_requirements_collection, mongodb
+from backend.app.indexes import REQUIRED_INDEXES, ensure_indexes
+from backend.services.matrix import MATRIX_COLLECTION, build_matrices
+
+
+async def main():
+    mongodb.connect()
+    try:
+        # $merge matches the matrices on this unique index
+        await ensure_indexes(mongodb.db, [spec for spec in REQUIRED_INDEXES if spec.collection == MATRIX_COLLECTION])
+        await build_matrices(get_requirements_collection(), get_matrix_collection())
+        built = await get_matrix_collection().count_documents({})
+        print(f"Built {built} requirement matrices into '{MATRIX_COLLECTION}'.")
+    finally:
+        mongodb.close()
+
+
+# Run the script
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+import asyncio
+
+from pymongo import UpdateOne
+
+from backend.app.database import mongodb
+from backend.app.indexes import REQUIRED_INDEXES, ensure_indexes
+from backend.services.invalidation import publish_invalidation
+from backend.utils.genres import GENRE_KEYS_FIELD, genre_keys
+
+# Amount of games written per bulk_write call
+BATCH_SIZE = 1000
+
+
+async def migrate_genre_keys(games_collection, batch_size: int = BATCH_SIZE):
+    """
+    Set the normalised genre_keys of every game whose keys are missing or out of date with its genres.
+    Running the migration again only writes what changed.
+
+    :param games_collection: the games collection.
+    :param batch_size: amount of games written per bulk_write call.
+    :return: amount of games updated.
+    """
+    written = 0
+    operations = []
+    async for game in games_collection.find({}, {"genres": 1, GENRE_KEYS_FIELD: 1}):
+        keys = genre_keys(game.get("genres") or [])
+        if game.get(GENRE_KEYS_FIELD) == keys:
+            continue
+        operations.append(UpdateOne({"_id": game["_id"]}, {"$set": {GENRE_KEYS_FIELD: keys}}))
+        if len(operations) >= batch_size:
+            await games_collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        await games_collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    return written
+
+
+async def main():
+    mongodb.connect()
+    try:
+        await ensure_indexes(mongodb.db, [spec for spec in REQUIRED_INDEXES if spec.name == GENRE_KEYS_FIELD])
+        written = await migrate_genre_keys(mongodb.get_collection("games"))
+        # Running app processes drop their cached game responses
+        await publish_invalidation(mongodb.db, "games")
+        print(f"Set {GENRE_KEYS_FIELD} of {written} games.")
+    finally:
+        mongodb.close()
+
+
+# Run the script
+if __name__ == "__main__":
+    asyncio.run(main())
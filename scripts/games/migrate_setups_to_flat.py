@@ -0,0 +1,54 @@
+import asyncio
+
+from pymongo import UpdateOne
+
+from backend.app.database import mongodb
+from backend.app.indexes import REQUIRED_INDEXES, ensure_indexes
+from backend.services.setups import SETUPS_COLLECTION, flatten_setups, setup_key
+
+# Amount of setups written per bulk_write call
+BATCH_SIZE = 1000
+
+
+async def migrate_setups(requirements_collection, setups_collection, batch_size: int = BATCH_SIZE):
+    """
+    Copy every setup embedded in game_requirements into its own game_setups document.
+    Setups are upserted by their (game_id, resolution, setting_name, cpu_id, gpu_id, ram) key,
+    so running the migration again only updates what changed.
+
+    :param requirements_collection: the embedded game_requirements collection.
+    :param setups_collection: the flat game_setups collection.
+    :param batch_size: amount of setups written per bulk_write call.
+    :return: amount of setups written.
+    """
+    written = 0
+    operations = []
+    async for requirement_doc in requirements_collection.find():
+        for setup_doc in flatten_setups(requirement_doc):
+            operations.append(UpdateOne(setup_key(setup_doc), {"$set": setup_doc}, upsert=True))
+            if len(operations) >= batch_size:
+                await setups_collection.bulk_write(operations, ordered=False)
+                written += len(operations)
+                operations = []
+    if operations:
+        await setups_collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    return written
+
+
+async def main():
+    mongodb.connect()
+    try:
+        # The unique lookup index makes the upserts point queries
+        await ensure_indexes(mongodb.db, [spec for spec in REQUIRED_INDEXES if spec.collection == SETUPS_COLLECTION])
+        written = await migrate_setups(mongodb.get_collection("game_requirements"),
+                                       mongodb.get_collection(SETUPS_COLLECTION))
+        print(f"Migrated {written} setups into '{SETUPS_COLLECTION}'. "
+              f"Set REQUIREMENTS_STORAGE=flat to read from it.")
+    finally:
+        mongodb.close()
+
+
+# Run the script
+if __name__ == "__main__":
+    asyncio.run(main())
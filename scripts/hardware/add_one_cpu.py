@@ -1,14 +1,12 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 
-# Connect to MongoDB
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]
-collection = db.hardware
+from backend.app.database import mongodb
+from backend.services.invalidation import publish_invalidation
 
 
 async def add_cpu(brand, model, fullname):
     cpu_id = brand.lower() + "_" + model.lower().replace(' ', '_')
+    collection = mongodb.get_collection("hardware")
 
     existing_cpu = await collection.find_one({"hardware_id": cpu_id, "type": "cpu"})
     if existing_cpu:
@@ -20,14 +18,20 @@ async def add_cpu(brand, model, fullname):
         "brand": brand,
         "model": model,
         "fullname": fullname,
-        "type": f"{brand.lower()}"
+        "type": "cpu"
     })
+    # Running app processes drop their cached hardware responses
+    await publish_invalidation(mongodb.db, "hardware")
     print(f"CPU '{fullname}' added successfully.")
 
 
 async def main():
-    #await add_cpu("AMD", "RYZEN 5700X3D", "Ryzen 7 5700X3D")
-    await add_cpu("Intel", "I9 10910", "Core I9 10910")
+    mongodb.connect()
+    try:
+        #await add_cpu("AMD", "RYZEN 5700X3D", "Ryzen 7 5700X3D")
+        await add_cpu("Intel", "I9 10910", "Core I9 10910")
+    finally:
+        mongodb.close()
 
 
 # Run the script
@@ -1,12 +1,7 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 
-from backend.routes.cpus import get_all_cpus
-
-# Connect to MongoDB
-client = AsyncIOMotorClient('mongodb://localhost:27017')
-db = client["game_db"]
-collection = db.hardware
+from backend.app.database import mongodb
+from backend.services.invalidation import publish_invalidation
 
 async def add_gpu(brand, model, fullname):
     """
@@ -20,19 +15,26 @@ async def add_gpu(brand, model, fullname):
         return
     # Standardize ids for the CPUs
     gpu_id = brand.lower() + "_" + model.lower().replace(' ', '_')
+    collection = mongodb.get_collection("hardware")
     # Check if the CPU already exists to avoid duplicates
-    existing_gpu = await db.hardware.find_one({"hardware_id": gpu_id, "type": "gpu"})
+    existing_gpu = await collection.find_one({"hardware_id": gpu_id, "type": "gpu"})
     if existing_gpu:
         print(f"GPU '{fullname}' already exists in the database.")
         return
     # Insert the new CPU to the DB
-    await db.hardware.insert_one(
-        {"hardware_id": gpu_id, "brand": brand, "model": model, "fullname": fullname, "type": "gpu_" + brand.lower()})
+    await collection.insert_one(
+        {"hardware_id": gpu_id, "brand": brand, "model": model, "fullname": fullname, "type": "gpu"})
+    # Running app processes drop their cached hardware responses
+    await publish_invalidation(mongodb.db, "hardware")
     print(f"GPU '{fullname}' added successfully.")
 
 
 async def main():
-    await add_gpu("Nvidia", "RTX 4060TI (16GB)", "GeForce RTX 4060TI (16GB)")
+    mongodb.connect()
+    try:
+        await add_gpu("Nvidia", "RTX 4060TI (16GB)", "GeForce RTX 4060TI (16GB)")
+    finally:
+        mongodb.close()
 
 
 # Run the script
@@ -0,0 +1,55 @@
+import asyncio
+
+from pymongo import UpdateOne
+
+from backend.app.database import mongodb
+from backend.services.hardware_catalog import HARDWARE_TYPES
+from backend.services.invalidation import publish_invalidation
+
+# Amount of hardware documents written per bulk_write call
+BATCH_SIZE = 1000
+# Prefix of the GPU types older versions of scripts/hardware/add_one_gpu.py stored. E.G "gpu_nvidia"
+GPU_BRAND_PREFIX = "gpu_"
+
+
+async def migrate_hardware_types(hardware_collection, batch_size: int = BATCH_SIZE):
+    """
+    Rewrite the type of every CPU/GPU stored with another spelling (E.G "CPU" or "gpu_nvidia") as "cpu"/"gpu".
+    Running the migration again only writes what changed.
+
+    :param hardware_collection: the hardware collection.
+    :param batch_size: amount of documents written per bulk_write call.
+    :return: amount of documents updated.
+    """
+    written = 0
+    operations = []
+    async for hardware in hardware_collection.find({}, {"type": 1}):
+        type_ = str(hardware.get("type", ""))
+        canonical = "gpu" if type_.lower().startswith(GPU_BRAND_PREFIX) else type_.lower()
+        if canonical == type_ or canonical not in HARDWARE_TYPES:
+            continue
+        operations.append(UpdateOne({"_id": hardware["_id"]}, {"$set": {"type": canonical}}))
+        if len(operations) >= batch_size:
+            await hardware_collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        await hardware_collection.bulk_write(operations, ordered=False)
+        written += len(operations)
+    return written
+
+
+async def main():
+    mongodb.connect()
+    try:
+        written = await migrate_hardware_types(mongodb.get_collection("hardware"))
+        # Running app processes drop their cached hardware responses
+        await publish_invalidation(mongodb.db, "hardware")
+        print(f"Set the type of {written} hardware documents.")
+    finally:
+        mongodb.close()
+
+
+# Run the script
+if __name__ == "__main__":
+    asyncio.run(main())
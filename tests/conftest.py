@@ -1,11 +1,44 @@
+from contextlib import contextmanager
+
 import pytest
+import pytest_asyncio
 from fastapi import FastAPI
 from httpx import AsyncClient, ASGITransport
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock
 from bson import ObjectId
 
+from backend.app.database import get_hardware_collection
 from backend.routes.requirements import router as requirements_router
 from backend.routes.games import router as games_router
+from backend.services.game_filters import game_filters_cache
+from backend.services.game_search import game_search_cache
+from backend.services.genre_facets import genre_facets_cache
+from backend.services.hardware_catalog import hardware_catalog
+from backend.services.home import home_cache
+from backend.services.playable import playable_index_cache
+from backend.services.row_config import row_config
+
+
+@pytest.fixture(autouse=True)
+def reset_in_memory_caches():
+    """
+    In-memory caches are process wide, drop them so every test loads its own fake data.
+    """
+    hardware_catalog.clear()
+    game_search_cache.invalidate()
+    game_filters_cache.invalidate()
+    genre_facets_cache.invalidate()
+    row_config.clear()
+    home_cache.invalidate()
+    playable_index_cache.invalidate()
+    yield
+    hardware_catalog.clear()
+    game_search_cache.invalidate()
+    game_filters_cache.invalidate()
+    genre_facets_cache.invalidate()
+    row_config.clear()
+    home_cache.invalidate()
+    playable_index_cache.invalidate()
 
 
 @pytest.fixture
@@ -20,7 +53,7 @@ def test_app():
     return app
 
 
-@pytest.fixture
+@pytest_asyncio.fixture
 async def async_client(test_app: FastAPI):
     """
     Reusable async client for sending requests to test_app.
@@ -308,17 +341,48 @@ def fake_gpus_list_wrong_brand():
     ]
 
 
-def load_data(type_, fake_data):
+def mock_collection(find_result=None, find_one_result=None):
     """
-    Utility to select the correct fake data and patch the MongoDB .find().to_list() call
-    for the given hardware type ('cpu' or 'gpu').
+    Builds a fake Motor collection whose .find().to_list() and .find_one() return the given data.
 
-    :param type_: "cpu" or "gpu"
-    :param fake_data: list of mocked CPU/ GPU dictionaries
-    :return: context manager that patches the .find() call
+    :param find_result: what awaiting .find(...).to_list() returns
+    :param find_one_result: what awaiting .find_one(...) returns
+    :return: MagicMock standing in for an AsyncIOMotorCollection
     """
-    # Use the relevant fake data source
-    # Mock the DB to return GPUs (invalid for this route)
     mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=fake_data)
-    return patch(f"backend.routes.{type_}s.collection.find", return_value=mock_cursor)
+    mock_cursor.to_list = AsyncMock(return_value=find_result)
+    # Cursor modifiers are chainable like Motor's
+    for modifier in ("sort", "limit", "skip"):
+        setattr(mock_cursor, modifier, MagicMock(return_value=mock_cursor))
+    collection = MagicMock()
+    collection.find = MagicMock(return_value=mock_cursor)
+    collection.find_one = AsyncMock(return_value=find_one_result)
+    return collection
+
+
+@contextmanager
+def override_collection(app: FastAPI, dependency, collection):
+    """
+    Swap a collection dependency (E.G get_games_collection) of the app for a fake one.
+
+    :param app: FastAPI app the routers are included in
+    :param dependency: dependency from backend.app.database to override
+    :param collection: the fake collection
+    :return: context manager yielding the fake collection
+    """
+    app.dependency_overrides[dependency] = lambda: collection
+    try:
+        yield collection
+    finally:
+        app.dependency_overrides.pop(dependency, None)
+
+
+def load_data(app: FastAPI, fake_data):
+    """
+    Utility to make the hardware collection's .find().to_list() call return the fake data.
+
+    :param app: FastAPI app the hardware routers are included in
+    :param fake_data: list of mocked CPU/ GPU dictionaries
+    :return: context manager that overrides the hardware collection
+    """
+    return override_collection(app, get_hardware_collection, mock_collection(find_result=fake_data))
@@ -0,0 +1,144 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pydantic import ValidationError
+
+from backend.app.config import get_settings
+from scripts.bulk_import import (import_rows, load_checkpoint, read_rows, save_checkpoint, GameRow, HardwareRow,
+                                 SetupRow)
+from scripts.hardware.migrate_hardware_types import migrate_hardware_types
+
+SETUPS_CSV = """game_id,resolution,setting_name,cpu_id,gpu_id,ram,fps,taken_by,notes,verified
+g1,1920x1080,Ultra,cpu1,gpu1,16,60,TechPowerUp,,true
+g1,1920x1080,Ultra,cpu1,gpu2,16,75,TechPowerUp,,true
+g1,1920x1080,Ultra,cpu1,gpu1,16,not a number,TechPowerUp,,true
+g1,2560x1440,Ultra,cpu1,gpu1,32,,TechPowerUp,,false
+g2,1920x1080,High,cpu2,gpu1,16,90,TechPowerUp,,true
+"""
+
+
+@pytest.fixture
+def setups_csv(tmp_path):
+    path = tmp_path / "setups.csv"
+    path.write_text(SETUPS_CSV)
+    return path
+
+
+def fake_collection(fail_on_call=None):
+    collection = MagicMock()
+    calls = []
+
+    async def bulk_write(operations, ordered):
+        calls.append(operations)
+        if len(calls) == fail_on_call:
+            raise ConnectionError("lost the server")
+
+    collection.bulk_write = AsyncMock(side_effect=bulk_write)
+    collection.calls = calls
+    return collection
+
+
+def test_csv_cells_are_parsed_for_the_model(tmp_path):
+    path = tmp_path / "games.csv"
+    path.write_text('name,genres,api_support,release_date\nWitcher,RPG|Open World,"[""DX12""]",2015\n')
+
+    assert list(read_rows(path, GameRow)) == [
+        {"name": "Witcher", "genres": ["RPG", "Open World"], "api_support": ["DX12"], "release_date": "2015"}]
+
+
+@pytest.mark.asyncio
+async def test_flat_setups_are_upserted_in_unordered_batches(setups_csv, monkeypatch):
+    monkeypatch.setattr(get_settings(), "requirements_storage", "flat")
+    collection = fake_collection()
+
+    report = await import_rows("setups", read_rows(setups_csv, SetupRow), collection, batch_size=2)
+
+    assert (report.rows, report.written, report.invalid) == (5, 4, 1)
+    assert [len(batch) for batch in collection.calls] == [2, 1, 1]
+    assert all(call.kwargs["ordered"] is False for call in collection.bulk_write.call_args_list)
+    first = collection.calls[0][0]
+    assert first._filter == {"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra",
+                             "cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16}
+    assert first._upsert and first._doc["$setOnInsert"]["fps"] == 60
+
+
+@pytest.mark.asyncio
+async def test_embedded_setups_skip_the_setups_already_in_their_combination(setups_csv, monkeypatch):
+    monkeypatch.setattr(get_settings(), "requirements_storage", "embedded")
+    collection = fake_collection()
+
+    await import_rows("setups", read_rows(setups_csv, SetupRow), collection, batch_size=10)
+
+    # One atomic write per combination
+    [operations] = collection.calls
+    assert len(operations) == 3
+    assert all(operation._upsert for operation in operations)
+
+    # Applying the batch twice (E.G replayed after a crash) gives the same documents
+    requirements = AsyncMongoMockClient()["test_db"]["game_requirements"]
+    await requirements.insert_one({"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra",
+                                   "setups": [{"cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16, "fps": 30},
+                                              {"cpu_id": "cpu9", "gpu_id": "gpu9", "ram": 8, "fps": 20}]})
+    for _ in range(2):
+        for operation in operations:
+            await requirements.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+
+    assert await requirements.count_documents({}) == 3
+    document = await requirements.find_one({"game_id": "g1", "resolution": "1920x1080"})
+    # Like add_setups(), the recorded cpu1/gpu1/16 setup is kept
+    assert [(setup["gpu_id"], setup["fps"]) for setup in document["setups"]] == [("gpu1", 30), ("gpu9", 20),
+                                                                                ("gpu2", 75)]
+
+
+def test_hardware_type_is_stored_like_the_app_spells_it():
+    assert HardwareRow(brand="AMD", model="7800X3D", fullname="Ryzen 7 7800X3D", type="CPU").type == "cpu"
+    assert HardwareRow(brand="AMD", model="RX 7900", fullname="Radeon RX 7900", type="gpu").type == "gpu"
+    with pytest.raises(ValidationError):
+        HardwareRow(brand="AMD", model="X670", fullname="X670", type="motherboard")
+
+
+@pytest.mark.asyncio
+async def test_migration_rewrites_other_type_spellings():
+    hardware = AsyncMongoMockClient()["test_db"]["hardware"]
+    await hardware.insert_many([{"hardware_id": "amd_7800x3d", "type": "CPU"},
+                                {"hardware_id": "nvidia_rtx_4060", "type": "gpu_nvidia"},
+                                {"hardware_id": "amd_rx_7600", "type": "gpu"},
+                                {"hardware_id": "corsair_ram", "type": "ram"}])
+    written = []
+
+    async def bulk_write(operations, ordered):
+        written.extend(operations)
+        for operation in operations:
+            await hardware.update_one(operation._filter, operation._doc)
+
+    hardware.bulk_write = bulk_write
+
+    assert await migrate_hardware_types(hardware) == 2
+    assert {doc["hardware_id"]: doc["type"] async for doc in hardware.find()} == {
+        "amd_7800x3d": "cpu", "nvidia_rtx_4060": "gpu", "amd_rx_7600": "gpu", "corsair_ram": "ram"}
+    assert await migrate_hardware_types(hardware) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_import_resumes_after_the_last_written_batch(setups_csv, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "requirements_storage", "flat")
+    checkpoint = tmp_path / "setups.csv.checkpoint"
+
+    def save(rows):
+        save_checkpoint(checkpoint, setups_csv, "setups", rows)
+
+    with pytest.raises(ConnectionError):
+        await import_rows("setups", read_rows(setups_csv, SetupRow), fake_collection(fail_on_call=2),
+                          batch_size=2, on_batch=save)
+    assert json.loads(checkpoint.read_text())["rows"] == 2
+
+    skip = load_checkpoint(checkpoint, setups_csv, "setups")
+    collection = fake_collection()
+    report = await import_rows("setups", read_rows(setups_csv, SetupRow), collection, batch_size=2, skip=skip)
+
+    assert report.rows == 3
+    assert [operation._filter["gpu_id"] for batch in collection.calls for operation in batch] == ["gpu1", "gpu1"]
+    # Another file (or an edited one) doesn't resume
+    assert load_checkpoint(checkpoint, tmp_path / "setups.csv", "games") == 0
@@ -0,0 +1,149 @@
+import itertools
+import random
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from backend.app.database import get_requirements_collection
+from backend.routes.requirements import router as requirements_router
+from backend.services.estimator import PerformanceEstimator, estimator_cache
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from tests.conftest import mock_collection, override_collection
+
+app = FastAPI()
+app.include_router(requirements_router)
+
+CPU_FACTORS = {"cpu1": 1.0, "cpu2": 1.3, "cpu3": 0.8}
+GPU_FACTORS = {"gpu1": 1.0, "gpu2": 1.6, "gpu3": 2.2}
+GAME_FPS = {("g1", "1920x1080"): 60, ("g1", "3840x2160"): 25, ("g2", "1920x1080"): 140}
+
+
+def synthetic_setups(skip=()):
+    """
+    Setups whose fps is exactly game fps * cpu factor * gpu factor.
+    """
+    setups = []
+    for (game_id, resolution), cpu_id, gpu_id in itertools.product(GAME_FPS, CPU_FACTORS, GPU_FACTORS):
+        if (game_id, resolution, cpu_id, gpu_id) in skip:
+            continue
+        setups.append({"game_id": game_id, "resolution": resolution, "setting_name": "High", "cpu_id": cpu_id,
+                       "gpu_id": gpu_id, "ram": 16,
+                       "fps": GAME_FPS[(game_id, resolution)] * CPU_FACTORS[cpu_id] * GPU_FACTORS[gpu_id]})
+    return setups
+
+
+@pytest.fixture(autouse=True)
+def reset_estimator():
+    estimator_cache.invalidate()
+    yield
+    estimator_cache.invalidate()
+
+
+def test_estimates_unseen_combination_within_interval():
+    estimator = PerformanceEstimator()
+    for setup in synthetic_setups(skip={("g2", "1920x1080", "cpu2", "gpu3")}):
+        estimator.add_setup(setup)
+
+    estimate = estimator.estimate("g2", "1920x1080", "High", "cpu2", "gpu3")
+
+    expected = 140 * 1.3 * 2.2
+    assert estimate.fps == pytest.approx(expected, rel=0.02)
+    assert estimate.fps_low <= expected <= estimate.fps_high
+    assert estimator.estimate("g2", "1920x1080", "High", "cpu2", "unknown gpu") is None
+
+
+def test_incremental_update_matches_full_refit():
+    incremental = PerformanceEstimator()
+    setups = synthetic_setups()
+    for setup in setups[:10]:
+        incremental.add_setup(setup)
+    incremental.fit()
+    # The refit starts from the fitted scores, including scores never seen before
+    for setup in setups[10:]:
+        incremental.add_setup(setup)
+
+    full = PerformanceEstimator()
+    for setup in setups:
+        full.add_setup(setup)
+    full.fit()
+
+    for args in [("g1", "3840x2160", "High", "cpu3", "gpu2"), ("g2", "1920x1080", "High", "cpu1", "gpu1")]:
+        assert incremental.estimate(*args) == full.estimate(*args)
+
+
+def test_setup_pushed_to_an_embedded_document_trains_the_loaded_model():
+    estimator = PerformanceEstimator()
+    setups = synthetic_setups(skip={("g1", "1920x1080", "cpu3", "gpu3")})
+    for setup in setups:
+        estimator.add_setup(setup)
+    estimator_cache._value = estimator
+    estimator_cache._built_at = time.monotonic()
+    combination = {"game_id": "g1", "resolution": "1920x1080", "setting_name": "High"}
+    existing = [{field: value for field, value in setup.items() if field not in combination}
+                for setup in setups if all(setup[field] == value for field, value in combination.items())]
+    pushed = {"cpu_id": "cpu3", "gpu_id": "gpu3", "ram": 16, "fps": 60 * 0.8 * 2.2}
+    document = {"_id": "r1", **combination, "setups": existing + [pushed]}
+
+    invalidation_bus.publish(InvalidationEvent("game_requirements", "update", "r1", document,
+                                               {"updatedFields": {f"setups.{len(existing)}": pushed},
+                                                "removedFields": []}))
+
+    assert estimator_cache.value is estimator
+    assert estimator.samples == len(setups) + 1
+    # Editing a recorded setup can't be applied incrementally
+    invalidation_bus.publish(InvalidationEvent("game_requirements", "update", "r1", document,
+                                               {"updatedFields": {"setups.0.fps": 10}, "removedFields": []}))
+    assert estimator_cache.value is None
+
+
+def test_estimate_takes_microseconds():
+    estimator = PerformanceEstimator()
+    for setup in synthetic_setups():
+        estimator.add_setup(setup)
+    estimator.fit()
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        estimator.estimate("g1", "1920x1080", "High", "cpu2", "gpu2")
+    assert (time.perf_counter() - start) / 1000 < 1e-3
+
+
+def test_fit_scales_to_thousands_of_parts():
+    rng = random.Random(0)
+    cpus = {f"cpu{i}": rng.uniform(0.5, 2.0) for i in range(2000)}
+    gpus = {f"gpu{i}": rng.uniform(0.5, 3.0) for i in range(2000)}
+    estimator = PerformanceEstimator()
+    for _ in range(20000):
+        cpu_id, gpu_id = rng.choice(list(cpus)), rng.choice(list(gpus))
+        estimator.add_setup({"game_id": "g1", "resolution": "1920x1080", "setting_name": "High", "cpu_id": cpu_id,
+                             "gpu_id": gpu_id, "ram": 16, "fps": 60 * cpus[cpu_id] * gpus[gpu_id]})
+
+    start = time.perf_counter()
+    estimate = estimator.estimate("g1", "1920x1080", "High", "cpu1", "gpu2")
+    assert time.perf_counter() - start < 1
+    assert estimate.fps == pytest.approx(60 * cpus["cpu1"] * gpus["gpu2"], rel=0.02)
+
+
+@pytest.mark.asyncio
+async def test_estimate_route_uses_recorded_setups():
+    collection = mock_collection()
+    docs = synthetic_setups(skip={("g1", "1920x1080", "cpu3", "gpu3")})
+
+    async def iterate(*args, **kwargs):
+        for doc in docs:
+            yield doc
+
+    collection.find = lambda *args, **kwargs: iterate()
+    with override_collection(app, get_requirements_collection, collection):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            params = {"game_id": "g1", "resolution": "1920x1080", "setting_name": "High", "cpu_id": "cpu3"}
+            found = await ac.get("/game-requirements/estimate", params={**params, "gpu_id": "gpu3"})
+            missing = await ac.get("/game-requirements/estimate", params={**params, "gpu_id": "gpu9"})
+
+    assert found.status_code == 200
+    assert found.json()["estimated"] is True
+    assert found.json()["fps"] == pytest.approx(60 * 0.8 * 2.2, rel=0.02)
+    assert missing.status_code == 404
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from backend.app.database import get_games_collection
+from backend.services.game_filters import Facet, GameFilterIndex, to_bits
+from tests.conftest import mock_collection, override_collection
+
+
+def make_game(fake_game, i, name, year, apis, upscalers, ssd, publisher="CD Projekt"):
+    return {**fake_game, "_id": f"{i:024x}", "game_id": f"g{i}", "name": name, "release_date": year,
+            "api_support": list(apis), "upscale_support": list(upscalers), "is_ssd_recommended": ssd,
+            "publisher": publisher, "available_resolutions": ["1920x1080", "2560x1440"],
+            "created_at": datetime(2025, 1, 1)}
+
+
+@pytest.fixture
+def games(fake_game):
+    return [
+        make_game(fake_game, 1, "The Witcher 3", 2015, ["DX11", "DX12"], ["Nvidia DLSS"], False),
+        make_game(fake_game, 2, "Cyberpunk 2077", 2020, ["DX12"], ["Nvidia DLSS", "AMD FSR"], True),
+        make_game(fake_game, 3, "Doom Eternal", 2020, ["Vulkan"], ["Nvidia DLSS"], True, "Bethesda"),
+        make_game(fake_game, 4, "Witchfire", 2023, ["DX12"], [], True, "The Astronauts"),
+    ]
+
+
+def names(games):
+    return [game["name"] for game in games]
+
+
+def test_sparse_and_dense_values_count_and_union_alike():
+    # "rare" is kept as game numbers, "even" as a bitset
+    facet = Facet({"rare": [3, 70, 99], "even": list(range(0, 100, 2))}, {"rare": "Rare", "even": "Even"}, 100)
+    first_half = to_bits(np.arange(50), 100)
+
+    assert facet.counts(first_half).tolist() == [25, 1]
+    assert facet.top(first_half) == [{"value": "even", "label": "Even", "count": 25},
+                                     {"value": "rare", "label": "Rare", "count": 1}]
+    both = np.flatnonzero(np.unpackbits(facet.games(["rare", "even", "unknown"], 100), count=100)).tolist()
+    assert both == sorted(set(range(0, 100, 2)) | {3, 99})
+
+
+def test_filters_intersect_facets_and_or_values(games):
+    index = GameFilterIndex(games)
+
+    total, page, _ = index.filter({"api": ["dx12"], "ssd": [True]})
+    assert (total, names(page)) == (2, ["Witchfire", "Cyberpunk 2077"])
+    total, page, _ = index.filter({"api": ["DX11", "vulkan"]})
+    assert names(page) == ["Doom Eternal", "The Witcher 3"]
+    total, page, _ = index.filter({}, name="WITCH", year_to=2020)
+    assert names(page) == ["The Witcher 3"]
+    assert index.filter({"upscaler": ["Intel XeSS"]})[0] == 0
+
+
+def test_facet_counts_leave_out_their_own_filter(games):
+    _, _, facets = GameFilterIndex(games).filter({"api": ["DX12"], "publisher": ["cd projekt"]})
+
+    # Every API of CD Projekt's games, the other publishers of DX12 games
+    assert facets["api"] == [{"value": "dx12", "label": "DX12", "count": 2},
+                             {"value": "dx11", "label": "DX11", "count": 1}]
+    assert facets["publisher"] == [{"value": "cd projekt", "label": "CD Projekt", "count": 2},
+                                   {"value": "the astronauts", "label": "The Astronauts", "count": 1}]
+    assert facets["ssd"] == [{"value": "false", "label": "false", "count": 1},
+                             {"value": "true", "label": "true", "count": 1}]
+    assert {facet["value"]: facet["count"] for facet in facets["year"]} == {"2015": 1, "2020": 1}
+
+
+@pytest.mark.asyncio
+async def test_filter_route_returns_page_total_and_facets(async_client, test_app, games):
+    with override_collection(test_app, get_games_collection, mock_collection(find_result=games)):
+        response = await async_client.get("/games/filter", params={"upscaler": "nvidia dlss", "year_from": 2016,
+                                                                   "limit": 1, "offset": 1})
+        missing = await async_client.get("/games/filter", params={"release_date": 1999})
+
+    body = response.json()
+    assert body["total"] == 2
+    assert names(body["games"]) == ["Doom Eternal"]
+    assert body["facets"]["upscaler"][0] == {"value": "nvidia dlss", "label": "Nvidia DLSS", "count": 2}
+    assert missing.status_code == 404
@@ -1,8 +1,15 @@
+import json
+from datetime import datetime
+
 import pytest
+import pytest_asyncio
+from bson import ObjectId
 from fastapi import FastAPI
 from httpx import AsyncClient, ASGITransport
-from unittest.mock import AsyncMock, patch
+from mongomock_motor import AsyncMongoMockClient
+from backend.app.database import get_games_collection
 from backend.routes.games import router as games_router
+from tests.conftest import mock_collection, override_collection
 
 # Create a temporary app with only this router for testing
 app = FastAPI()
@@ -11,9 +18,7 @@ app.include_router(games_router)
 
 @pytest.mark.asyncio
 async def test_get_all_games_returns_list(async_client, fake_game):
-    mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=[fake_game])
-    with patch("backend.routes.games.collection.find", return_value=mock_cursor):
+    with override_collection(app, get_games_collection, mock_collection(find_result=[fake_game])):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get("/games")
@@ -24,10 +29,7 @@ async def test_get_all_games_returns_list(async_client, fake_game):
 
 @pytest.mark.asyncio
 async def test_get_all_games_returns_404_when_games_not_found(async_client):
-    mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=None)
-
-    with patch("backend.routes.games.collection.find", return_value=mock_cursor):
+    with override_collection(app, get_games_collection, mock_collection(find_result=None)):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get("/games")
@@ -41,9 +43,7 @@ async def test_get_game_by_genre_returns_404_no_game_found(async_client):
     :param async_client:
     :return:
     """
-    mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=None)
-    with patch("backend.routes.games.collection.find", return_value=mock_cursor):
+    with override_collection(app, get_games_collection, mock_collection(find_result=None)):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get("/games/category?genre=horror&limit=10")
@@ -57,12 +57,85 @@ async def test_get_game_by_genre_returns_500_incorrect_amount_returned(async_cli
     :param async_client:
     :return:
     """
-    mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=fake_action_games_list)
-    with patch("backend.routes.games.collection.find", return_value=mock_cursor):
+    with override_collection(app, get_games_collection, mock_collection(find_result=fake_action_games_list)):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get("/games/category?genre=action&limit=2")
 
     assert response.json() == {"detail": "Too many games found"}
-    assert response.status_code == 500
\ No newline at end of file
+    assert response.status_code == 500
+
+
+@pytest_asyncio.fixture
+async def games_db(fake_game):
+    """
+    In-memory games collection with 5 games, the last two added at the same time.
+    """
+    collection = AsyncMongoMockClient()["game_db"]["games"]
+    created = [datetime(2025, 1, 1), datetime(2025, 2, 1), datetime(2025, 3, 1), datetime(2025, 4, 1),
+               datetime(2025, 4, 1)]
+    await collection.insert_many([
+        {**fake_game, "_id": ObjectId(f"{i:024x}"), "game_id": f"g{i}", "name": f"Game {i}", "created_at": created_at}
+        for i, created_at in enumerate(created)])
+    return collection
+
+
+async def fetch_pages(collection, params):
+    names, cursors = [], []
+    with override_collection(app, get_games_collection, collection):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            after = None
+            while True:
+                response = await ac.get("/games", params={**params, **({"after": after} if after else {})})
+                assert response.status_code == 200
+                names += [game["name"] for game in response.json()]
+                after = response.headers.get("X-Next-Cursor")
+                cursors.append(after)
+                if after is None:
+                    return names, cursors
+
+
+@pytest.mark.asyncio
+async def test_get_all_games_pages_by_id(games_db):
+    names, _ = await fetch_pages(games_db, {"limit": 2})
+
+    assert names == [f"Game {i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_get_all_games_pages_newest_first_across_ties(games_db):
+    names, cursors = await fetch_pages(games_db, {"limit": 2, "sort": "newest"})
+
+    assert names == ["Game 4", "Game 3", "Game 2", "Game 1", "Game 0"]
+    assert len(cursors) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_all_games_card_view_and_fields_projection(games_db):
+    with override_collection(app, get_games_collection, games_db):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            cards = await ac.get("/games", params={"view": "card", "limit": 1})
+            partial = await ac.get("/games", params={"fields": "name,genres", "limit": 1})
+            unknown = await ac.get("/games", params={"fields": "name,secret"})
+            bad_cursor = await ac.get("/games", params={"after": "not a cursor"})
+
+    assert set(cards.json()[0]) == {"game_id", "name", "portrait_url", "landscape_s", "genres", "release_date", "id"}
+    assert partial.json() == [{"name": "Game 0", "genres": ["Action"], "id": "000000000000000000000000"}]
+    assert unknown.status_code == 400
+    assert bad_cursor.status_code == 400
+
+
+
+@pytest.mark.asyncio
+async def test_get_all_games_streams_from_cursor(games_db):
+    with override_collection(app, get_games_collection, games_db):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            regular = await ac.get("/games")
+            ndjson = await ac.get("/games", headers={"Accept": "application/x-ndjson"})
+            array = await ac.get("/games", params={"stream": "true", "view": "card"})
+            # Cursor after the largest possible _id
+            empty = await ac.get("/games", params={"stream": "true", "after": "ZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZm"})
+
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == regular.json()
+    assert [game["name"] for game in array.json()] == [f"Game {i}" for i in range(5)]
+    assert empty.status_code == 404
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+from backend.app.database import get_games_collection
+from backend.services.game_search import GameSearchIndex, within_distance
+from tests.conftest import mock_collection, override_collection
+
+
+def make_game(fake_game, i, name, publisher, genres, year, api=("DX12",), upscalers=()):
+    return {**fake_game, "_id": f"{i:024x}", "game_id": f"g{i}", "name": name, "publisher": publisher,
+            "developer": publisher, "genres": list(genres), "release_date": year, "api_support": list(api),
+            "upscale_support": list(upscalers), "created_at": datetime(2025, 1, 1)}
+
+
+@pytest.fixture
+def games(fake_game):
+    return [
+        make_game(fake_game, 1, "The Witcher 3: Wild Hunt", "CD Projekt", ["RPG"], 2015, ("DX11", "DX12"), ("DLSS",)),
+        make_game(fake_game, 2, "Cyberpunk 2077", "CD Projekt", ["RPG", "Shooter"], 2020, upscalers=("DLSS", "FSR")),
+        make_game(fake_game, 3, "Witchfire", "The Astronauts", ["Shooter"], 2023),
+        make_game(fake_game, 4, "Hunt: Showdown", "Crytek", ["Shooter"], 2019, ("DX11",)),
+    ]
+
+
+def names(results):
+    return [game["name"] for game in results[1]]
+
+
+def test_typos_count_adjacent_swaps_as_one_edit():
+    assert within_distance("wicther", "witcher", 1)
+    assert not within_distance("witch", "watcher", 1)
+
+
+def test_exact_matches_rank_above_prefix_and_typo_matches(games):
+    index = GameSearchIndex(games)
+
+    assert names(index.search("witcher")) == ["The Witcher 3: Wild Hunt"]
+    # "witch" is a prefix of both names
+    assert set(names(index.search("witch"))) == {"The Witcher 3: Wild Hunt", "Witchfire"}
+    assert names(index.search("wicther")) == ["The Witcher 3: Wild Hunt"]
+    # Every token must match, the name weighs more than the publisher
+    assert names(index.search("cd projekt")) == ["Cyberpunk 2077", "The Witcher 3: Wild Hunt"]
+    assert names(index.search("hunt")) == ["Hunt: Showdown", "The Witcher 3: Wild Hunt"]
+
+
+def test_filters_and_pagination(games):
+    index = GameSearchIndex(games)
+
+    assert names(index.search(year_from=2016, year_to=2020)) == ["Cyberpunk 2077", "Hunt: Showdown"]
+    assert names(index.search("shooter", upscaler="fsr")) == ["Cyberpunk 2077"]
+    assert names(index.search(api="dx11", genre="rpg")) == ["The Witcher 3: Wild Hunt"]
+    total, page = index.search(genre="Shooter", limit=2, offset=2)
+    assert total == 3 and [game["name"] for game in page] == ["Hunt: Showdown"]
+
+
+
+def test_genre_filter_matches_like_the_category_route(games, fake_game):
+    starfield = make_game(fake_game, 5, "Starfield", "Bethesda", ["Role  Playing", "Sci-Fi"], 2023)
+    index = GameSearchIndex(games + [starfield])
+
+    # Same normalised keys as genre_keys: spacing and casing don't matter
+    assert names(index.search(genre="role playing")) == ["Starfield"]
+    assert names(index.search(genre=" SCI-FI ")) == ["Starfield"]
+
+
+@pytest.mark.asyncio
+async def test_search_route_returns_a_page_and_the_total(test_app, async_client, games):
+    with override_collection(test_app, get_games_collection, mock_collection(games)):
+        response = await async_client.get("/games/search", params={"q": "witch", "limit": 1})
+        missing = await async_client.get("/games/search", params={"q": "zelda"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "2"
+    assert len(response.json()) == 1
+    assert missing.status_code == 404
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.database import get_games_collection
+from backend.services.genre_facets import GenreFacetIndex
+from backend.services.invalidation import INVALIDATE_ALL, InvalidationEvent
+from backend.utils.genres import genre_filter, genre_keys, normalize_genre
+from tests.conftest import override_collection
+
+
+def game(i, genres):
+    return {"_id": i, "genres": genres}
+
+
+def test_genres_are_normalised_once_per_game():
+    assert normalize_genre("  Action   RPG ") == "action rpg"
+    assert genre_keys(["RPG", "rpg ", "Action", ""]) == ["action", "rpg"]
+
+
+def test_genre_filters_match_keys_and_escape_prefixes():
+    assert genre_filter("RPG") == {"genre_keys": "rpg"}
+    # User input is never a pattern, a prefix is anchored
+    assert genre_filter("c++ (", prefix=True) == {"genre_keys": {"$regex": r"^c\+\+\ \("}}
+
+
+def test_facets_follow_games_one_change_at_a_time():
+    index = GenreFacetIndex([game(1, ["RPG", "Action"]), game(2, ["rpg"]), game(3, ["Shooter"])])
+    assert index.facets() == [{"genre": "rpg", "label": "RPG", "count": 2},
+                              {"genre": "action", "label": "Action", "count": 1},
+                              {"genre": "shooter", "label": "Shooter", "count": 1}]
+
+    assert index.apply(InvalidationEvent("games", "update", 3, game(3, ["Action RPG"])))
+    assert index.apply(InvalidationEvent("games", "delete", 1))
+    assert index.facets() == [{"genre": "action rpg", "label": "Action RPG", "count": 1},
+                              {"genre": "rpg", "label": "rpg", "count": 1}]
+    assert [facet["genre"] for facet in index.facets("ACT")] == ["action rpg"]
+    assert not index.apply(InvalidationEvent("games", INVALIDATE_ALL))
+
+
+@pytest_asyncio.fixture
+async def genre_games(fake_game):
+    collection = AsyncMongoMockClient()["game_db"]["games"]
+    await collection.insert_many([
+        {**fake_game, "_id": f"{i:024x}", "genres": genres, "genre_keys": genre_keys(genres),
+         "created_at": datetime(2025, 1, 1)}
+        for i, genres in enumerate([["Action"], ["Action RPG"], ["RPG"]])])
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_category_matches_exact_genres_or_prefixes(async_client, test_app, genre_games):
+    with override_collection(test_app, get_games_collection, genre_games):
+        exact = await async_client.get("/games/category", params={"genre": "ACTION"})
+        prefix = await async_client.get("/games/category", params={"genre": "action", "prefix": True})
+        pattern = await async_client.get("/games/category", params={"genre": ".*"})
+
+    assert [game["genres"] for game in exact.json()] == [["Action"]]
+    assert [game["genres"] for game in prefix.json()] == [["Action"], ["Action RPG"]]
+    assert pattern.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_genres_route_counts_games_per_genre(async_client, test_app, genre_games):
+    with override_collection(test_app, get_games_collection, genre_games):
+        response = await async_client.get("/games/genres")
+        missing = await async_client.get("/games/genres", params={"prefix": "horror"})
+
+    assert response.json() == [{"genre": "action", "label": "Action", "count": 1},
+                               {"genre": "action rpg", "label": "Action RPG", "count": 1},
+                               {"genre": "rpg", "label": "RPG", "count": 1}]
+    assert missing.status_code == 404
@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock, patch
+import json
 
 import pytest
 from fastapi import FastAPI
@@ -24,7 +24,7 @@ async def test_get_all_hardware_returns_list_of_same_type_only(async_client, typ
     :param async_client:
     """
     data = request.getfixturevalue(fake_data)
-    with load_data(type_, data):
+    with load_data(app, data):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get(endpoint)
@@ -44,7 +44,7 @@ async def test_get_all_hardware_wrong_type_included(async_client, type_, endpoin
     :param async_client:
     """
     data = request.getfixturevalue(wrong_data)
-    with load_data(type_, data):
+    with load_data(app, data):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get(endpoint)
@@ -58,7 +58,7 @@ async def test_get_all_hardware_wrong_type_included(async_client, type_, endpoin
     ("cpu", "/cpus", "fake_cpus_list"),
     ("gpu", "/gpus", "fake_gpus_list"),
 ])
-async def test_get_hardware_by_model_returns_500_when_no_model_exist(
+async def test_get_hardware_by_model_returns_404_when_no_model_exist(
         async_client,
         type_,
         endpoint,
@@ -66,21 +66,18 @@ async def test_get_hardware_by_model_returns_500_when_no_model_exist(
         request
 ):
     """
-    Test:
+    Test: model filtering happens in the catalog, so a model matching nothing returns 404
     :param async_client:
     """
-    # Mock the DB to return GPUs (invalid for this route)
     data = request.getfixturevalue(wrong_data)
-    mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=data)
-    with patch(f"backend.routes.{type_}s.collection.find", return_value=mock_cursor):
+    with load_data(app, data):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get(f"{endpoint}/model?model=rizen",
                                     params={"model": "nonexistent model"})
 
-    assert response.status_code == 500
-    assert response.json()["detail"] == f"Wrong model regex found in {type_}s fetched"
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"No {type_} found matching model nonexistent model"
 
 
 @pytest.mark.asyncio
@@ -88,7 +85,7 @@ async def test_get_hardware_by_model_returns_500_when_no_model_exist(
     ("cpu", "/cpus", "brand1", "fake_cpus_list_wrong_brand"),
     ("gpu", "/gpus", "brand4", "fake_gpus_list_wrong_brand"),
 ])
-async def test_get_cpu_by_brand_wrong_brand_returns_500(
+async def test_get_hardware_by_brand_wrong_brand_returns_404(
         async_client,
         type_,
         endpoint,
@@ -97,11 +94,54 @@ async def test_get_cpu_by_brand_wrong_brand_returns_500(
         request
 ):
     data = request.getfixturevalue(wrong_data)
-    mock_cursor = AsyncMock()
-    mock_cursor.to_list = AsyncMock(return_value=data)
-    with patch(f"backend.routes.{type_}s.collection.find", return_value=mock_cursor):
+    with load_data(app, data):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get(f"{endpoint}/brand?brand={correct_brand}")
-        assert response.status_code == 500
-        assert response.json()["detail"] == f"Wrong brand found in {type_}s fetched"
+        assert response.status_code == 404
+        assert response.json()["detail"] == f"No {type_} found"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("endpoint, model, expected_fullname", [
+    ("/cpus", "ryzen5678", "Ryzen 8 5678"),
+    ("/cpus", "core i11 1234", "Core I11 1234k"),
+    ("/gpus", "rx5800 xt", "RTX 5800XT"),
+])
+async def test_get_hardware_by_model_matches_tokens(fake_hardware_list, endpoint, model, expected_fullname):
+    with load_data(app, fake_hardware_list):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.get(f"{endpoint}/model", params={"model": model})
+
+    assert response.status_code == 200
+    assert [item["fullname"] for item in response.json()] == [expected_fullname]
+
+
+@pytest.mark.asyncio
+async def test_hardware_catalog_is_loaded_once_and_reports_version(fake_cpus_list):
+    with load_data(app, fake_cpus_list) as collection:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            first = await ac.get("/cpus")
+            second = await ac.get("/cpus/brand", params={"brand": "BRAND2"})
+
+    # One query per hardware type when loading, none afterwards
+    assert collection.find.call_count == 2
+    assert len(second.json()) == 2
+    assert first.headers["X-Catalog-Version"] == second.headers["X-Catalog-Version"]
+
+
+@pytest.mark.asyncio
+async def test_get_all_cpus_streams_ndjson_and_json_array(fake_cpus_list):
+    with load_data(app, fake_cpus_list):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            regular = await ac.get("/cpus")
+            ndjson = await ac.get("/cpus", headers={"Accept": "application/x-ndjson"})
+            array = await ac.get("/cpus", params={"stream": "true"})
+
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == regular.json()
+    assert array.json() == regular.json()
+    assert ndjson.headers["X-Catalog-Version"] == regular.headers["X-Catalog-Version"]
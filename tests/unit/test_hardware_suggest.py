@@ -0,0 +1,83 @@
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from backend.routes.hardware import router as hardware_router
+from backend.services.hardware_catalog import CatalogSnapshot
+from backend.services.hardware_suggest import SuggestIndex
+from tests.conftest import load_data
+
+app = FastAPI()
+app.include_router(hardware_router)
+
+
+@pytest.fixture
+def rtx_gpus():
+    return [
+        {"_id": ObjectId("6758bbf1849fa5acb6884301"), "brand": "Nvidia", "model": "RTX 4060TI (16GB)",
+         "fullname": "GeForce RTX 4060TI (16GB)", "type": "gpu"},
+        {"_id": ObjectId("6758bbf1849fa5acb6884302"), "brand": "Nvidia", "model": "RTX 4060",
+         "fullname": "GeForce RTX 4060", "type": "gpu"},
+        {"_id": ObjectId("6758bbf1849fa5acb6884303"), "brand": "AMD", "model": "RX 7600",
+         "fullname": "Radeon RX 7600", "type": "gpu"},
+    ]
+
+
+@pytest.mark.parametrize("query", ["4060ti", "rtx 4060 ti", "GeForce RTX 4060TI (16GB)", "RTX4060Ti"])
+def test_suggest_ignores_spacing_and_casing(rtx_gpus, query):
+    index = SuggestIndex(CatalogSnapshot({"gpu": rtx_gpus}))
+    suggestions = index.suggest(query, "gpu", limit=5)
+
+    assert suggestions[0][0]["fullname"] == "GeForce RTX 4060TI (16GB)"
+    assert all(doc["fullname"] != "Radeon RX 7600" for doc, _, _ in suggestions)
+
+
+def test_suggest_ranks_prefix_matches_before_typos(rtx_gpus):
+    index = SuggestIndex(CatalogSnapshot({"gpu": rtx_gpus}))
+
+    # "rtx 4060" is a prefix of both RTX cards, the exact one comes first
+    assert [doc["model"] for doc, _, _ in index.suggest("rtx 4060")] == ["RTX 4060", "RTX 4060TI (16GB)"]
+    # A typo falls back to the trigram map
+    assert index.suggest("radon rx7600")[0][0]["model"] == "RX 7600"
+    assert index.suggest("rtx", "cpu") == []
+
+
+class ExaminedEntries(list):
+    def __init__(self, entries, examined):
+        super().__init__(entries)
+        self.examined = examined
+
+    def __getitem__(self, entry_id):
+        self.examined.append(entry_id)
+        return super().__getitem__(entry_id)
+
+
+def test_suggest_of_one_type_stops_once_the_page_is_full(rtx_gpus, monkeypatch):
+    cpus = [{"_id": ObjectId(), "brand": "Intel", "model": f"RTX {n}", "fullname": f"RTX {n}", "type": "cpu"}
+            for n in range(100)]
+    index = SuggestIndex(CatalogSnapshot({"cpu": cpus, "gpu": rtx_gpus}))
+    examined = []
+    monkeypatch.setattr(index, "_entries", ExaminedEntries(index._entries, examined))
+
+    suggestions = index.suggest("rtx", "cpu", limit=3)
+
+    assert len(suggestions) == 3
+    assert all(type_ == "cpu" for _, type_, _ in suggestions)
+    # Only the first three "rtx" keys were read, not the other 97 CPUs
+    assert len(set(examined)) == 3
+
+
+@pytest.mark.asyncio
+async def test_suggest_route_filters_by_type_and_limits(fake_hardware_list):
+    with load_data(app, fake_hardware_list):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.get("/suggest", params={"q": "rtxc 1234", "type": "gpu", "limit": 1})
+            invalid = await ac.get("/suggest", params={"q": "rtx", "type": "ram"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.json()[0]["hardware_type"] == "gpu"
+    assert "X-Catalog-Version" in response.headers
+    assert invalid.status_code == 422
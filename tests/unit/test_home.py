@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.database import get_games_collection
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.row_config import row_config
+from backend.utils.genres import genre_keys
+from tests.conftest import override_collection
+
+ROWS = [
+    {"title": "Newly added", "fetch_url": "/games/newly_added", "params": {"limit": 2}, "row_id": "newly_added"},
+    {"title": "RPG Games", "fetch_url": "/games/category", "params": {"genre": "rpg", "limit": 10}, "row_id": "rpg"},
+    {"title": "Deals", "fetch_url": "/deals", "params": {}, "row_id": "deals"},
+]
+
+
+def card_game(i, name, genres, day):
+    return {"game_id": f"g{i}", "name": name, "portrait_url": "p.jpg", "landscape_s": "l.jpg", "genres": genres,
+            "genre_keys": genre_keys(genres),
+            "release_date": 2020, "publisher": "Publisher", "created_at": datetime(2025, 1, day)}
+
+
+@pytest_asyncio.fixture
+async def games_collection():
+    collection = AsyncMongoMockClient()["game_db"]["games"]
+    await collection.insert_many([card_game(1, "Witcher", ["RPG"], 1), card_game(2, "Doom", ["Shooter"], 2),
+                                  card_game(3, "Elden Ring", ["Action RPG"], 3)])
+    return collection
+
+
+@pytest.fixture
+def home_config(tmp_path, monkeypatch):
+    path = tmp_path / "row-config.json"
+    path.write_text(json.dumps(ROWS))
+    monkeypatch.setattr(row_config, "path", path)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_home_returns_every_row_with_its_game_cards(async_client, test_app, games_collection, home_config):
+    with override_collection(test_app, get_games_collection, games_collection):
+        response = await async_client.get("/games/home")
+
+    rows = response.json()
+    assert [row["row_id"] for row in rows] == ["newly_added", "rpg", "deals"]
+    assert [game["name"] for game in rows[0]["games"]] == ["Elden Ring", "Doom"]
+    assert [game["name"] for game in rows[1]["games"]] == ["Witcher"]
+    # Cards only
+    assert "publisher" not in rows[0]["games"][0]
+    # The frontend fetches rows the server can't resolve itself
+    assert rows[2]["games"] is None and rows[2]["fetch_url"] == "/deals"
+
+
+@pytest.mark.asyncio
+async def test_home_is_cached_until_the_games_change(async_client, test_app, games_collection, home_config):
+    with override_collection(test_app, get_games_collection, games_collection):
+        first = await async_client.get("/games/home")
+        await games_collection.insert_one(card_game(4, "Baldur's Gate 3", ["RPG"], 4))
+        cached = await async_client.get("/games/home")
+        not_modified = await async_client.get("/games/home", headers={"If-None-Match": first.headers["etag"]})
+        invalidation_bus.publish(InvalidationEvent("games", "insert"))
+        rebuilt = await async_client.get("/games/home")
+
+    assert cached.content == first.content
+    assert not_modified.status_code == 304
+    assert rebuilt.json()[0]["games"][0]["name"] == "Baldur's Gate 3"
+    assert rebuilt.headers["etag"] != first.headers["etag"]
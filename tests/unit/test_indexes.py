@@ -0,0 +1,59 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.app.indexes import (REQUIRED_INDEXES, QueryPlanError, QuerySpec, ensure_indexes, find_stages,
+                                 verify_query_plans)
+
+
+def explain_result(stage):
+    return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": stage}}}}
+
+
+def fake_db(stage_by_collection):
+    """
+    Fake database whose find().explain() reports the given stage for each collection.
+    """
+    db = MagicMock()
+
+    def get_collection(name):
+        cursor = MagicMock()
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value = cursor
+        cursor.explain = AsyncMock(return_value=explain_result(stage_by_collection[name]))
+        collection = MagicMock()
+        collection.find.return_value = cursor
+        return collection
+
+    db.__getitem__.side_effect = get_collection
+    return db
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_every_declared_index():
+    db = AsyncMongoMockClient()["game_db"]
+    await ensure_indexes(db)
+
+    for spec in REQUIRED_INDEXES:
+        info = await db[spec.collection].index_information()
+        assert spec.name in info
+
+
+def test_find_stages_walks_nested_plans():
+    plan = {"stage": "SORT", "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"},
+                                                                           {"stage": "COLLSCAN"}]}}
+    assert find_stages(plan, "COLLSCAN")
+    assert not find_stages(explain_result("IXSCAN"), "COLLSCAN")
+
+
+@pytest.mark.asyncio
+async def test_verify_query_plans_fails_loudly_on_collscan():
+    queries = [QuerySpec("games by category", "games", {"genres": "action"}),
+               QuerySpec("requirement lookup", "game_requirements", {"game_id": "g1"})]
+
+    plans = await verify_query_plans(fake_db({"games": "IXSCAN", "game_requirements": "IXSCAN"}), queries)
+    assert set(plans) == {"games by category", "requirement lookup"}
+
+    with pytest.raises(QueryPlanError) as error:
+        await verify_query_plans(fake_db({"games": "IXSCAN", "game_requirements": "COLLSCAN"}), queries)
+    assert error.value.collscans == ["requirement lookup"]
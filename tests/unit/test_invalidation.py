@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import OperationFailure
+
+from backend.app.config import get_settings
+from backend.services.hardware_catalog import CatalogSnapshot, hardware_catalog
+from backend.services.invalidation import (ChangeFeed, INVALIDATE_ALL, InvalidationBus, InvalidationEvent,
+                                           invalidation_bus, publish_invalidation)
+
+
+class FakeChangeStream:
+    """
+    Stands in for a Motor change stream, emitting the given change documents.
+    """
+
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for change in self.changes:
+            yield change
+
+
+class FakeDatabase:
+    """
+    Database whose watch() emits fake change events, or fails like a standalone server.
+    """
+
+    def __init__(self, changes=None, collections=None):
+        self.changes = changes
+        self.collections = collections
+        self.watch_calls = []
+
+    def watch(self, pipeline, **kwargs):
+        self.watch_calls.append(kwargs)
+        if self.changes is None:
+            raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+        return FakeChangeStream(self.changes)
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+def change(collection, operation, document=None, token=1):
+    return {"_id": {"_data": token}, "ns": {"db": "game_db", "coll": collection}, "operationType": operation,
+            "documentKey": {"_id": "doc1"}, "fullDocument": document}
+
+
+@pytest.mark.asyncio
+async def test_change_stream_events_reach_subscribers():
+    bus = InvalidationBus()
+    received = []
+    bus.subscribe(("games", "hardware"), received.append)
+    db = FakeDatabase([change("games", "insert", {"name": "New Game"}),
+                       change("hardware", "delete", token=2),
+                       change("game_setups", "insert", token=3)])
+
+    feed = ChangeFeed(db, bus)
+    await feed.follow_changes()
+
+    assert received == [InvalidationEvent("games", "insert", "doc1", {"name": "New Game"}),
+                        InvalidationEvent("hardware", "delete", "doc1", None)]
+    assert feed._resume_token == {"_data": 3}
+    assert db.watch_calls[0]["full_document"] == "updateLookup"
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_polling_versions_without_change_streams(monkeypatch):
+    monkeypatch.setattr(get_settings(), "invalidation_poll_seconds", 0.01)
+    mongo = AsyncMongoMockClient()["game_db"]
+    bus = InvalidationBus()
+    received = []
+    bus.subscribe("games", received.append)
+    feed = ChangeFeed(FakeDatabase(collections=mongo), bus)
+
+    task = asyncio.create_task(feed.run())
+    await asyncio.sleep(0.05)
+    # E.G scripts/games/add_game.py in another process
+    await publish_invalidation(mongo, "games")
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+    assert received == [InvalidationEvent("games", INVALIDATE_ALL)]
+
+
+@pytest.mark.asyncio
+async def test_hardware_writes_mark_the_catalog_stale(fake_cpus_list):
+    hardware_catalog._snapshot = CatalogSnapshot({"cpu": fake_cpus_list, "gpu": []})
+    assert hardware_catalog.is_fresh()
+
+    invalidation_bus.publish(InvalidationEvent("hardware", "update", "doc1"))
+
+    assert not hardware_catalog.is_fresh()
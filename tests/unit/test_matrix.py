@@ -0,0 +1,130 @@
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.database import get_matrix_collection
+from backend.routes.requirements import router as requirements_router
+from backend.services import matrix
+from backend.services.invalidation import INVALIDATE_ALL, InvalidationEvent
+from backend.services.matrix import MatrixMaintainer, best_cells, matrix_pipeline
+from backend.services.setups import flatten_setups
+from tests.conftest import override_collection
+
+BUILT_AT = datetime(2025, 1, 1)
+
+
+def setup(cpu_id, gpu_id, ram, fps, verified=True):
+    return {"cpu_id": cpu_id, "gpu_id": gpu_id, "ram": ram, "fps": fps, "taken_by": "TechPowerUp", "notes": "",
+            "verified": verified}
+
+
+@pytest.fixture
+def requirement_docs():
+    return [
+        {"game_id": "g1", "resolution": "2560x1440", "setting_name": "Ultra",
+         "setups": [setup("cpu1", "gpu1", 32, 48), setup("cpu1", "gpu1", 16, 45), setup("cpu2", "gpu1", 16, 40)]},
+        {"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra",
+         "setups": [setup("cpu1", "gpu1", 16, 70), setup("cpu1", "gpu2", 16, 99, verified=False)]},
+        {"game_id": "g2", "resolution": "1920x1080", "setting_name": "Low", "setups": [setup("cpu1", "gpu1", 8, 200)]},
+    ]
+
+
+async def run_pipeline(collection, flat, game_ids=None):
+    docs = await collection.aggregate(matrix_pipeline(BUILT_AT, game_ids, flat=flat)).to_list(length=None)
+    return {(doc["game_id"], doc["cpu_id"], doc["gpu_id"]): doc for doc in docs}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flat", [False, True])
+async def test_pipeline_groups_verified_setups_per_game_cpu_and_gpu(requirement_docs, flat):
+    db = AsyncMongoMockClient()["game_db"]
+    if flat:
+        await db.game_setups.insert_many([setup for doc in requirement_docs for setup in flatten_setups(doc)])
+        collection = db.game_setups
+    else:
+        await db.game_requirements.insert_many(requirement_docs)
+        collection = db.game_requirements
+
+    matrices = await run_pipeline(collection, flat)
+    only_g1 = await run_pipeline(collection, flat, game_ids=["g1"])
+
+    # The unverified setup has no matrix
+    assert set(matrices) == {("g1", "cpu1", "gpu1"), ("g1", "cpu2", "gpu1"), ("g2", "cpu1", "gpu1")}
+    assert set(only_g1) == {("g1", "cpu1", "gpu1"), ("g1", "cpu2", "gpu1")}
+    cells = matrices[("g1", "cpu1", "gpu1")]["cells"]
+    assert [(cell["resolution"], cell["ram"], cell["fps"]) for cell in cells] == [
+        ("1920x1080", 16, 70), ("2560x1440", 16, 45), ("2560x1440", 32, 48)]
+    assert matrices[("g1", "cpu1", "gpu1")]["built_at"] == BUILT_AT
+
+
+def test_best_cells_pick_the_most_ram_within_the_rig():
+    matrix_doc = {"cells": [{"resolution": "2560x1440", "setting_name": "Ultra", "ram": 16, "fps": 45},
+                            {"resolution": "2560x1440", "setting_name": "Ultra", "ram": 32, "fps": 48},
+                            {"resolution": "3840x2160", "setting_name": "Ultra", "ram": 64, "fps": 30}]}
+
+    assert [cell["fps"] for cell in best_cells(matrix_doc, 32)] == [48]
+    assert [cell["fps"] for cell in best_cells(matrix_doc, 24)] == [45]
+
+
+@pytest.mark.asyncio
+async def test_matrix_route_is_one_read_of_the_materialized_matrix():
+    app = FastAPI()
+    app.include_router(requirements_router)
+    db = AsyncMongoMockClient()["game_db"]
+    await db.game_matrices.insert_one({"game_id": "g1", "cpu_id": "cpu1", "gpu_id": "gpu1", "built_at": BUILT_AT,
+                                       "cells": [{"resolution": "1920x1080", "setting_name": "Ultra", "ram": 16,
+                                                  "fps": 70, "taken_by": "TechPowerUp", "notes": ""}]})
+    params = {"game_id": "g1", "cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16}
+
+    with override_collection(app, get_matrix_collection, db.game_matrices):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            found = await ac.get("/matrix", params=params)
+            missing = await ac.get("/matrix", params={**params, "gpu_id": "gpu9"})
+
+    assert found.json()["matrix"] == [{"resolution": "1920x1080", "setting_name": "Ultra", "ram": 16, "fps": 70,
+                                       "taken_by": "TechPowerUp", "notes": ""}]
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_maintainer_rebuilds_only_the_changed_games(monkeypatch):
+    build = AsyncMock()
+    monkeypatch.setattr(matrix, "build_matrices", build)
+    monkeypatch.setattr(matrix, "get_requirements_collection", lambda: "source")
+    monkeypatch.setattr(matrix, "get_matrix_collection", lambda: "matrices")
+    maintainer = MatrixMaintainer()
+
+    maintainer.on_change(InvalidationEvent("game_setups", "insert", "id1", {"game_id": "g1"}))
+    maintainer.on_change(InvalidationEvent("game_setups", "update", "id2", {"game_id": "g2"}))
+    await maintainer.rebuild_pending()
+    maintainer.on_change(InvalidationEvent("game_setups", INVALIDATE_ALL))
+    await maintainer.rebuild_pending()
+
+    assert sorted(build.await_args_list[0].args[2]) == ["g1", "g2"]
+    assert build.await_args_list[1].args[2] is None
+
+
+@pytest.mark.asyncio
+async def test_only_the_lease_holder_maintains_and_builds_everything_first(monkeypatch):
+    leases = AsyncMongoMockClient()["game_db"]["leases"]
+    monkeypatch.setattr(matrix, "get_leases_collection", lambda: leases)
+    first, second = MatrixMaintainer(), MatrixMaintainer()
+
+    assert await first.check_lease()
+    assert not await second.check_lease()
+    # Taking the lease (E.G on startup) schedules a build of every matrix
+    first.on_change(InvalidationEvent("game_setups", "insert", "id1", {"game_id": "g1"}))
+    assert first._rebuild_all and first._changed.is_set()
+    second.on_change(InvalidationEvent("game_setups", "insert", "id1", {"game_id": "g1"}))
+    assert not await second.check_lease()
+    assert not second._pending and not second._changed.is_set()
+
+    # Renewing keeps it, an expired lease is taken over
+    assert await first.check_lease()
+    await leases.update_one({"_id": "matrix_maintainer"}, {"$set": {"expires_at": datetime(2000, 1, 1)}})
+    assert await second.check_lease()
+    assert not await first.check_lease()
@@ -0,0 +1,62 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.metrics import (MONGO_DOCUMENTS, MONGO_DURATION, REQUEST_DURATION, RESPONSE_SIZE, Histogram,
+                                 MetricsMiddleware, instrument_collection, metrics)
+from backend.routes.metrics import router as metrics_router
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+def test_histogram_buckets_are_inclusive_upper_bounds():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.sum == 14.5 and histogram.count == 4
+
+
+@pytest.mark.asyncio
+async def test_requests_are_recorded_per_route_template_and_exposed():
+    app = FastAPI()
+
+    @app.get("/api/games/{game_id}")
+    async def get_game(game_id: str):
+        return {"game_id": game_id}
+
+    app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/api/games/g1")
+        await ac.get("/api/games/g2")
+        await ac.get("/nowhere")
+        response = await ac.get("/metrics")
+
+    assert REQUEST_DURATION.labels("GET", "/api/games/{game_id}", "200").count == 2
+    assert REQUEST_DURATION.labels("GET", "unmatched", "404").count == 1
+    assert RESPONSE_SIZE.labels("GET", "/api/games/{game_id}").sum == 2 * len(b'{"game_id":"g1"}')
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/games/{game_id}",status="200"' in response.text
+    assert 'le="+Inf"} 2' in response.text
+
+
+@pytest.mark.asyncio
+async def test_instrumented_collection_records_round_trips_and_documents():
+    collection = instrument_collection(AsyncMongoMockClient()["test_db"]["games"])
+    await collection.insert_many([{"name": f"Game {i}"} for i in range(3)])
+
+    assert len(await collection.find().sort("name").limit(2).to_list(length=None)) == 2
+    assert [game async for game in collection.find({"name": "Game 0"})][0]["name"] == "Game 0"
+    assert await collection.find_one({"name": "missing"}) is None
+
+    assert MONGO_DURATION.labels("games", "insert_many").count == 1
+    assert MONGO_DOCUMENTS.labels("games", "find").counts[:3] == [0, 1, 1]
+    assert MONGO_DOCUMENTS.labels("games", "find_one").sum == 0
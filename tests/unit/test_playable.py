@@ -0,0 +1,97 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.database import get_requirements_collection
+from backend.routes.requirements import router as requirements_router
+from backend.services.playable import PlayableIndex, setting_rank
+from backend.services.setups import notify_setup_added
+from tests.conftest import override_collection
+
+app = FastAPI()
+app.include_router(requirements_router)
+
+
+def setup(game_id, resolution, setting_name, ram, fps, cpu_id="cpu1", gpu_id="gpu1"):
+    return {"game_id": game_id, "resolution": resolution, "setting_name": setting_name, "cpu_id": cpu_id,
+            "gpu_id": gpu_id, "ram": ram, "fps": fps, "taken_by": "TechPowerUp", "notes": "", "verified": True}
+
+
+SETUPS = [
+    setup("g1", "1920x1080", "Ultra", 16, 70),
+    setup("g1", "1920x1080", "Medium", 8, 110),
+    setup("g1", "3840x2160", "Ultra", 32, 35),
+    setup("g2", "1920x1080", "High", 16, 50),
+    setup("g2", "1920x1080", "High", 16, 95, gpu_id="gpu2"),
+    setup("g3", "2560x1440", "Custom", 16, None),
+]
+
+
+def best(index, **query):
+    return [(found["game_id"], found["resolution"], found["setting_name"])
+            for found in index.playable("cpu1", "gpu1", **query)]
+
+
+def test_settings_rank_by_usual_preset_order():
+    assert setting_rank("Low") < setting_rank("high") < setting_rank("Very  High") < setting_rank("Ultra ")
+    assert setting_rank("Custom") == -1
+
+
+def test_best_setting_of_every_game_the_rig_meets():
+    index = PlayableIndex()
+    for found in SETUPS:
+        index.add_setup(found)
+
+    assert best(index, ram=32) == [("g1", "3840x2160", "Ultra"), ("g2", "1920x1080", "High"),
+                                   ("g3", "2560x1440", "Custom")]
+    assert best(index, ram=16, resolution="1920x1080") == [("g1", "1920x1080", "Ultra"), ("g2", "1920x1080", "High")]
+    # Setups without FPS never reach a minimum FPS
+    assert best(index, ram=16, min_fps=80) == [("g1", "1920x1080", "Medium")]
+    assert index.playable("cpu1", "gpu9", 32) is None
+
+
+def test_added_setups_are_queried_after_the_pair_was_built():
+    index = PlayableIndex()
+    index.add_setup(SETUPS[1])
+    assert best(index, ram=16) == [("g1", "1920x1080", "Medium")]
+
+    index.add_setup(SETUPS[0])
+    assert best(index, ram=16) == [("g1", "1920x1080", "Ultra")]
+
+
+def test_whole_catalog_query_takes_milliseconds():
+    index = PlayableIndex()
+    for game in range(5000):
+        for resolution in ("1920x1080", "2560x1440", "3840x2160"):
+            for setting_name, fps in (("Low", 120), ("High", 80), ("Ultra", 50)):
+                for ram in (8, 16, 32):
+                    index.add_setup(setup(f"g{game}", resolution, setting_name, ram, fps - game % 40))
+    index.playable("cpu1", "gpu1", 16)
+
+    start = time.perf_counter()
+    found = index.playable("cpu1", "gpu1", 16, min_fps=60)
+    assert time.perf_counter() - start < 0.1
+    assert len(found) == 5000
+
+
+@pytest.mark.asyncio
+async def test_playable_route_follows_new_setups_and_404s(monkeypatch):
+    collection = AsyncMongoMockClient()["game_db"]["game_setups"]
+    await collection.insert_many([dict(found) for found in SETUPS])
+
+    with override_collection(app, get_requirements_collection, collection):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/playable", params={"cpu_id": "cpu1", "gpu_id": "gpu2", "ram": 16})
+            notify_setup_added({**setup("g4", "1920x1080", "Ultra", 16, 144, gpu_id="gpu2"), "_id": "new"})
+            updated = await client.get("/playable", params={"cpu_id": "cpu1", "gpu_id": "gpu2", "ram": 16})
+            unmet = await client.get("/playable", params={"cpu_id": "cpu1", "gpu_id": "gpu2", "ram": 8})
+            unknown = await client.get("/playable", params={"cpu_id": "cpu9", "gpu_id": "gpu2", "ram": 16})
+
+    assert response.json()["games"] == [{"game_id": "g2", "resolution": "1920x1080", "setting_name": "High",
+                                         "fps": 95, "ram": 16, "verified": True}]
+    assert [game["game_id"] for game in updated.json()["games"]] == ["g4", "g2"]
+    assert unmet.status_code == 404
+    assert unknown.json() == {"detail": "No setups recorded for this CPU and GPU"}
@@ -1,9 +1,13 @@
+import json
+
 import pytest
+import pytest_asyncio
 from fastapi import FastAPI
 from httpx import AsyncClient, ASGITransport
-from unittest.mock import AsyncMock, patch
-
+from mongomock_motor import AsyncMongoMockClient
+from backend.app.database import get_requirements_collection
 from backend.routes.requirements import router as requirements_router
+from tests.conftest import mock_collection, override_collection
 
 app = FastAPI()
 app.include_router(requirements_router)
@@ -12,9 +16,7 @@ app.include_router(requirements_router)
 @pytest.mark.asyncio
 async def test_get_requirement_returns_404_when_game_not_found():
     # Valid game doc, but no matching setup in the list
-    with patch("backend.routes.requirements.collection.find_one", new_callable=AsyncMock) as mock_find_one:
-        mock_find_one.return_value = None
-
+    with override_collection(app, get_requirements_collection, mock_collection(find_one_result=None)):
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.get(
@@ -31,3 +33,69 @@ async def test_get_requirement_returns_404_when_game_not_found():
 
     assert response.status_code == 404
     assert response.json()["detail"] == "Combination not found"
+
+
+@pytest_asyncio.fixture
+async def requirements_db():
+    """
+    In-memory DB holding two embedded requirement documents of the same game.
+    """
+    db = AsyncMongoMockClient()["game_db"]
+    setup = {"cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16, "taken_by": "TechPowerUp", "notes": "", "verified": True}
+    await db.game_requirements.insert_many([
+        {"game_id": "g1", "resolution": "1920x1080", "setting_name": "High",
+         "setups": [{**setup, "cpu_id": "cpu2", "fps": 50}, {**setup, "fps": 90}]},
+        {"game_id": "g1", "resolution": "3840x2160", "setting_name": "High",
+         "setups": [{**setup, "fps": 40}]},
+    ])
+    return db
+
+
+@pytest.mark.asyncio
+async def test_batch_requirements_resolves_all_combinations(requirements_db):
+    body = {
+        "cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 32,
+        "combinations": [
+            {"game_id": "g1", "resolution": "1920x1080", "setting_name": "High"},
+            {"game_id": "g1", "resolution": "3840x2160", "setting_name": "High"},
+            {"game_id": "g2", "resolution": "1920x1080", "setting_name": "High"},
+        ],
+    }
+    with override_collection(app, get_requirements_collection, requirements_db.game_requirements):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post("/game-requirements/batch", json=body)
+            streamed = await ac.post("/game-requirements/batch", json=body,
+                                     headers={"Accept": "application/x-ndjson"})
+
+    results = response.json()["results"]
+    assert results["g1|1920x1080|High"]["fps"] == 90
+    assert results["g1|3840x2160|High"]["fps"] == 40
+    assert results["g2|1920x1080|High"] is None
+
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert {line["key"]: line["result"] for line in lines} == results
+    # Unresolved combinations come last
+    assert lines[-1]["key"] == "g2|1920x1080|High"
+
+
+@pytest.mark.asyncio
+async def test_batch_requirements_rejects_empty_batch():
+    with override_collection(app, get_requirements_collection, mock_collection()):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post("/game-requirements/batch",
+                                     json={"cpu_id": "c", "gpu_id": "g", "ram": 8, "combinations": []})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_all_game_requirements_streams_ndjson(requirements_db):
+    with override_collection(app, get_requirements_collection, requirements_db.game_requirements):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            regular = await ac.get("/game-requirements/all")
+            ndjson = await ac.get("/game-requirements/all", headers={"Accept": "application/x-ndjson"})
+
+    assert len(regular.json()) == 3
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == regular.json()
@@ -0,0 +1,112 @@
+import math
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from backend.services.invalidation import InvalidationEvent, invalidation_bus
+from backend.services.response_cache import (CachedResponse, GAMES_TAG, ResponseCache, ResponseCacheMiddleware,
+                                             response_cache)
+
+calls = {"games": 0}
+
+
+def make_app(cache):
+    app = FastAPI()
+
+    @app.get("/api/games")
+    async def games(limit: int = 10):
+        calls["games"] += 1
+        return [{"name": f"Game {i}"} for i in range(limit)]
+
+    @app.get("/api/req/game-requirements/all")
+    async def requirements():
+        return []
+
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls["games"] = 0
+
+
+@pytest.mark.asyncio
+async def test_cached_response_has_etag_and_answers_304():
+    app = make_app(ResponseCache())
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = await ac.get("/api/games?limit=2&x=1")
+        # Same query in another order is the same entry
+        second = await ac.get("/api/games?x=1&limit=2")
+        not_modified = await ac.get("/api/games?limit=2&x=1", headers={"If-None-Match": first.headers["ETag"]})
+        uncached = await ac.get("/api/req/game-requirements/all")
+
+    assert calls["games"] == 1
+    assert second.json() == first.json() == [{"name": "Game 0"}, {"name": "Game 1"}]
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert "ETag" not in uncached.headers
+
+
+@pytest.mark.asyncio
+async def test_streamed_requests_are_not_cached():
+    cache = ResponseCache()
+    app = make_app(cache)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/api/games", headers={"Accept": "application/x-ndjson"})
+        await ac.get("/api/games", params={"stream": "true"})
+        # Only the stream parameter itself asks for streaming
+        await ac.get("/api/games", params={"stream": "false"})
+        await ac.get("/api/games", params={"upstream": "true"})
+
+    assert calls["games"] == 4
+    assert len(cache) == 2
+
+
+def test_expired_entries_are_dropped_on_lookup():
+    cache = ResponseCache()
+    cache.put("fresh", CachedResponse(200, [], b"1", "", GAMES_TAG, time.monotonic() + 60), 0)
+    cache.put("expired", CachedResponse(200, [], b"2", "", GAMES_TAG, time.monotonic() - 1), 0)
+
+    assert cache.get("fresh").body == b"1"
+    assert cache.get("expired") is None
+    assert len(cache) == 1
+    assert cache.size == 1
+
+
+def test_lru_respects_entry_and_size_limits():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+
+    def entry(body):
+        return CachedResponse(200, [], body, "", GAMES_TAG, math.inf)
+
+    cache.put("a", entry(b"1234"), 0)
+    cache.put("b", entry(b"1234"), 0)
+    cache.get("a")
+    cache.put("c", entry(b"12"), 0)
+    assert cache.get("b") is None and cache.get("a") is not None
+
+    cache.put("d", entry(b"123456"), 0)
+    assert cache.size <= 10
+    cache.put("too big", entry(b"x" * 11), 0)
+    assert cache.get("too big") is None
+
+
+@pytest.mark.asyncio
+async def test_writes_reported_by_the_invalidation_feed_drop_entries():
+    response_cache.clear()
+    app = make_app(response_cache)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/api/games")
+        await ac.get("/api/games")
+        invalidation_bus.publish(InvalidationEvent("hardware", "insert"))
+        await ac.get("/api/games")
+        invalidation_bus.publish(InvalidationEvent("games", "insert"))
+        await ac.get("/api/games")
+
+    assert calls["games"] == 2
+    response_cache.clear()
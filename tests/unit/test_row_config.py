@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app.config import get_settings
+from backend.app.database import get_games_collection
+from backend.app.main import app
+from backend.services.hardware_catalog import hardware_catalog
+from backend.services.response_cache import ROW_CONFIG_TAG, response_cache
+from backend.services.row_config import JsonFileCache, row_config
+from tests.conftest import override_collection
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "row-config.json"
+    path.write_text(json.dumps({"rows": [{"title": "New"}]}))
+    return path
+
+
+def rewrite(path, data):
+    path.write_text(json.dumps(data))
+    # Make sure the mtime changes even on filesystems with a coarse clock
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.asyncio
+async def test_file_is_not_checked_again_within_the_interval(config_file, monkeypatch):
+    monkeypatch.setattr(get_settings(), "row_config_check_seconds", 3600)
+    cache = JsonFileCache(config_file)
+    first = await cache.get()
+    rewrite(config_file, {"rows": []})
+
+    assert await cache.get() is first
+    assert json.loads(first.body) == {"rows": [{"title": "New"}]}
+
+
+@pytest.mark.asyncio
+async def test_changed_file_is_reloaded_and_invalidates_cached_responses(config_file, monkeypatch):
+    monkeypatch.setattr(get_settings(), "row_config_check_seconds", 0)
+    invalidated = []
+    monkeypatch.setattr(response_cache, "invalidate", lambda *tags: invalidated.append(tags))
+    cache = JsonFileCache(config_file, (ROW_CONFIG_TAG,))
+    first = await cache.get()
+    assert await cache.get() is first
+    assert invalidated == []
+
+    rewrite(config_file, {"rows": []})
+    reloaded = await cache.get()
+
+    assert json.loads(reloaded.body) == {"rows": []}
+    assert reloaded.etag != first.etag
+    assert invalidated == [(ROW_CONFIG_TAG,)]
+
+
+@pytest.mark.asyncio
+async def test_broken_file_keeps_the_last_good_version(config_file, monkeypatch):
+    monkeypatch.setattr(get_settings(), "row_config_check_seconds", 0)
+    cache = JsonFileCache(config_file)
+    first = await cache.get()
+
+    config_file.write_text('{"rows": [')
+    assert await cache.get() is first
+    config_file.unlink()
+    assert await cache.get() is first
+
+
+@pytest.mark.asyncio
+async def test_missing_file_returns_404(async_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(row_config, "path", tmp_path / "missing.json")
+
+    response = await async_client.get("/games/row-config")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_row_config_route_answers_304_for_a_matching_etag(async_client, config_file, monkeypatch):
+    monkeypatch.setattr(row_config, "path", config_file)
+
+    response = await async_client.get("/games/row-config")
+    assert response.status_code == 200
+    assert response.json() == {"rows": [{"title": "New"}]}
+
+    not_modified = await async_client.get("/games/row-config", headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == response.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_edited_file_is_served_through_the_response_cache(config_file, monkeypatch):
+    rewrite(config_file, [{"row_id": "new", "fetch_url": "/games/newly_added", "params": {}}])
+    monkeypatch.setattr(row_config, "path", config_file)
+    settings = get_settings()
+    for name, value in (("row_config_check_seconds", 0.01), ("mongo_ensure_indexes", False),
+                        ("invalidation_feed_enabled", False), ("matrix_maintenance_enabled", False)):
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(hardware_catalog, "refresh", AsyncMock())
+    games = AsyncMongoMockClient()["game_db"]["games"]
+    response_cache.clear()
+
+    with override_collection(app, get_games_collection, games):
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                first = await client.get("/api/games/row-config")
+                home = await client.get("/api/games/home")
+                assert [row["row_id"] for row in first.json()] == ["new"]
+                assert [row["row_id"] for row in home.json()] == ["new"]
+
+                rewrite(config_file, [{"row_id": "all", "fetch_url": "/games/", "params": {"limit": 5}}])
+                # The routes aren't called while their responses are cached, the lifespan's watcher reloads the file
+                await asyncio.sleep(0.2)
+                edited = await client.get("/api/games/row-config")
+                home = await client.get("/api/games/home")
+
+    assert edited.json() == [{"row_id": "all", "fetch_url": "/games/", "params": {"limit": 5}}]
+    assert edited.headers["etag"] != first.headers["etag"]
+    assert home.json() == [{"row_id": "all", "fetch_url": "/games/", "params": {"limit": 5}, "games": []}]
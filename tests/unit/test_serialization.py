@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from backend.app.config import get_settings
+from backend.models.game import Game
+from backend.utils.serialization import FastJSONResponse, ModelSerializer
+
+
+@pytest.fixture
+def game_doc(fake_game):
+    return {**fake_game, "created_at": datetime(2025, 3, 1, 12, 30)}
+
+
+def test_fast_path_matches_pydantic_models(game_doc):
+    expected = Game(**game_doc, id=str(game_doc["_id"])).model_dump(mode="json")
+
+    response = ModelSerializer(Game).response([game_doc])
+
+    assert json.loads(response.body) == [expected]
+
+
+def test_invalid_documents_fail_unless_db_is_trusted(game_doc, monkeypatch):
+    del game_doc["name"]
+    serializer = ModelSerializer(Game)
+
+    with pytest.raises(ValidationError):
+        serializer.documents([game_doc])
+
+    monkeypatch.setattr(get_settings(), "trust_db_documents", True)
+    assert "name" not in serializer.documents([game_doc])[0]
+
+
+def test_partial_documents_keep_only_requested_fields(game_doc):
+    serializer = ModelSerializer(Game)
+
+    assert serializer.documents([game_doc], ("name", "genres")) == [
+        {"name": "Test Game1", "genres": ["Action"], "id": "507f1f77bcf86cd799439011"}]
+    assert json.loads(FastJSONResponse({"_id": game_doc["_id"]}).body) == {"_id": "507f1f77bcf86cd799439011"}
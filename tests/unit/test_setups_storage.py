@@ -0,0 +1,163 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+
+from backend.app.config import get_settings
+from backend.app.database import get_requirements_collection
+from backend.routes.requirements import router as requirements_router
+from backend.services.setups import (add_setup, add_setups, check_unique_index, flatten_setups, setup_key,
+                                     setup_upsert)
+from scripts.games.migrate_setups_to_flat import migrate_setups
+from tests.conftest import override_collection
+
+app = FastAPI()
+app.include_router(requirements_router)
+
+
+@pytest.fixture
+def requirement_doc():
+    return {
+        "_id": ObjectId("67dc8f83ad86710d1835b4b8"),
+        "game_id": "g1",
+        "resolution": "1920x1080",
+        "setting_name": "Ultra",
+        "setups": [
+            {"cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16, "fps": 60, "taken_by": "TechPowerUp", "notes": "",
+             "verified": True},
+            {"cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 32, "fps": 64, "taken_by": "TechPowerUp", "notes": "",
+             "verified": True},
+            {"cpu_id": "cpu2", "gpu_id": "gpu1", "ram": 16, "fps": 45, "taken_by": "TechPowerUp", "notes": "",
+             "verified": False},
+        ],
+    }
+
+
+def indexed_collection():
+    collection = MagicMock()
+    collection.index_information = AsyncMock(return_value={
+        "game_resolution_setting_unique": {"key": [("game_id", 1), ("resolution", 1), ("setting_name", 1)],
+                                           "unique": True}})
+    return collection
+
+
+@pytest.fixture
+def flat_storage(monkeypatch):
+    monkeypatch.setattr(get_settings(), "requirements_storage", "flat")
+
+
+def test_flatten_setups_copies_the_combination(requirement_doc):
+    setups = flatten_setups(requirement_doc)
+
+    assert len(setups) == 3
+    assert all(setup["game_id"] == "g1" and setup["setting_name"] == "Ultra" for setup in setups)
+
+
+@pytest.mark.asyncio
+async def test_migration_upserts_setups_in_batches(requirement_doc):
+    db = AsyncMongoMockClient()["game_db"]
+    await db.game_requirements.insert_one(requirement_doc)
+    setups_collection = MagicMock()
+    setups_collection.bulk_write = AsyncMock()
+
+    assert await migrate_setups(db.game_requirements, setups_collection, batch_size=2) == 3
+
+    batches = [call.args[0] for call in setups_collection.bulk_write.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 1]
+    # Upserted by the setup key, so running the migration again doesn't duplicate setups
+    first = batches[0][0]
+    assert first._filter == {"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra",
+                             "cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16}
+    assert first._upsert
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("storage", ["flat", "embedded"])
+async def test_get_requirement_picks_the_setup_with_the_most_ram(requirement_doc, storage, monkeypatch):
+    monkeypatch.setattr(get_settings(), "requirements_storage", storage)
+    db = AsyncMongoMockClient()["game_db"]
+    if storage == "flat":
+        await db.game_setups.insert_many(flatten_setups(requirement_doc))
+    else:
+        await db.game_requirements.insert_one(requirement_doc)
+    params = {"game_id": "g1", "cpu_id": "cpu1", "gpu_id": "gpu1", "resolution": "1920x1080",
+              "setting_name": "Ultra"}
+
+    collection = db.game_setups if storage == "flat" else db.game_requirements
+    with override_collection(app, get_requirements_collection, collection):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            best = await ac.get("/game-requirements/", params={**params, "ram": 64})
+            less_ram = await ac.get("/game-requirements/", params={**params, "ram": 24})
+            missing = await ac.get("/game-requirements/", params={**params, "ram": 8})
+
+    # The setup with the most RAM the rig still has
+    assert best.json()["ram"] == 32 and best.json()["fps"] == 64
+    assert less_ram.json()["ram"] == 16
+    assert missing.status_code == 404
+
+
+@pytest.fixture
+def new_setup():
+    return {"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra", "cpu_id": "cpu3",
+            "gpu_id": "gpu1", "ram": 16, "fps": 50, "taken_by": "TechPowerUp", "notes": "", "verified": True}
+
+
+def test_embedded_setup_upsert_skips_combinations_already_holding_the_setup(new_setup):
+    operation = setup_upsert(new_setup)
+
+    assert operation._filter == {"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra",
+                                 "setups": {"$not": {"$elemMatch": {"cpu_id": "cpu3", "gpu_id": "gpu1", "ram": 16}}}}
+    assert operation._doc["$push"]["setups"]["fps"] == 50 and "game_id" not in operation._doc["$push"]["setups"]
+    assert operation._upsert
+
+
+def test_flat_setup_upsert_only_writes_on_insert(new_setup, flat_storage):
+    operation = setup_upsert(new_setup)
+
+    assert operation._filter == setup_key(new_setup)
+    assert operation._doc == {"$setOnInsert": new_setup}
+
+
+@pytest.mark.asyncio
+async def test_add_setups_retries_writers_racing_on_a_new_combination(new_setup):
+    collection = indexed_collection()
+    race = BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}],
+                           "nUpserted": 1, "nModified": 1})
+    collection.bulk_write = AsyncMock(side_effect=[race, MagicMock(upserted_count=0, modified_count=1)])
+
+    added = await add_setups(collection, [new_setup, {**new_setup, "resolution": "2560x1440"},
+                                          {**new_setup, "cpu_id": "cpu4"}])
+
+    assert added == 3
+    retried = collection.bulk_write.call_args_list[1].args[0]
+    assert [operation._filter["resolution"] for operation in retried] == ["2560x1440"]
+    assert collection.bulk_write.call_args_list[0].kwargs["ordered"] is False
+
+
+@pytest.mark.asyncio
+async def test_add_setup_reports_setups_already_recorded(new_setup):
+    collection = indexed_collection()
+    exists = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}],
+                             "nUpserted": 0, "nModified": 0})
+    collection.bulk_write = AsyncMock(side_effect=[exists, exists])
+
+    assert await add_setup(collection, new_setup) is False
+    assert collection.bulk_write.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_add_setups_refuses_a_collection_without_its_unique_index(new_setup):
+    db = AsyncMongoMockClient()["game_db"]
+    collection = db["game_requirements_without_index"]
+
+    with pytest.raises(RuntimeError):
+        await add_setups(collection, [new_setup])
+    assert await collection.count_documents({}) == 0
+
+    await collection.create_index([("game_id", 1), ("resolution", 1), ("setting_name", 1)], unique=True)
+    await check_unique_index(collection)
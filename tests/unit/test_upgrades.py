@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from backend.app.database import get_requirements_collection
+from backend.routes.requirements import router as requirements_router
+from backend.services.refreshing import RefreshingCache
+from backend.services.setups import combination_key, notify_setup_added
+from backend.services.upgrades import Staircase, UpgradeIndex, upgrade_index_cache
+from tests.conftest import mock_collection, override_collection
+
+app = FastAPI()
+app.include_router(requirements_router)
+
+CPU_FACTORS = {"cpu1": 1.0, "cpu2": 1.3, "cpu3": 1.6}
+GPU_FACTORS = {"gpu1": 1.0, "gpu2": 1.5, "gpu3": 2.2}
+COMBINATION = {"game_id": "g1", "resolution": "1920x1080", "setting_name": "Ultra"}
+
+
+def synthetic_setups(ram=16):
+    return [{**COMBINATION, "cpu_id": cpu_id, "gpu_id": gpu_id, "ram": ram,
+             "fps": 40 * CPU_FACTORS[cpu_id] * GPU_FACTORS[gpu_id]}
+            for cpu_id, gpu_id in itertools.product(CPU_FACTORS, GPU_FACTORS)]
+
+
+def build_index(setups):
+    index = UpgradeIndex()
+    for setup in setups:
+        index.add_setup(setup)
+    index.build()
+    return index
+
+
+@pytest.fixture(autouse=True)
+def reset_upgrade_index():
+    upgrade_index_cache._value = None
+    yield
+    upgrade_index_cache._value = None
+
+
+def test_staircase_frontier_drops_dominated_setups():
+    setups = [{"fps": 100, "cost": (2, 16)}, {"fps": 90, "cost": (1, 16)}, {"fps": 80, "cost": (3, 32)},
+              {"fps": 70, "cost": (2, 8)}]
+    staircase = Staircase(setups, lambda setup: setup["cost"])
+
+    assert staircase.frontier(101) == []
+    assert [setup["fps"] for _, setup in staircase.frontier(85)] == [90]
+    # 80 fps is dominated by the 90 fps setup, 70 fps needs less RAM so it stays
+    assert sorted(setup["fps"] for _, setup in staircase.frontier(60)) == [70, 90]
+
+
+def test_recommends_cheapest_single_swap():
+    index = build_index(synthetic_setups())
+
+    # cpu1 + gpu1 runs 40 fps, 60 fps needs gpu2 (60) - gpu3 also works but is a higher tier
+    result = index.recommend("g1", "1920x1080", "Ultra", "cpu1", "gpu1", 16, 60)
+
+    assert result["current_fps"] == pytest.approx(40)
+    assert not result["meets_target"]
+    assert result["recommendation"]["swap"] == "gpu"
+    assert result["recommendation"]["gpu_id"] == "gpu2"
+    # Every CPU+GPU swap reaching 60 fps is dominated by a single swap with a weaker part
+    assert [option["swap"] for option in result["options"]] == ["gpu", "cpu"]
+
+
+def test_falls_back_to_both_swap_and_respects_ram():
+    index = build_index(synthetic_setups())
+
+    # Only cpu3 + gpu3 (140.8 fps) reaches 130 fps
+    result = index.recommend("g1", "1920x1080", "Ultra", "cpu1", "gpu1", 16, 130)
+    assert result["recommendation"] == {"swap": "cpu+gpu", "cpu_id": "cpu3", "gpu_id": "gpu3", "ram": 16,
+                                        "fps": pytest.approx(140.8), "tier": result["recommendation"]["tier"]}
+
+    assert index.recommend("g1", "1920x1080", "Ultra", "cpu1", "gpu1", 8, 60)["recommendation"] is None
+    assert index.recommend("g1", "1920x1080", "Ultra", "cpu3", "gpu3", 16, 60)["meets_target"]
+    assert index.recommend("g2", "1920x1080", "Ultra", "cpu1", "gpu1", 16, 60) is None
+
+
+def test_added_setup_rebuilds_every_combination_with_the_new_tiers():
+    index = build_index(synthetic_setups())
+    upgrade_index_cache._value = index
+
+    assert index.recommend("g1", "1920x1080", "Ultra", "cpu1", "gpu1", 32, 200)["recommendation"] is None
+    notify_setup_added({**COMBINATION, "cpu_id": "cpu1", "gpu_id": "gpu3", "ram": 32, "fps": 210})
+
+    recommendation = index.recommend("g1", "1920x1080", "Ultra", "cpu1", "gpu1", 32, 200)["recommendation"]
+    assert (recommendation["swap"], recommendation["gpu_id"]) == ("gpu", "gpu3")
+
+
+def test_other_combinations_rank_with_the_current_tiers():
+    other = {**COMBINATION, "game_id": "g2"}
+    index = build_index(synthetic_setups() + [{**setup, **other} for setup in synthetic_setups()])
+    before = index.recommend("g2", "1920x1080", "Ultra", "cpu1", "gpu1", 16, 60)
+    assert before["recommendation"]["gpu_id"] == "gpu2"
+    # Makes gpu2 look much faster, its tier goes up in every combination
+    for ram in range(32, 52):
+        index.add_setup({**COMBINATION, "cpu_id": "cpu1", "gpu_id": "gpu2", "ram": ram, "fps": 1000})
+
+    result = index.recommend("g2", "1920x1080", "Ultra", "cpu1", "gpu1", 16, 60)
+    gpu_option = next(option for option in result["options"] if option["swap"] == "gpu")
+    # gpu2 is now the more expensive swap
+    assert gpu_option["gpu_id"] == "gpu3"
+    assert gpu_option["tier"] == round(index.tier("gpu", "gpu3"), 3)
+
+
+@pytest.mark.asyncio
+async def test_upgrade_route_returns_recommendation_and_404():
+    collection = mock_collection()
+    collection.find.return_value.__aiter__.return_value = synthetic_setups()
+    with override_collection(app, get_requirements_collection, collection):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            params = {**COMBINATION, "cpu_id": "cpu1", "gpu_id": "gpu1", "ram": 16, "target_fps": 60}
+            response = await client.get("/upgrade", params=params)
+            missing = await client.get("/upgrade", params={**params, "game_id": "g2"})
+
+    assert response.status_code == 200
+    assert response.json()["recommendation"]["gpu_id"] == "gpu2"
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_writes_during_a_build_throw_the_build_away():
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def build(collection):
+        started.set()
+        await release.wait()
+        return UpgradeIndex()
+
+    for write in (lambda cache: cache.invalidate(),
+                  lambda cache: cache.update(lambda index: index.add_setup(synthetic_setups()[0]))):
+        cache = RefreshingCache(build, "upgrade_index_ttl_seconds")
+        started.clear()
+        release.clear()
+        pending = asyncio.create_task(cache.get(None))
+        await started.wait()
+        write(cache)
+        release.set()
+
+        # The waiting request still gets the built value, the next one rebuilds
+        assert isinstance(await pending, UpgradeIndex)
+        assert cache.value is None
+
+
+@pytest.mark.asyncio
+async def test_stale_index_is_served_while_the_new_one_builds():
+    started, release = asyncio.Event(), asyncio.Event()
+    previous = build_index(synthetic_setups())
+
+    async def build(collection):
+        started.set()
+        await release.wait()
+        # Read the collection before the write below
+        return build_index(synthetic_setups())
+
+    cache = RefreshingCache(build, "upgrade_index_ttl_seconds", serve_stale=True)
+    cache._value = previous
+    cache.invalidate()
+
+    assert await cache.get(None) is previous
+    await started.wait()
+    added = {**COMBINATION, "cpu_id": "cpu1", "gpu_id": "gpu3", "ram": 32, "fps": 210}
+    cache.update(lambda index: index.add_setup(added))
+    cache.update(lambda index: index.add_setup(synthetic_setups()[0]))
+    assert await cache.get(None) is previous
+    release.set()
+    await cache._refresh
+
+    # The write made during the build is applied to the new index, the setup it had already read is not doubled
+    rebuilt = await cache.get(None)
+    assert rebuilt is not previous
+    assert len(rebuilt._setups[combination_key(**COMBINATION)]) == len(synthetic_setups()) + 1
@@ -0,0 +1,46 @@
+import pytest
+from fastapi import HTTPException
+
+from backend.app.config import get_settings
+from backend.utils.validation import games_validator, validate_games_list, validate_hardware_list
+
+
+def test_games_validator_is_compiled_once_per_parameters():
+    assert games_validator(genre="action") is games_validator(genre="action")
+    assert games_validator(genre="action") is not games_validator(genre="rpg")
+
+
+def test_games_checks_keep_their_errors(fake_game):
+    validate_games_list([fake_game], limit=1, name="test", genre="ACTION")
+    validate_games_list([fake_game], genre="act", genre_prefix=True)
+
+    with pytest.raises(HTTPException) as exc:
+        validate_games_list([fake_game], genre="act")
+    assert exc.value.status_code == 500
+    assert exc.value.detail == "genre not found in game's genres in games route"
+
+    with pytest.raises(HTTPException) as exc:
+        validate_games_list([fake_game, fake_game], limit=1)
+    assert exc.value.detail == "Too many games found"
+
+    with pytest.raises(HTTPException) as exc:
+        validate_games_list([], genre="rpg")
+    assert exc.value.status_code == 404
+
+
+def test_hardware_checks_ignore_case():
+    cpus = [{"type": "CPU", "brand": "Intel", "model": "i7-12700K", "fullname": "Intel Core i7-12700K"}]
+    validate_hardware_list(cpus, "cpu", brand="intel", model="12700k")
+
+    with pytest.raises(HTTPException) as exc:
+        validate_hardware_list(cpus, "cpu", brand="amd")
+    assert exc.value.detail == "Wrong brand found in cpus fetched"
+
+
+def test_consistency_checks_can_be_skipped(fake_game, monkeypatch):
+    monkeypatch.setattr(get_settings(), "skip_consistency_checks", True)
+    validate_games_list([fake_game, fake_game], limit=1, genre="rpg")
+
+    with pytest.raises(HTTPException) as exc:
+        validate_games_list([])
+    assert exc.value.status_code == 404